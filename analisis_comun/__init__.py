@@ -0,0 +1,27 @@
+"""
+Modulos compartidos por los analisis de categorizacion CUDYR y estadistica UTI.
+Los scripts de cada carpeta agregan la raiz del repositorio al sys.path para
+poder importarlos (ej: ``from analisis_comun.anonimizacion import anonimizar``).
+
+``import analisis_comun`` no importa ningun submodulo: se cargan al primer
+acceso (``analisis_comun.spc``, PEP 562), y scipy/plotly se difieren con
+``analisis_comun.perezoso``.
+"""
+import importlib
+
+SUBMODULOS = (
+    'anonimizacion', 'camas', 'carga', 'censo', 'comparacion', 'cubos', 'exportar', 'flujo',
+    'kpis', 'lectura', 'metricas', 'mortalidad', 'outliers', 'pacientes', 'perezoso',
+    'pronostico', 'reingresos', 'render', 'rut', 'servidor', 'sketches', 'spa', 'spc',
+    'supervivencia', 'tiempos_importacion', 'vinculo',
+)
+
+
+def __getattr__(nombre):
+    if nombre in SUBMODULOS:
+        return importlib.import_module(f'{__name__}.{nombre}')
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *SUBMODULOS])
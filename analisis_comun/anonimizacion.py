@@ -0,0 +1,128 @@
+"""
+Anonimizacion de datos de pacientes
+===================================
+Reemplaza el RUT por un identificador seudonimo (HMAC-SHA256 con una clave
+local sobre el cuerpo numerico del RUT) almacenado como int64, y elimina las
+columnas de nombre al cargar.
+Con la misma clave un RUT produce siempre el mismo ID, por lo que se pueden
+vincular reingresos y cruzar datasets sin conservar el RUT en memoria.
+
+La clave se lee de la variable de entorno UTI_CLAVE_SEUDONIMO o del archivo
+``.clave_seudonimo`` en la raiz del repositorio (se crea si no existe y esta
+excluido de git). Sin la clave los IDs no se pueden revertir a RUT.
+"""
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.rut import parsear_rut
+
+COLUMNAS_NOMBRE = ['NOMBRE', 'APELLIDO_PATERNO', 'APELLIDO_MATERNO']
+VARIABLE_CLAVE = 'UTI_CLAVE_SEUDONIMO'
+RUTA_CLAVE = Path(__file__).resolve().parent.parent / '.clave_seudonimo'
+ID_FALTANTE = -1
+
+
+def cargar_clave(ruta=RUTA_CLAVE):
+    """Devuelve la clave HMAC (bytes). Si no hay clave configurada, genera una nueva."""
+    valor = os.environ.get(VARIABLE_CLAVE)
+    if valor:
+        return valor.encode('utf-8')
+    ruta = Path(ruta)
+    if ruta.exists():
+        return ruta.read_bytes().strip()
+    clave = secrets.token_hex(32).encode('ascii')
+    ruta.write_bytes(clave)
+    try:
+        os.chmod(ruta, 0o600)
+    except OSError:
+        pass
+    return clave
+
+
+def huella_clave(clave):
+    """Huella corta de la clave, para invalidar caches si la clave cambia."""
+    return hmac.new(clave, b'huella', hashlib.sha256).hexdigest()[:12]
+
+
+def seudonimizar(serie, clave, nombre='ID_PACIENTE'):
+    """
+    Calcula el HMAC-SHA256 solo sobre los valores unicos y lo expande con los
+    codigos de factorize. Los primeros 8 bytes del digest se guardan como
+    int64 positivo; los valores faltantes quedan como ID_FALTANTE.
+    """
+    codigos, unicos = pd.factorize(serie)
+    hashes = np.fromiter(
+        (int.from_bytes(hmac.new(clave, str(v).encode('utf-8'), hashlib.sha256).digest()[:8], 'big') >> 1
+         for v in unicos),
+        dtype=np.int64, count=len(unicos),
+    )
+    # El codigo -1 de factorize (faltante) cae en el ultimo elemento
+    ids = np.append(hashes, np.int64(ID_FALTANTE))
+    return pd.Series(ids[codigos], index=serie.index, name=nombre)
+
+
+def anonimizar(df, clave, col_rut='RUT', col_id='ID_PACIENTE'):
+    """
+    Elimina nombres y reemplaza la columna RUT por el ID seudonimo int64.
+    El HMAC se calcula sobre el cuerpo del RUT, de modo que "12.345.678-5" y
+    "12345678-5" dan el mismo ID. Se agrega RUT_VALIDO (DV correcto) para
+    control de calidad; los RUT ilegibles quedan con ID_FALTANTE.
+    """
+    df = df.drop(columns=[c for c in COLUMNAS_NOMBRE if c in df.columns])
+    if col_rut in df.columns:
+        rut = parsear_rut(df[col_rut])
+        cuerpo = rut['RUT_CUERPO'].astype('Int64').mask(rut['RUT_CUERPO'] == 0)
+        df[col_id] = seudonimizar(cuerpo, clave, col_id)
+        df['RUT_VALIDO'] = rut['RUT_VALIDO']
+        df = df.drop(columns=[col_rut])
+    return df
+
+
+def ruta_cache(ruta, clave, cache_dir, kwargs):
+    """Archivo de cache de un Excel ya anonimizado (cambia si cambia el archivo, la clave o kwargs)."""
+    ruta = Path(ruta)
+    st = ruta.stat()
+    firma = f'{ruta.resolve()}|{st.st_mtime_ns}|{st.st_size}|{huella_clave(clave)}|{sorted(kwargs.items())}'
+    nombre = f'{ruta.stem}_{hashlib.sha256(firma.encode("utf-8")).hexdigest()[:16]}.pkl'
+    return Path(cache_dir) / nombre
+
+
+def leer_excel_anonimizado(ruta, clave, cache_dir=None, motores=None, **kwargs):
+    """
+    Lee un Excel sin materializar las columnas de nombre y lo anonimiza.
+    Si se indica cache_dir, guarda el resultado ya anonimizado (sin RUT ni
+    nombres) y lo reutiliza mientras el archivo y la clave no cambien.
+    `motores` es la lista de engines a probar en orden (ver lectura.leer_excel).
+    Si kwargs trae `usecols` (lista), se leen solo esas columnas.
+    """
+    from analisis_comun.lectura import leer_excel
+
+    ruta = Path(ruta)
+    archivo_cache = None
+    if cache_dir is not None:
+        archivo_cache = ruta_cache(ruta, clave, cache_dir, kwargs)
+        if archivo_cache.exists():
+            with open(archivo_cache, 'rb') as f:
+                return pickle.load(f)
+
+    columnas = kwargs.pop('usecols', None)
+    df = leer_excel(ruta, motores=motores,
+                    usecols=lambda c: c not in COLUMNAS_NOMBRE and (columnas is None or c in columnas),
+                    **kwargs)
+    df = anonimizar(df, clave)
+
+    if archivo_cache is not None:
+        archivo_cache.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atomica: otro proceso del pool puede estar leyendo la cache
+        temporal = archivo_cache.with_suffix(f'.{os.getpid()}.tmp')
+        with open(temporal, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, archivo_cache)
+    return df
@@ -0,0 +1,133 @@
+"""
+Intensidad por cama: pivote cama x semana de las categorizaciones
+=================================================================
+``pivote_camas`` codifica las camas (``CAMA``) y las semanas (lunes a
+domingo) como enteros y arma con un solo ``pivot_table`` tres matrices
+cama x semana: categorizaciones, categorizaciones A1 y suma del puntaje CUDYR
+(riesgo + dependencia, ver ``pacientes.puntaje_cudyr``). Se guardan sumas y
+no promedios para poder unir anios y unidades sumando; ``indicadores``
+calcula la proporcion A1 y el puntaje medio al final.
+
+El pivote de cada unidad y anio queda en ``cache/camas_<unidad>_<anio>_<hash>.json``
+segun el contenido de las columnas usadas. Los archivos sin columna CAMA (la
+exportacion UTIQX 2025) se omiten y ``pivotes_por_unidad`` los informa.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.exportar import guardar_json, hash_dataset
+from analisis_comun.pacientes import puntaje_cudyr
+
+COLUMNAS_CAMAS = ['CAMA', 'CATEGORIA', 'FECHA_CATEGORIZACION']
+MATRICES = ('n', 'a1', 'puntaje')
+
+
+def normalizar_cama(camas):
+    """Etiqueta de texto por cama: '3.0' y 3 -> '3'; vacios -> NA."""
+    texto = camas.astype('string').str.strip()
+    numero = pd.to_numeric(texto, errors='coerce')
+    entero = numero.notna() & (numero == numero.round())
+    texto = texto.mask(entero, numero.where(entero).astype('Int64').astype('string'))
+    return texto.mask(texto == '')
+
+
+def _orden_natural(etiqueta):
+    return (0, int(etiqueta), '') if etiqueta.isdigit() else (1, 0, etiqueta)
+
+
+def pivote_camas(df, col_cama='CAMA', col_fecha='FECHA_CATEGORIZACION'):
+    """
+    {'camas': [...], 'semanas': ['AAAA-MM-DD' (lunes)], 'n'|'a1'|'puntaje': matriz
+    cama x semana (listas)}. Las semanas sin categorizaciones quedan en 0.
+    """
+    cama = normalizar_cama(df[col_cama])
+    fechas = pd.to_datetime(df[col_fecha]).dt.normalize()
+    validas = cama.notna() & fechas.notna()
+    cama, fechas = cama[validas], fechas[validas]
+    if not validas.any():
+        return {'camas': [], 'semanas': [], **{m: [] for m in MATRICES}}
+
+    etiquetas = sorted(cama.unique(), key=_orden_natural)
+    cod_cama = pd.Categorical(cama, categories=etiquetas).codes
+    lunes0 = fechas.min() - pd.Timedelta(days=fechas.min().dayofweek)
+    semana = ((fechas - lunes0) // pd.Timedelta(days=7)).to_numpy()
+    categorias = df.loc[validas, 'CATEGORIA']
+
+    tabla = pd.DataFrame({
+        'COD_CAMA': cod_cama, 'SEMANA': semana,
+        'n': 1, 'a1': (categorias == 'A1').to_numpy(dtype=np.int64),
+        'puntaje': puntaje_cudyr(categorias).astype(np.int64),
+    })
+    pivote = tabla.pivot_table(index='COD_CAMA', columns='SEMANA', values=list(MATRICES),
+                               aggfunc='sum', fill_value=0)
+    n_semanas = int(semana.max()) + 1
+    columnas = pd.MultiIndex.from_product([MATRICES, range(n_semanas)])
+    pivote = pivote.reindex(index=range(len(etiquetas)), columns=columnas, fill_value=0)
+    return {
+        'camas': list(etiquetas),
+        'semanas': [(lunes0 + pd.Timedelta(weeks=k)).strftime('%Y-%m-%d') for k in range(n_semanas)],
+        **{m: pivote[m].to_numpy(dtype=np.int64).tolist() for m in MATRICES},
+    }
+
+
+def pivote_en_cache(df, unidad, anio, cache_dir='cache'):
+    """
+    pivote_camas de una unidad y anio, leido de cache si las columnas usadas no
+    cambiaron. Al recalcular se borran las versiones anteriores de esa unidad y anio.
+    """
+    clave = hash_dataset(df, COLUMNAS_CAMAS)
+    directorio = Path(cache_dir)
+    ruta = directorio / f'camas_{unidad}_{anio}_{clave}.json'
+    if ruta.exists():
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    datos = pivote_camas(df)
+    for vieja in directorio.glob(f'camas_{unidad}_{anio}_*.json'):
+        vieja.unlink()
+    guardar_json(ruta, datos)
+    return datos
+
+
+def unir_pivotes(pivotes):
+    """Suma varios pivotes (p. ej. los anios de una unidad) sobre la union de camas y semanas."""
+    camas = sorted({c for p in pivotes for c in p['camas']}, key=_orden_natural)
+    semanas = sorted({s for p in pivotes for s in p['semanas']})
+    fila = {c: i for i, c in enumerate(camas)}
+    col = {s: j for j, s in enumerate(semanas)}
+    unido = {m: np.zeros((len(camas), len(semanas)), dtype=np.int64) for m in MATRICES}
+    for p in pivotes:
+        if not p['camas']:
+            continue
+        i = np.array([fila[c] for c in p['camas']])
+        j = np.array([col[s] for s in p['semanas']])
+        for m in MATRICES:
+            unido[m][np.ix_(i, j)] += np.asarray(p[m], dtype=np.int64)
+    return {'camas': camas, 'semanas': semanas, **unido}
+
+
+def indicadores(pivote):
+    """Matrices cama x semana de categorizaciones, proporcion A1 y puntaje medio (NaN sin datos)."""
+    n = np.asarray(pivote['n'], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'n': n,
+            'pct_a1': np.where(n > 0, np.asarray(pivote['a1']) / n, np.nan),
+            'puntaje_medio': np.where(n > 0, np.asarray(pivote['puntaje']) / n, np.nan),
+        }
+
+
+def pivotes_por_unidad(datasets, cache_dir='cache'):
+    """
+    datasets: {(unidad, anio): DataFrame}. Devuelve ({unidad: pivote unido de
+    sus anios}, [(unidad, anio) omitidos por no tener CAMA]).
+    """
+    por_unidad, omitidos = {}, []
+    for (unidad, anio), df in sorted(datasets.items()):
+        if 'CAMA' not in df.columns or df['CAMA'].isna().all():
+            omitidos.append((unidad, anio))
+            continue
+        por_unidad.setdefault(unidad, []).append(pivote_en_cache(df, unidad, anio, cache_dir))
+    return {u: unir_pivotes(p) for u, p in por_unidad.items()}, omitidos
@@ -0,0 +1,142 @@
+"""
+Carga de trabajo de enfermeria a partir de la categorizacion CUDYR
+=================================================================
+Cada categorizacion CUDYR corresponde a un paciente-dia. Se traduce a horas
+de atencion de enfermeria con una tabla de pesos por categoria (configurable)
+y se agrega por unidad y dia en una sola pasada: la categoria se convierte en
+codigo entero (pd.Categorical con un orden fijo) y el par (unidad, dia, codigo)
+se cuenta con np.bincount.
+
+La tabla diaria guarda los conteos por categoria, asi que cambiar los pesos o
+el supuesto de dotacion (pacientes o enfermeros por turno) se resuelve sobre
+la tabla precalculada, sin volver a recorrer las categorizaciones.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORIAS_CUDYR = ['A1', 'A2', 'A3', 'B1', 'B2', 'B3',
+                    'C1', 'C2', 'C3', 'D1', 'D2', 'D3']
+
+# Horas de atencion de enfermeria por paciente-dia segun categoria. Valores de
+# referencia que siguen el orden de riesgo y dependencia del CUDYR; deben
+# ajustarse al estandar local antes de usarlos para dotacion.
+HORAS_CUDYR = {
+    'A1': 8.0, 'A2': 7.0, 'A3': 6.0,
+    'B1': 6.5, 'B2': 5.5, 'B3': 4.5,
+    'C1': 5.0, 'C2': 4.0, 'C3': 3.0,
+    'D1': 3.5, 'D2': 2.5, 'D3': 1.5,
+}
+
+HORAS_TURNO_DIA = 24
+
+
+def vector_horas(horas=None):
+    """Pesos en el orden de CATEGORIAS_CUDYR (0 para categorias sin peso)."""
+    horas = HORAS_CUDYR if horas is None else horas
+    return np.array([float(horas.get(c, 0.0)) for c in CATEGORIAS_CUDYR])
+
+
+def codigos_categoria(categorias):
+    """Codigo entero de cada categoria segun CATEGORIAS_CUDYR; -1 si no se reconoce."""
+    cat = pd.Categorical(categorias.astype('string').str.strip().str.upper(),
+                         categories=CATEGORIAS_CUDYR)
+    return cat.codes.astype(np.int64)
+
+
+def tabla_carga(datasets, col_fecha='FECHA_CATEGORIZACION', horas=None):
+    """
+    datasets: dict {(unidad, anio): DataFrame} de categorizaciones.
+    Devuelve la tabla diaria (una fila por unidad y dia con categorizaciones)
+    con columnas UNIDAD, FECHA, una columna de conteo por categoria,
+    PACIENTES_DIA, SIN_CATEGORIA y HORAS_DEMANDA.
+    """
+    unidades, fechas, codigos = [], [], []
+    for (unidad, _), df in datasets.items():
+        unidades.append(np.full(len(df), unidad, dtype=object))
+        fechas.append(df[col_fecha].to_numpy(dtype='datetime64[D]'))
+        codigos.append(codigos_categoria(df['CATEGORIA']))
+    unidad = np.concatenate(unidades)
+    fecha = np.concatenate(fechas)
+    codigo = np.concatenate(codigos)
+
+    validas = ~np.isnat(fecha)
+    unidad, fecha, codigo = unidad[validas], fecha[validas], codigo[validas]
+    cod_unidad, nombres_unidad = pd.factorize(unidad)
+    dia0 = fecha.min() if len(fecha) else np.datetime64('1970-01-01', 'D')
+    dia = (fecha - dia0).astype(np.int64)
+    n_dias = int(dia.max()) + 1 if len(dia) else 0
+
+    # Una celda por (unidad, dia, categoria); la ultima columna junta las no reconocidas
+    n_col = len(CATEGORIAS_CUDYR) + 1
+    col = np.where(codigo >= 0, codigo, n_col - 1)
+    clave = (cod_unidad * n_dias + dia) * n_col + col
+    conteos = np.bincount(clave, minlength=len(nombres_unidad) * n_dias * n_col)
+    conteos = conteos.reshape(len(nombres_unidad) * n_dias, n_col)
+
+    presentes = conteos.sum(axis=1) > 0
+    filas = np.flatnonzero(presentes)
+    tabla = pd.DataFrame(conteos[filas, :-1], columns=CATEGORIAS_CUDYR)
+    tabla.insert(0, 'UNIDAD', np.asarray(nombres_unidad, dtype=object)[filas // n_dias])
+    tabla.insert(1, 'FECHA', dia0 + (filas % n_dias).astype('timedelta64[D]'))
+    tabla['SIN_CATEGORIA'] = conteos[filas, -1]
+    tabla['PACIENTES_DIA'] = conteos[filas].sum(axis=1)
+    tabla['HORAS_DEMANDA'] = recalcular_horas(tabla, horas)
+    return tabla
+
+
+def recalcular_horas(tabla, horas=None):
+    """Horas demandadas por fila con otros pesos, usando solo los conteos guardados."""
+    return tabla[CATEGORIAS_CUDYR].to_numpy(dtype=float) @ vector_horas(horas)
+
+
+def carga_mensual(tabla):
+    """Agrega la tabla diaria por unidad y mes (dias con registro incluidos)."""
+    mes = tabla['FECHA'].dt.to_period('M')
+    columnas = CATEGORIAS_CUDYR + ['SIN_CATEGORIA', 'PACIENTES_DIA', 'HORAS_DEMANDA']
+    mensual = tabla.groupby(['UNIDAD', mes])[columnas].sum()
+    mensual['DIAS'] = tabla.groupby(['UNIDAD', mes]).size()
+    mensual.index = mensual.index.set_names(['UNIDAD', 'MES'])
+    return mensual.reset_index()
+
+
+def enfermeros_requeridos(tabla, horas_por_enfermero=HORAS_TURNO_DIA):
+    """Enfermeros (cobertura continua) necesarios para cubrir HORAS_DEMANDA."""
+    return tabla['HORAS_DEMANDA'] / horas_por_enfermero
+
+
+def escenario_dotacion(tabla, enfermeros=None, pacientes_por_enfermero=None,
+                       horas_por_enfermero=HORAS_TURNO_DIA):
+    """
+    Evalua un supuesto de dotacion sobre la tabla (diaria o mensual) sin
+    recalcular la carga. Se indica una cantidad fija de `enfermeros` o un
+    ratio `pacientes_por_enfermero` (1:N). Agrega ENFERMEROS, HORAS_OFERTA,
+    HORAS_POR_ENFERMERO y COBERTURA (oferta / demanda).
+    """
+    if (enfermeros is None) == (pacientes_por_enfermero is None):
+        raise ValueError("Indicar enfermeros o pacientes_por_enfermero (solo uno)")
+    dias = tabla['DIAS'] if 'DIAS' in tabla else 1
+    if enfermeros is not None:
+        n_enf = pd.Series(float(enfermeros), index=tabla.index)
+    else:
+        # PACIENTES_DIA / dias = censo medio; se redondea hacia arriba por turno
+        n_enf = np.ceil(tabla['PACIENTES_DIA'] / dias / pacientes_por_enfermero)
+    resultado = tabla.copy()
+    resultado['ENFERMEROS'] = n_enf
+    resultado['HORAS_OFERTA'] = n_enf * horas_por_enfermero * dias
+    resultado['HORAS_POR_ENFERMERO'] = (resultado['HORAS_DEMANDA'] / dias
+                                        / n_enf.where(n_enf > 0))
+    resultado['COBERTURA'] = (resultado['HORAS_OFERTA']
+                              / resultado['HORAS_DEMANDA'].where(resultado['HORAS_DEMANDA'] > 0))
+    return resultado
+
+
+def guardar_tabla_carga(tabla, ruta='carga_diaria.csv'):
+    """Guarda la tabla diaria precalculada."""
+    tabla.to_csv(ruta, index=False, date_format='%Y-%m-%d')
+    return ruta
+
+
+def leer_tabla_carga(ruta='carga_diaria.csv'):
+    """Carga la tabla diaria con los tipos originales."""
+    tipos = {c: np.int32 for c in CATEGORIAS_CUDYR + ['SIN_CATEGORIA', 'PACIENTES_DIA']}
+    return pd.read_csv(ruta, parse_dates=['FECHA'], dtype=tipos)
@@ -0,0 +1,99 @@
+"""
+Censo diario de ocupacion a partir de intervalos INGRESO/EGRESO
+==============================================================
+Censo de medianoche: un paciente se cuenta en la fecha D si estaba en la
+unidad a las 00:00 de D (INGRESO <= D 00:00 < EGRESO).
+
+Cada estadia se convierte en dos eventos, +1 en la primera medianoche dentro
+del intervalo y -1 en la primera medianoche desde el egreso; la suma acumulada
+de los eventos por dia da el censo. Los eventos de todas las unidades se
+cuentan con un solo np.bincount sobre la clave (unidad, dia), por lo que el
+costo es lineal en estadias mas dias y no depende de la duracion de cada una.
+"""
+import numpy as np
+import pandas as pd
+
+# Camas por unidad (dotacion actual). Se puede pasar otro dict o un entero.
+CAMAS_UTI = {'UTINQX': 6, 'UTIQX': 9}
+
+PERCENTILES_CENSO = (50, 90, 95)
+
+
+def _medianoche_siguiente(fechas):
+    """Primera medianoche >= fecha, como dias desde 1970-01-01 (int64)."""
+    return fechas.dt.ceil('D').to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def censo_diario(df, col_unidad='UTI', col_ingreso='INGRESO', col_egreso='EGRESO',
+                 fecha_corte=None):
+    """
+    Censo de medianoche por unidad y fecha.
+    Las estadias sin EGRESO se consideran abiertas hasta `fecha_corte`
+    (por defecto, la ultima fecha de ingreso o egreso del dataset).
+    Devuelve un DataFrame con columnas UNIDAD, FECHA y CENSO (int32), con una
+    fila por dia del rango para cada unidad (incluye dias con censo 0).
+    """
+    ingreso = pd.to_datetime(df[col_ingreso])
+    egreso = pd.to_datetime(df[col_egreso])
+    if fecha_corte is None:
+        fecha_corte = max(ingreso.max(), egreso.max())
+    egreso = egreso.fillna(pd.Timestamp(fecha_corte))
+    validas = ingreso.notna() & (egreso >= ingreso)
+
+    entrada = _medianoche_siguiente(ingreso[validas])
+    salida = _medianoche_siguiente(egreso[validas])
+    cod_unidad, unidades = pd.factorize(df.loc[validas, col_unidad])
+    if len(entrada) == 0:
+        return pd.DataFrame({'UNIDAD': pd.Series(dtype=object),
+                             'FECHA': pd.Series(dtype='datetime64[ns]'),
+                             'CENSO': pd.Series(dtype=np.int32)})
+
+    d0 = int(entrada.min())
+    n_dias = int(salida.max()) - d0 + 1
+    n = len(unidades) * n_dias
+    eventos = (np.bincount(cod_unidad * n_dias + (entrada - d0), minlength=n)
+               - np.bincount(cod_unidad * n_dias + (salida - d0), minlength=n))
+    censo = np.cumsum(eventos.reshape(len(unidades), n_dias), axis=1)
+
+    # El ultimo dia solo recibe salidas; se descarta si queda fuera del corte
+    fechas = np.datetime64(d0, 'D') + np.arange(n_dias).astype('timedelta64[D]')
+    dentro = fechas <= np.datetime64(pd.Timestamp(fecha_corte).normalize(), 'D')
+    censo = censo[:, dentro]
+    fechas = fechas[dentro]
+    return pd.DataFrame({
+        'UNIDAD': np.repeat(np.asarray(unidades, dtype=object), len(fechas)),
+        'FECHA': np.tile(fechas, len(unidades)).astype('datetime64[ns]'),
+        'CENSO': censo.ravel().astype(np.int32),
+    })
+
+
+def resumen_censo(censo, camas=None, percentiles=PERCENTILES_CENSO):
+    """
+    Indicadores de ocupacion por unidad: censo medio, pico (y su primera
+    fecha), percentiles, dias sobre capacidad y ocupacion media (% de camas).
+    `camas` puede ser un entero (igual para todas) o un dict por unidad;
+    por defecto CAMAS_UTI.
+    """
+    camas = CAMAS_UTI if camas is None else camas
+    filas = []
+    for unidad, g in censo.groupby('UNIDAD', sort=False):
+        valores = g['CENSO'].to_numpy()
+        n_camas = camas.get(unidad) if isinstance(camas, dict) else camas
+        i_pico = int(np.argmax(valores))
+        fila = {
+            'UNIDAD': unidad,
+            'DIAS': len(valores),
+            'CENSO_MEDIO': float(valores.mean()),
+            'PICO': int(valores[i_pico]),
+            'FECHA_PICO': g['FECHA'].iloc[i_pico],
+        }
+        for p, v in zip(percentiles, np.percentile(valores, percentiles)):
+            fila[f'P{p}'] = float(v)
+        fila['CAMAS'] = n_camas
+        if n_camas:
+            sobre = valores > n_camas
+            fila['DIAS_SOBRE_CAPACIDAD'] = int(sobre.sum())
+            fila['PCT_DIAS_SOBRE_CAPACIDAD'] = float(sobre.mean() * 100)
+            fila['OCUPACION_MEDIA'] = float(valores.mean() / n_camas * 100)
+        filas.append(fila)
+    return pd.DataFrame(filas).set_index('UNIDAD')
@@ -0,0 +1,130 @@
+"""
+Comparacion de periodos: anio, trimestre y 12 meses moviles
+===========================================================
+Un periodo es un dict ``{'tipo', 'etiqueta', 'desde', 'hasta'}`` con el rango
+de fechas semiabierto [desde, hasta). Se escribe como texto:
+
+- ``2025``: anio calendario,
+- ``2025T3``: trimestre (jul-sep 2025),
+- ``12m:2025-06``: 12 meses moviles que terminan en junio 2025.
+
+``comparar`` recibe dos tablas de KPIs con el mismo indice (una fila por
+unidad, o por unidad y mes) y calcula de una vez, para todas las filas y
+columnas, la diferencia absoluta, la relativa (fraccion; NaN si el valor de
+referencia es 0) y, para los KPIs que ya son porcentajes, la diferencia en
+puntos porcentuales. Las tarjetas de indicadores y las barras de diferencia
+mensual de los dashboards salen de ese resultado, de modo que cambiar el par
+de periodos (``--periodo=`` / ``--contra=``) no requiere tocar el codigo.
+"""
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun',
+         'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+_PATRON = re.compile(r'^(?:(?P<anio>\d{4})(?:T(?P<trimestre>[1-4]))?|12m:(?P<fin>\d{4})-(?P<mes>\d{2}))$')
+
+
+def _periodo(tipo, etiqueta, desde, hasta):
+    return {'tipo': tipo, 'etiqueta': etiqueta, 'desde': pd.Timestamp(desde), 'hasta': pd.Timestamp(hasta)}
+
+
+def periodo_anio(anio):
+    return _periodo('anio', str(anio), f'{anio}-01-01', f'{anio + 1}-01-01')
+
+
+def periodo_trimestre(anio, trimestre):
+    desde = pd.Timestamp(anio, 3 * (trimestre - 1) + 1, 1)
+    return _periodo('trimestre', f'{anio}T{trimestre}', desde, desde + pd.DateOffset(months=3))
+
+
+def periodo_movil(anio, mes):
+    """12 meses moviles que terminan en `mes` de `anio` (incluido)."""
+    hasta = pd.Timestamp(anio, mes, 1) + pd.DateOffset(months=1)
+    return _periodo('movil12', f'12m:{anio}-{mes:02d}', hasta - pd.DateOffset(months=12), hasta)
+
+
+def leer_periodo(texto):
+    """'2025', '2025T3' o '12m:2025-06' -> periodo."""
+    m = _PATRON.match(str(texto).strip())
+    if not m:
+        raise ValueError(f"Periodo no reconocido: {texto!r} (ej: 2025, 2025T3, 12m:2025-06)")
+    if m['fin']:
+        return periodo_movil(int(m['fin']), int(m['mes']))
+    if m['trimestre']:
+        return periodo_trimestre(int(m['anio']), int(m['trimestre']))
+    return periodo_anio(int(m['anio']))
+
+
+def periodo_anterior(periodo):
+    """El periodo equivalente un anio antes (misma duracion y meses)."""
+    if periodo['tipo'] == 'anio':
+        return periodo_anio(periodo['desde'].year - 1)
+    if periodo['tipo'] == 'trimestre':
+        return periodo_trimestre(periodo['desde'].year - 1, periodo['desde'].month // 3 + 1)
+    fin = periodo['hasta'] - pd.DateOffset(years=1, months=1)
+    return periodo_movil(fin.year, fin.month)
+
+
+def meses_periodo(periodo):
+    """Periodos mensuales (tipo 'mes', etiqueta 'AAAA-MM') que forman `periodo`, en orden."""
+    inicios = pd.date_range(periodo['desde'], periodo['hasta'], freq='MS', inclusive='left')
+    return [_periodo('mes', f'{d.year}-{d.month:02d}', d, d + pd.DateOffset(months=1)) for d in inicios]
+
+
+def nombre_mes(periodo_mes, con_anio=False):
+    """'Ene' o 'Ene 2025' para un periodo mensual."""
+    d = periodo_mes['desde']
+    return f'{MESES[d.month - 1]} {d.year}' if con_anio else MESES[d.month - 1]
+
+
+def filtrar(df, periodo, col_fecha='FECHA_CATEGORIZACION'):
+    """Filas de `df` cuya fecha cae en el periodo."""
+    fechas = df[col_fecha]
+    return df[(fechas >= periodo['desde']) & (fechas < periodo['hasta'])]
+
+
+def periodos_elegidos(defecto, argv=None):
+    """
+    (actual, referencia) segun --periodo=<texto> y --contra=<texto> en argv.
+    Sin --periodo se usa `defecto`; sin --contra, el mismo periodo un anio antes.
+    """
+    argv = sys.argv if argv is None else argv
+    textos = {'--periodo': None, '--contra': None}
+    for arg in argv:
+        clave, _, valor = arg.partition('=')
+        if clave in textos and valor:
+            textos[clave] = valor
+    actual = leer_periodo(textos['--periodo']) if textos['--periodo'] else defecto
+    referencia = leer_periodo(textos['--contra']) if textos['--contra'] else periodo_anterior(actual)
+    return actual, referencia
+
+
+def comparar(actual, referencia, porcentajes=()):
+    """
+    actual, referencia: DataFrames de KPIs con el mismo indice y columnas.
+    Devuelve un DataFrame indexado por (indice original..., KPI) con ACTUAL,
+    REFERENCIA, ABS, REL (fraccion, NaN si la referencia es 0) y PP (solo para
+    las columnas en `porcentajes`, ya expresadas en %).
+    """
+    referencia = referencia.reindex(index=actual.index, columns=actual.columns)
+    a = actual.to_numpy(dtype=float)
+    r = referencia.to_numpy(dtype=float)
+    dif = a - r
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel = np.where(r != 0, dif / r, np.nan)
+    es_pct = np.isin(actual.columns, list(porcentajes))
+    pp = np.where(es_pct, dif, np.nan)
+
+    filas = actual.index
+    nombres = list(filas.names) if isinstance(filas, pd.MultiIndex) else [filas.name or 'FILA']
+    indice = pd.MultiIndex.from_arrays(
+        [*(np.repeat(filas.get_level_values(i), a.shape[1]) for i in range(filas.nlevels)),
+         np.tile(actual.columns.to_numpy(), a.shape[0])],
+        names=[*nombres, 'KPI'])
+    return pd.DataFrame({
+        'ACTUAL': a.ravel(), 'REFERENCIA': r.ravel(),
+        'ABS': dif.ravel(), 'REL': rel.ravel(), 'PP': pp.ravel(),
+    }, index=indice)
@@ -0,0 +1,154 @@
+"""
+Cubos diarios de categorizaciones para filtrar en el navegador
+==============================================================
+``calcular_cubos`` resume las categorizaciones CUDYR en arreglos por
+unidad x dia x categoria, y ``escribir_cubos`` los deja en ``cubos.json`` /
+``cubos.js`` junto a ``explorador.html``. En esa pagina el usuario elige un
+rango de fechas y las unidades, y ``static/explorador.js`` vuelve a sumar los
+cubos con arreglos tipados, sin servidor ni regenerar nada.
+
+Contenido del cubo (los arreglos van en base64, little-endian):
+
+- ``conteos``: categorizaciones por (unidad, dia, categoria), indice
+  ``(u * n_dias + d) * n_categorias + c``. La ultima categoria (null) son las
+  filas sin categoria: cuentan en el total pero no en la distribucion.
+- ``pacientes``: para cada (unidad, dia), la lista de codigos de paciente
+  (``COD_PACIENTE``, ver ``pacientes.py``) en formato CSR (``inicios`` +
+  ``codigos``). Con esas listas los pacientes unicos de cualquier rango son
+  exactos (se marcan en un Uint8Array), no una estimacion: a este volumen las
+  listas ocupan menos que un HyperLogLog por dia.
+
+``resumir`` hace en Python la misma agregacion que el navegador y
+``verificar`` la compara con el snapshot de KPIs por unidad y anio.
+"""
+import base64
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.exportar import activo_con_hash, escribir_artefacto
+
+VERSION_CUBOS = 1
+EXPLORADOR_JS = Path(__file__).resolve().parent / 'static' / 'explorador.js'
+ORIGEN = pd.Timestamp('1970-01-01')
+
+
+def _codificar(arr):
+    """{'tipo': 'uint16'|'uint32', 'b64': ...} con el tipo mas chico que alcanza."""
+    arr = np.asarray(arr)
+    tipo = 'uint16' if arr.size == 0 or arr.max() < 2 ** 16 else 'uint32'
+    datos = np.ascontiguousarray(arr, dtype='<u2' if tipo == 'uint16' else '<u4').tobytes()
+    return {'tipo': tipo, 'b64': base64.b64encode(datos).decode('ascii')}
+
+
+def _decodificar(arreglo):
+    tipo = '<u2' if arreglo['tipo'] == 'uint16' else '<u4'
+    return np.frombuffer(base64.b64decode(arreglo['b64']), dtype=tipo).astype(np.int64)
+
+
+def calcular_cubos(datasets):
+    """
+    datasets: dict {(unidad, anio): DataFrame} con FECHA_CATEGORIZACION,
+    CATEGORIA y COD_PACIENTE. Devuelve el cubo serializable (ver modulo).
+    """
+    partes = [df[['FECHA_CATEGORIZACION', 'CATEGORIA', 'COD_PACIENTE']].assign(UNIDAD=unidad)
+              for (unidad, _), df in datasets.items()]
+    df = pd.concat(partes, ignore_index=True)
+    df = df[df['FECHA_CATEGORIZACION'].notna()]
+
+    u_cod, unidades = pd.factorize(df['UNIDAD'], sort=True)
+    c_cod, categorias = pd.factorize(df['CATEGORIA'], sort=True)
+    n_cat = len(categorias) + 1
+    c_cod = np.where(c_cod < 0, n_cat - 1, c_cod)
+
+    dias = ((df['FECHA_CATEGORIZACION'].dt.normalize() - ORIGEN) // pd.Timedelta(days=1)).to_numpy()
+    dia0 = int(dias.min()) if len(dias) else 0
+    n_dias = int(dias.max()) - dia0 + 1 if len(dias) else 0
+    d_cod = dias - dia0
+
+    fila = u_cod.astype(np.int64) * n_dias + d_cod
+    conteos = np.bincount(fila * n_cat + c_cod, minlength=len(unidades) * n_dias * n_cat)
+
+    # CSR de pacientes por (unidad, dia): pares unicos ordenados por fila y codigo
+    cod = df['COD_PACIENTE'].to_numpy(dtype=np.int64)
+    validos = cod >= 0
+    n_pac = int(cod[validos].max()) + 1 if validos.any() else 0
+    pares = np.unique(fila[validos] * max(n_pac, 1) + cod[validos])
+    filas_par = pares // max(n_pac, 1)
+    inicios = np.r_[0, np.cumsum(np.bincount(filas_par, minlength=len(unidades) * n_dias))]
+
+    return {
+        'version': VERSION_CUBOS,
+        'dia0': (ORIGEN + pd.Timedelta(days=dia0)).strftime('%Y-%m-%d'),
+        'n_dias': n_dias,
+        'unidades': [str(u) for u in unidades],
+        'categorias': [str(c) for c in categorias] + [None],
+        'n_pacientes': n_pac,
+        'conteos': _codificar(conteos),
+        'pacientes': {
+            'inicios': _codificar(inicios),
+            'codigos': _codificar(pares % max(n_pac, 1)),
+        },
+    }
+
+
+def escribir_cubos(cubos, directorio='.'):
+    """Escribe cubos.json y cubos.js (solo si cambiaron) y publica explorador.js con hash."""
+    directorio = Path(directorio)
+    texto = json.dumps(cubos, ensure_ascii=False, separators=(',', ':'))
+    escribir_artefacto(directorio / 'cubos.json', texto)
+    escribir_artefacto(directorio / 'cubos.js', f'window.CUBOS = {texto};\n')
+    activo_con_hash(EXPLORADOR_JS, directorio)
+    return directorio / 'cubos.json'
+
+
+def resumir(cubos, desde=None, hasta=None, unidades=None):
+    """
+    Misma agregacion que explorador.js para el rango [desde, hasta] (fechas,
+    inclusive) y las unidades dadas (todas si None).
+    """
+    n_dias, nombres, categorias = cubos['n_dias'], cubos['unidades'], cubos['categorias']
+    dia0 = pd.Timestamp(cubos['dia0'])
+    d0 = 0 if desde is None else max(0, (pd.Timestamp(desde) - dia0).days)
+    d1 = n_dias - 1 if hasta is None else min(n_dias - 1, (pd.Timestamp(hasta) - dia0).days)
+    elegidas = [nombres.index(u) for u in (unidades or nombres) if u in nombres]
+
+    conteos = _decodificar(cubos['conteos']).reshape(len(nombres), n_dias, len(categorias))
+    inicios = _decodificar(cubos['pacientes']['inicios'])
+    codigos = _decodificar(cubos['pacientes']['codigos'])
+
+    por_categoria = conteos[elegidas, d0:d1 + 1].sum(axis=(0, 1)) if d1 >= d0 else \
+        np.zeros(len(categorias), dtype=np.int64)
+    tramos = [codigos[inicios[u * n_dias + d0]:inicios[u * n_dias + d1 + 1]]
+              for u in elegidas if d1 >= d0]
+    pacientes = len(np.unique(np.concatenate(tramos))) if tramos else 0
+
+    etiquetas = [str(c) if c is not None else '' for c in categorias]
+    es_cat = np.array([c is not None for c in categorias])
+    alto = np.array([e[:1] in ('A', 'B') for e in etiquetas]) & es_cat
+    return {
+        'total': int(por_categoria.sum()),
+        'pacientes': pacientes,
+        'alto_riesgo': int(por_categoria[alto].sum()),
+        'a1': int(por_categoria[np.array(etiquetas) == 'A1'].sum()),
+        'categorias': {c: int(v) for c, v, ok in zip(etiquetas, por_categoria, es_cat) if ok and v},
+    }
+
+
+def verificar(cubos, snapshot):
+    """
+    Compara `resumir` por unidad y anio completo con el snapshot de KPIs.
+    Devuelve la lista de diferencias (vacia si coinciden).
+    """
+    diferencias = []
+    for unidad, por_anio in snapshot['unidades'].items():
+        for anio, k in por_anio.items():
+            if not anio.isdigit():
+                continue
+            r = resumir(cubos, f'{anio}-01-01', f'{anio}-12-31', [unidad])
+            for campo in ('total', 'pacientes', 'alto_riesgo', 'a1', 'categorias'):
+                if r[campo] != k[campo]:
+                    diferencias.append((unidad, anio, campo, r[campo], k[campo]))
+    return diferencias
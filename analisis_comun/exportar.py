@@ -0,0 +1,204 @@
+"""
+Exportacion de artefactos: hash de contenido, escritura condicional y precompresion
+===================================================================================
+Cada HTML/JS/JSON generado se escribe con ``escribir_artefacto`` (o
+``escribir_por_trozos`` para las plantillas renderizadas en streaming):
+
+- se calcula el SHA-256 del contenido y, si el archivo existente es identico,
+  no se toca (el mtime no cambia y el servidor web mantiene su ETag y cache),
+- si cambio, se reemplaza de forma atomica (archivo temporal + replace) y se
+  escriben los hermanos precomprimidos ``.gz`` (gzip 9, sin fecha en el
+  encabezado para que sea reproducible) y ``.br`` (si el paquete ``brotli``
+  esta instalado). Un ``.br`` de una version anterior se elimina si ya no se
+  puede regenerar, para no servir contenido desactualizado.
+
+Los recursos estaticos que no cambian entre ejecuciones (``render_kpis.js``)
+se publican con el hash en el nombre (``activo_con_hash``), de modo que el
+servidor puede mandarlos con cache de larga duracion; ``renderizar`` entrega a
+las plantillas el diccionario ``activos`` con los nombres vigentes.
+
+Todo queda registrado en ``manifiesto.json`` en cada carpeta de salida: por
+artefacto, hash, bytes sin comprimir, bytes .gz y .br; y el mapa de activos.
+
+Las caches intermedias de ``cache/`` (curvas KM, pivotes de camas, flujo,
+pronosticos) usan ``hash_dataset`` como clave y ``guardar_json`` para
+escribirse de forma atomica, sin depender del modulo que las calcula.
+"""
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+ARCHIVO_MANIFIESTO = 'manifiesto.json'
+VERSION_MANIFIESTO = 1
+NIVEL_GZIP = 9
+CALIDAD_BROTLI = 11
+LARGO_HASH_ACTIVO = 8
+EXTENSIONES_COMPRIMIBLES = ('.html', '.js', '.json', '.css', '.csv', '.svg')
+
+
+def brotli_disponible():
+    return importlib.util.find_spec('brotli') is not None
+
+
+def hash_contenido(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def hash_archivo(ruta):
+    """SHA-256 de un archivo (None si no existe)."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def hash_dataset(df, columnas):
+    """Huella estable del contenido de las columnas usadas (clave de las caches)."""
+    import pandas as pd  # solo lo necesitan los llamadores, que ya trabajan con DataFrames
+    h = pd.util.hash_pandas_object(df[list(columnas)], index=False).to_numpy()
+    return hashlib.sha1(h.tobytes()).hexdigest()[:16]
+
+
+def guardar_json(ruta, datos):
+    """Escribe `datos` como JSON compacto de forma atomica, creando la carpeta si falta."""
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    texto = json.dumps(datos, ensure_ascii=False, separators=(',', ':'))
+    _escribir_atomico(ruta, texto.encode('utf-8'))
+    return ruta
+
+
+def leer_manifiesto(directorio='.'):
+    ruta = Path(directorio) / ARCHIVO_MANIFIESTO
+    if ruta.exists():
+        with open(ruta, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        if manifiesto.get('version') == VERSION_MANIFIESTO:
+            return manifiesto
+    return {'version': VERSION_MANIFIESTO, 'artefactos': {}, 'activos': {}}
+
+
+def _escribir_atomico(ruta, datos):
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+def _guardar_manifiesto(directorio, manifiesto):
+    datos = json.dumps(manifiesto, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8')
+    ruta = Path(directorio) / ARCHIVO_MANIFIESTO
+    if hash_archivo(ruta) != hash_contenido(datos):
+        _escribir_atomico(ruta, datos)
+
+
+def _precomprimir(ruta, datos):
+    """Escribe ruta.gz y ruta.br; devuelve sus tamanos (None si no se genero)."""
+    gz = gzip.compress(datos, compresslevel=NIVEL_GZIP, mtime=0)
+    _escribir_atomico(ruta.with_name(ruta.name + '.gz'), gz)
+    ruta_br = ruta.with_name(ruta.name + '.br')
+    if brotli_disponible():
+        import brotli
+        br = brotli.compress(datos, quality=CALIDAD_BROTLI)
+        _escribir_atomico(ruta_br, br)
+        return len(gz), len(br)
+    ruta_br.unlink(missing_ok=True)
+    return len(gz), None
+
+
+def _registrar(ruta, sha, n_bytes, tamanos):
+    manifiesto = leer_manifiesto(ruta.parent)
+    manifiesto['artefactos'][ruta.name] = {
+        'sha256': sha, 'bytes': n_bytes, 'gz': tamanos[0], 'br': tamanos[1],
+    }
+    _guardar_manifiesto(ruta.parent, manifiesto)
+
+
+def _comprimible(ruta, comprimir):
+    return comprimir and ruta.suffix.lower() in EXTENSIONES_COMPRIMIBLES
+
+
+def _hermanos_al_dia(ruta, comprimir):
+    """Los .gz (y .br si hay brotli) existen, o no se pidieron."""
+    if not _comprimible(ruta, comprimir):
+        return True
+    sufijos = ['.gz', '.br'] if brotli_disponible() else ['.gz']
+    return all(ruta.with_name(ruta.name + s).exists() for s in sufijos)
+
+
+def escribir_artefacto(ruta, contenido, comprimir=True):
+    """
+    Escribe `contenido` (str o bytes) en `ruta` solo si cambio. Devuelve True
+    si se escribio, False si el archivo existente ya era identico.
+    """
+    ruta = Path(ruta)
+    datos = contenido.encode('utf-8') if isinstance(contenido, str) else contenido
+    sha = hash_contenido(datos)
+    if hash_archivo(ruta) == sha and _hermanos_al_dia(ruta, comprimir):
+        return False
+    _escribir_atomico(ruta, datos)
+    tamanos = _precomprimir(ruta, datos) if _comprimible(ruta, comprimir) else (None, None)
+    _registrar(ruta, sha, len(datos), tamanos)
+    return True
+
+
+def escribir_por_trozos(ruta, trozos, comprimir=True):
+    """
+    Como escribir_artefacto, pero consumiendo un iterable de str (p. ej.
+    Template.generate()) sin armar el documento en memoria: se escribe a un
+    temporal calculando el hash y se descarta si coincide con el existente.
+    """
+    ruta = Path(ruta)
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    h = hashlib.sha256()
+    n_bytes = 0
+    with open(temporal, 'wb') as f:
+        for trozo in trozos:
+            datos = trozo.encode('utf-8')
+            h.update(datos)
+            n_bytes += len(datos)
+            f.write(datos)
+    sha = h.hexdigest()
+    if hash_archivo(ruta) == sha and _hermanos_al_dia(ruta, comprimir):
+        temporal.unlink()
+        return False
+    os.replace(temporal, ruta)
+    tamanos = (_precomprimir(ruta, ruta.read_bytes()) if _comprimible(ruta, comprimir)
+               else (None, None))
+    _registrar(ruta, sha, n_bytes, tamanos)
+    return True
+
+
+def activo_con_hash(origen, directorio='.'):
+    """
+    Publica el archivo `origen` en `directorio` como <nombre>.<hash>.<ext>,
+    lo registra en manifiesto['activos'] y borra las versiones anteriores.
+    Devuelve el nombre publicado.
+    """
+    origen, directorio = Path(origen), Path(directorio)
+    datos = origen.read_bytes()
+    sha = hash_contenido(datos)
+    nombre = f'{origen.stem}.{sha[:LARGO_HASH_ACTIVO]}{origen.suffix}'
+    escribir_artefacto(directorio / nombre, datos)
+
+    manifiesto = leer_manifiesto(directorio)
+    anterior = manifiesto['activos'].get(origen.name)
+    if anterior and anterior != nombre:
+        for sufijo in ('', '.gz', '.br'):
+            (directorio / (anterior + sufijo)).unlink(missing_ok=True)
+        manifiesto['artefactos'].pop(anterior, None)
+    manifiesto['activos'][origen.name] = nombre
+    _guardar_manifiesto(directorio, manifiesto)
+    return nombre
+
+
+def activos(directorio='.'):
+    """{nombre logico: nombre con hash} de los activos publicados en `directorio`."""
+    return dict(leer_manifiesto(directorio)['activos'])
@@ -0,0 +1,149 @@
+"""
+Flujo de pacientes: procedencia -> UTI -> destino (Sankey)
+==========================================================
+``tabla_flujo`` cuenta con un solo ``groupby`` las estadias por (MES, PROC_GRUPO,
+UTI, DEST_GRUPO); es la tabla de enlaces mas fina y todo lo demas se obtiene
+sumandola: los totales de una o varias UTI, un rango de meses o solo la
+procedencia o el destino (``enlaces``, ``conteos``). Los valores faltantes
+quedan como SIN DATO en lugar de perderse en el conteo.
+
+``flujo_en_cache`` guarda la tabla en ``cache/flujo_<hash>.json`` segun el
+contenido de las columnas usadas, en formato columnar (etiquetas una vez y
+codigos enteros por fila), asi ambos scripts de estadistica la calculan una
+sola vez. ``figura_sankey`` dibuja una unica traza Sankey: nodos de
+procedencia, de UTI y de destino, y enlaces con listas de enteros
+(source/target/value) coloreados por UTI.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.exportar import guardar_json, hash_dataset
+from analisis_comun.perezoso import importar_perezoso
+
+go = importar_perezoso('plotly.graph_objects')
+
+NIVELES_FLUJO = ('MES', 'PROC_GRUPO', 'UTI', 'DEST_GRUPO')
+SIN_DATO = 'SIN DATO'
+
+
+def tabla_flujo(df, col_origen='PROC_GRUPO', col_unidad='UTI', col_destino='DEST_GRUPO',
+                col_fecha='INGRESO'):
+    """
+    DataFrame MES ('AAAA-MM' del ingreso), PROC_GRUPO, UTI, DEST_GRUPO, N con
+    una fila por combinacion presente, ordenado por esas columnas.
+    """
+    def texto(col):
+        return df[col].astype('string').str.strip().replace('', pd.NA).fillna(SIN_DATO)
+
+    base = pd.DataFrame({
+        'MES': pd.to_datetime(df[col_fecha]).dt.to_period('M').astype('string').fillna(SIN_DATO),
+        'PROC_GRUPO': texto(col_origen),
+        'UTI': texto(col_unidad),
+        'DEST_GRUPO': texto(col_destino),
+    })
+    return base.groupby(list(NIVELES_FLUJO), sort=True).size().rename('N').reset_index()
+
+
+def _a_json(tabla):
+    datos = {'n': tabla['N'].to_numpy(dtype=np.int64).tolist()}
+    for col in NIVELES_FLUJO:
+        codigos, etiquetas = pd.factorize(tabla[col], sort=True)
+        datos[col] = {'etiquetas': [str(e) for e in etiquetas], 'codigos': codigos.tolist()}
+    return datos
+
+
+def _desde_json(datos):
+    columnas = {col: np.asarray(datos[col]['etiquetas'], dtype=object)[datos[col]['codigos']]
+                for col in NIVELES_FLUJO}
+    return pd.DataFrame({**columnas, 'N': np.asarray(datos['n'], dtype=np.int64)})
+
+
+def flujo_en_cache(df, cache_dir='cache', **kwargs):
+    """
+    tabla_flujo leida de cache/flujo_<hash>.json si las columnas usadas no
+    cambiaron. Al recalcular se borran las versiones anteriores.
+    """
+    columnas = [kwargs.get('col_fecha', 'INGRESO'), kwargs.get('col_origen', 'PROC_GRUPO'),
+                kwargs.get('col_unidad', 'UTI'), kwargs.get('col_destino', 'DEST_GRUPO')]
+    directorio = Path(cache_dir)
+    ruta = directorio / f'flujo_{hash_dataset(df, columnas)}.json'
+    if ruta.exists():
+        with open(ruta, encoding='utf-8') as f:
+            return _desde_json(json.load(f))
+    tabla = tabla_flujo(df, **kwargs)
+    for vieja in directorio.glob('flujo_*.json'):
+        vieja.unlink()
+    guardar_json(ruta, _a_json(tabla))
+    return tabla
+
+
+def enlaces(tabla, unidades=None, desde=None, hasta=None):
+    """
+    Filas de la tabla de flujo de `unidades` (todas si es None) con MES entre
+    `desde` y `hasta` ('AAAA-MM', ambos incluidos), sumadas sobre los meses.
+    """
+    sel = tabla
+    if unidades is not None:
+        sel = sel[sel['UTI'].isin(list(unidades))]
+    if desde is not None:
+        sel = sel[sel['MES'] >= desde]
+    if hasta is not None:
+        sel = sel[sel['MES'] <= hasta]
+    return sel.groupby(['PROC_GRUPO', 'UTI', 'DEST_GRUPO'], sort=True)['N'].sum().reset_index()
+
+
+def conteos(tabla, columna, **filtros):
+    """Estadias por valor de `columna` (p. ej. PROC_GRUPO), de mayor a menor; filtros de `enlaces`."""
+    return enlaces(tabla, **filtros).groupby(columna)['N'].sum().sort_values(ascending=False, kind='stable')
+
+
+def _rgba(color, alfa):
+    color = color.lstrip('#')
+    r, g, b = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return f'rgba({r},{g},{b},{alfa})'
+
+
+def figura_sankey(tabla, colores, unidades=None, desde=None, hasta=None, titulo=None,
+                  alto=520, color_nodo='#95a5a6'):
+    """
+    Figura con una traza Sankey procedencia -> UTI -> destino. `colores`:
+    {UTI: '#rrggbb'} para los nodos de UTI y los enlaces que pasan por ella.
+    """
+    tramo = enlaces(tabla, unidades, desde, hasta)
+    entrada = tramo.groupby(['PROC_GRUPO', 'UTI'], sort=True)['N'].sum().reset_index()
+    salida = tramo.groupby(['UTI', 'DEST_GRUPO'], sort=True)['N'].sum().reset_index()
+
+    # Nodos: procedencias, UTI y destinos (mismo nombre en dos etapas = dos nodos)
+    origenes = conteos(tramo, 'PROC_GRUPO').index.tolist()
+    utis = sorted(tramo['UTI'].unique())
+    destinos = conteos(tramo, 'DEST_GRUPO').index.tolist()
+    n_o, n_u = len(origenes), len(utis)
+    pos_o = {v: i for i, v in enumerate(origenes)}
+    pos_u = {v: n_o + i for i, v in enumerate(utis)}
+    pos_d = {v: n_o + n_u + i for i, v in enumerate(destinos)}
+
+    fuente = np.concatenate([entrada['PROC_GRUPO'].map(pos_o), salida['UTI'].map(pos_u)])
+    destino = np.concatenate([entrada['UTI'].map(pos_u), salida['DEST_GRUPO'].map(pos_d)])
+    valor = np.concatenate([entrada['N'], salida['N']])
+    uti_enlace = np.concatenate([entrada['UTI'], salida['UTI']])
+
+    fig = go.Figure(go.Sankey(
+        arrangement='snap', valueformat=',d',
+        node=dict(
+            label=[*origenes, *utis, *destinos], pad=12, thickness=16,
+            color=[color_nodo] * n_o + [colores.get(u, color_nodo) for u in utis] + [color_nodo] * len(destinos),
+        ),
+        link=dict(
+            source=fuente.astype(int).tolist(), target=destino.astype(int).tolist(),
+            value=valor.astype(int).tolist(),
+            color=[_rgba(colores.get(u, color_nodo), 0.35) for u in uti_enlace],
+        ),
+    ))
+    fig.update_layout(
+        title=titulo or 'Flujo de Pacientes: Procedencia → UTI → Destino',
+        template='plotly_white', height=alto, margin=dict(t=60, b=30, l=20, r=20),
+    )
+    return fig
@@ -0,0 +1,238 @@
+"""
+Snapshot de KPIs de categorizacion CUDYR
+========================================
+Calcula en una sola pasada todas las metricas que muestran index.html y
+ambas_uti.html (por unidad, anio y mes) y las guarda en un archivo versionado
+``kpis.json``. Las paginas estaticas se rellenan en el navegador con
+``render_kpis.js``, de modo que refrescar las metricas solo reescribe el JSON.
+Los conteos, pacientes unicos, % A+B y A1 se declaran en
+``metricas.METRICAS_CUDYR`` y se calculan con el motor elegido
+(``--backend=`` o UTI_BACKEND).
+
+Las variaciones respecto del anio anterior se calculan con
+``comparacion.comparar`` sobre la tabla de KPIs escalares de todas las
+unidades y anios a la vez; ``tabla_kpis`` arma esa tabla para cualquier
+periodo (anio, trimestre, 12 meses moviles) y la usan los dashboards.
+
+El snapshot no lleva fecha de generacion sino ``datos``, un hash de las
+columnas usadas de todos los archivos: con los mismos datos el JSON es
+identico byte a byte y ``escribir_artefacto`` no lo reescribe.
+
+Tambien se escribe ``kpis.js`` (el mismo contenido asignado a window.KPIS)
+para que las paginas funcionen abiertas directamente desde disco (file://),
+donde el navegador bloquea fetch(). ``render_kpis.js`` se publica con el hash
+en el nombre (cache larga en el navegador); los datos conservan su nombre.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.comparacion import comparar, filtrar
+from analisis_comun.exportar import activo_con_hash, escribir_artefacto, hash_dataset
+from analisis_comun.metricas import METRICAS_CUDYR, calcular_metricas, como_dict
+from analisis_comun.pacientes import (
+    categorias_por_paciente, evolucion_pacientes, puntaje_cudyr,
+)
+
+VERSION_SNAPSHOT = 1
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun',
+         'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+RIESGO_LABELS = {'A': 'Maximo', 'B': 'Alto', 'C': 'Mediano', 'D': 'Bajo'}
+RENDER_JS = Path(__file__).resolve().parent / 'static' / 'render_kpis.js'
+# KPIs de un solo valor por periodo (los que se pueden comparar entre periodos)
+KPIS_ESCALARES = ['total', 'pacientes', 'alto_riesgo', 'pct_alto_riesgo', 'a1', 'cat_por_paciente',
+                  'pac_cambian', 'pct_cambian', 'con_evolucion', 'empeoran']
+KPIS_PORCENTAJE = ('pct_alto_riesgo', 'pct_cambian')
+# Columnas que lee el snapshot (las que entran en la huella de los datos)
+COLUMNAS_SNAPSHOT = ['COD_PACIENTE', 'CATEGORIA', 'FECHA_CATEGORIZACION', 'MES']
+
+
+def kpis_periodo(df, backend='pandas'):
+    """
+    Metricas de un DataFrame de categorizaciones (una unidad, un periodo). Los
+    conteos, pacientes, % A+B y A1 salen de metricas.METRICAS_CUDYR con el
+    motor `backend`; los cambios y la evolucion por paciente, de pacientes.py.
+    """
+    m = calcular_metricas(df, METRICAS_CUDYR, backend)
+    total, pacientes, alto_riesgo, a1 = (int(m[n]['VALOR'].iloc[0])
+                                         for n in ('total', 'pacientes', 'alto_riesgo', 'a1'))
+    cambios = categorias_por_paciente(df['COD_PACIENTE'], df['CATEGORIA'])
+    pac_cambian = int((cambios > 1).sum())
+    evol = evolucion_pacientes(df['COD_PACIENTE'], df['FECHA_CATEGORIZACION'],
+                               puntaje_cudyr(df['CATEGORIA']))
+    evol = evol[evol['n'] >= 2]
+
+    total_mes = como_dict(m['total_mes'], 'MES')
+    alto_riesgo_mes = como_dict(m['alto_riesgo_mes'], 'MES')
+    meses = {}
+    for mes in range(1, 13):
+        n = int(total_mes.get(str(mes), 0))
+        ar = int(alto_riesgo_mes.get(str(mes), 0))
+        meses[str(mes)] = {
+            'total': n,
+            'alto_riesgo': ar,
+            'pct_alto_riesgo': ar / n * 100 if n else 0.0,
+        }
+
+    dist = df['CATEGORIA'].value_counts()
+    return {
+        'total': total,
+        'pacientes': pacientes,
+        'alto_riesgo': alto_riesgo,
+        'pct_alto_riesgo': float(m['pct_alto_riesgo']['VALOR'].iloc[0]) * 100 if total else 0.0,
+        'a1': a1,
+        'cat_por_paciente': total / pacientes if pacientes else 0.0,
+        'pac_cambian': pac_cambian,
+        'pct_cambian': pac_cambian / pacientes * 100 if pacientes else 0.0,
+        'con_evolucion': len(evol),
+        'empeoran': int((evol['puntaje_final'] > evol['puntaje_inicial']).sum()),
+        'meses': meses,
+        'categorias': {str(c): int(v) for c, v in dist.items()},
+        'categorias_pct': {str(c): v / total * 100 for c, v in dist.items()},
+    }
+
+
+def tabla_kpis(datasets, periodos, col_fecha='FECHA_CATEGORIZACION', backend='pandas'):
+    """
+    KPIs escalares por unidad y periodo (ver comparacion.py): DataFrame
+    indexado por (UNIDAD, PERIODO) con las columnas KPIS_ESCALARES. Los
+    archivos de una unidad se unen antes de filtrar, asi un trimestre o 12
+    meses moviles pueden abarcar dos anios.
+    """
+    por_unidad = {}
+    for (unidad, _), df in datasets.items():
+        por_unidad.setdefault(unidad, []).append(df)
+    claves, filas = [], []
+    for unidad, partes in por_unidad.items():
+        df = pd.concat(partes, ignore_index=True)
+        for periodo in periodos:
+            k = kpis_periodo(filtrar(df, periodo, col_fecha), backend)
+            claves.append((unidad, periodo['etiqueta']))
+            filas.append([k[c] for c in KPIS_ESCALARES])
+    return pd.DataFrame(filas, columns=KPIS_ESCALARES,
+                        index=pd.MultiIndex.from_tuples(claves, names=['UNIDAD', 'PERIODO']))
+
+
+def variacion(comp):
+    """
+    Deltas de un periodo respecto del anterior (% relativo, pp o absoluto) a
+    partir de las filas de comparacion.comparar de una unidad (indice KPI).
+    Una variacion relativa sobre 0 se informa como 0.
+    """
+    rel = comp['REL'].fillna(0.0) * 100
+    dif = comp['ABS']
+    return {
+        'total_pct': float(rel['total']),
+        'total_abs': int(dif['total']),
+        'pacientes_pct': float(rel['pacientes']),
+        'alto_riesgo_pct': float(rel['alto_riesgo']),
+        'pct_alto_riesgo_pp': float(comp['PP']['pct_alto_riesgo']),
+        'a1_pct': float(rel['a1']),
+        'pac_cambian_pct': float(rel['pac_cambian']),
+        'meses': {str(m): int(dif[f'mes_{m}']) for m in range(1, 13)},
+    }
+
+
+def _variaciones(unidades):
+    """Compara cada (unidad, anio) con el anio previo de la misma unidad, todo en una tabla."""
+    filas = {}
+    for unidad, por_anio in unidades.items():
+        for anio, k in por_anio.items():
+            fila = {c: k[c] for c in KPIS_ESCALARES}
+            fila.update({f'mes_{m}': v['total'] for m, v in k['meses'].items()})
+            filas[(unidad, int(anio))] = fila
+    tabla = pd.DataFrame.from_dict(filas, orient='index')
+    con_previo = [(u, a) for u, a in tabla.index if (u, a - 1) in filas]
+    if not con_previo:
+        return {}
+    actual = tabla.loc[con_previo]
+    previo = tabla.loc[[(u, a - 1) for u, a in con_previo]].set_axis(actual.index)
+    comp = comparar(actual, previo, KPIS_PORCENTAJE)
+    return {(u, a): variacion(comp.xs((u, a), level=[0, 1])) for u, a in con_previo}
+
+
+def huella_datos(datasets):
+    """Hash de las columnas de COLUMNAS_SNAPSHOT de cada (unidad, anio), en orden."""
+    h = hashlib.sha1()
+    for (unidad, anio), df in sorted(datasets.items()):
+        columnas = [c for c in COLUMNAS_SNAPSHOT if c in df.columns]
+        h.update(f'{unidad}|{anio}|{hash_dataset(df, columnas)};'.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def _lista_categorias(nombres):
+    return [{'cat': c, 'riesgo': RIESGO_LABELS.get(c[0], '?')} for c in sorted(nombres)]
+
+
+def calcular_snapshot(datasets, backend='pandas'):
+    """
+    datasets: dict {(unidad, anio): DataFrame}. Devuelve el snapshot completo.
+    El periodo 'actual' es el anio mas reciente y 'anterior' el previo.
+    """
+    anios = sorted({anio for _, anio in datasets})
+    unidades = {}
+    for (unidad, anio), df in datasets.items():
+        unidades.setdefault(unidad, {})[str(anio)] = kpis_periodo(df, backend)
+
+    for (unidad, anio), var in _variaciones(unidades).items():
+        unidades[unidad][str(anio)]['variacion'] = var
+
+    for unidad, por_anio in unidades.items():
+        presentes = set()
+        for k in por_anio.values():
+            presentes.update(k['categorias'])
+        por_anio['categorias_presentes'] = _lista_categorias(presentes)
+
+    categorias_por_anio = {}
+    for anio in anios:
+        presentes = set()
+        for por_anio in unidades.values():
+            presentes.update(por_anio.get(str(anio), {}).get('categorias', {}))
+        categorias_por_anio[str(anio)] = _lista_categorias(presentes)
+
+    return {
+        'version': VERSION_SNAPSHOT,
+        'datos': huella_datos(datasets),
+        'periodo': {
+            'actual': anios[-1],
+            'anterior': anios[-2] if len(anios) > 1 else anios[-1],
+        },
+        'meses': [{'num': i, 'nombre': m} for i, m in enumerate(MESES, 1)],
+        'unidades': unidades,
+        'categorias_por_anio': categorias_por_anio,
+    }
+
+
+def _json_default(v):
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, np.floating):
+        return float(v)
+    raise TypeError(f'No serializable: {type(v)}')
+
+
+def escribir_snapshot(snapshot, directorio='.'):
+    """
+    Escribe kpis.json y kpis.js (solo si cambiaron) y publica render_kpis.js
+    con hash en el directorio de salida.
+    """
+    directorio = Path(directorio)
+    texto = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':'),
+                       default=_json_default)
+    escribir_artefacto(directorio / 'kpis.json', texto)
+    escribir_artefacto(directorio / 'kpis.js', f'window.KPIS = {texto};\n')
+    activo_con_hash(RENDER_JS, directorio)
+    return directorio / 'kpis.json'
+
+
+def leer_snapshot(ruta='kpis.json'):
+    """Carga un snapshot y verifica la version del formato."""
+    with open(ruta, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get('version') != VERSION_SNAPSHOT:
+        raise ValueError(f"Version de snapshot {snapshot.get('version')} no soportada "
+                         f"(se esperaba {VERSION_SNAPSHOT})")
+    return snapshot
@@ -0,0 +1,166 @@
+"""
+Lectura rapida y en paralelo de los Excel de categorizacion
+===========================================================
+``leer_excel`` prueba los motores de lectura en orden (calamine, escrito en
+Rust, y openpyxl como respaldo) y usa el primero que este instalado y pueda
+abrir el archivo.
+
+``leer_excels_paralelo`` lee varios libros a la vez, uno por proceso, de modo
+que el arranque en frio tarda lo que el archivo mas lento y no la suma. Cada
+proceso hijo es ``python -m analisis_comun.lectura`` y deja su resultado ya
+anonimizado en la cache pickle de ``leer_excel_anonimizado``; el proceso
+principal solo carga esos pickles. Asi los scripts del repositorio (codigo a
+nivel de modulo, sin ``if __name__ == '__main__'``) no se vuelven a ejecutar
+en los hijos, como ocurriria con multiprocessing en Windows o macOS.
+La clave se pasa a los hijos por variable de entorno, nunca por argumentos.
+
+Dentro de un proceso de larga vida (``analisis_comun.servidor``) los datasets
+ya leidos quedan en memoria (``en_memoria``, ``leer_csv``) con clave ruta,
+mtime y tamano: mientras el archivo no cambie no se vuelve a leer ni a
+deserializar. Cada llamada devuelve una copia, porque los scripts modifican
+sus DataFrames.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# engine de pandas -> modulo que lo implementa
+MOTORES_EXCEL = {
+    'calamine': 'python_calamine',
+    'openpyxl': 'openpyxl',
+}
+ORDEN_MOTORES = ('calamine', 'openpyxl')
+
+# (ruta, mtime_ns, tamano, extra...) -> objeto leido
+_MEMORIA = {}
+
+
+def motores_disponibles(motores=None):
+    """Motores de `motores` (o ORDEN_MOTORES) cuyo modulo esta instalado."""
+    motores = ORDEN_MOTORES if motores is None else motores
+    return [m for m in motores
+            if importlib.util.find_spec(MOTORES_EXCEL.get(m, m)) is not None]
+
+
+def leer_excel(ruta, motores=None, **kwargs):
+    """pd.read_excel con el primer motor disponible; si uno falla se prueba el siguiente."""
+    disponibles = motores_disponibles(motores)
+    if not disponibles:
+        raise ImportError(f"Ningun motor de Excel instalado ({', '.join(motores or ORDEN_MOTORES)})")
+    error = None
+    for motor in disponibles:
+        try:
+            return pd.read_excel(ruta, engine=motor, **kwargs)
+        except (ImportError, ValueError, OSError) as e:
+            error = e
+    raise error
+
+
+def _clave_memoria(ruta, *extra):
+    ruta = Path(ruta).resolve()
+    st = ruta.stat()
+    return (str(ruta), st.st_mtime_ns, st.st_size, *extra)
+
+
+def en_memoria(ruta, cargar, *extra):
+    """
+    Copia de ``cargar()`` guardada en memoria del proceso mientras `ruta` no
+    cambie (mtime y tamano). `extra` distingue lecturas del mismo archivo con
+    distintas opciones. Las versiones anteriores del archivo se descartan.
+    """
+    clave = _clave_memoria(ruta, *extra)
+    if clave not in _MEMORIA:
+        for vieja in [c for c in _MEMORIA if c[0] == clave[0] and c[1:3] != clave[1:3]]:
+            del _MEMORIA[vieja]
+        _MEMORIA[clave] = cargar()
+    return _MEMORIA[clave].copy()
+
+
+def leer_csv(ruta, **kwargs):
+    """pd.read_csv con memoria por proceso (ver ``en_memoria``)."""
+    return en_memoria(ruta, lambda: pd.read_csv(ruta, **kwargs), json.dumps(kwargs, sort_keys=True, default=str))
+
+
+def _normalizar(kwargs):
+    # Los hijos reciben kwargs como JSON: se normalizan igual en el padre para
+    # que ambos calculen el mismo nombre de cache (tuplas -> listas, etc.)
+    return json.loads(json.dumps(kwargs))
+
+
+def _leer_en_hijo(ruta, clave, cache_dir, motores, kwargs):
+    env = dict(os.environ)
+    from analisis_comun.anonimizacion import VARIABLE_CLAVE
+    env[VARIABLE_CLAVE] = clave.decode('utf-8')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(RAIZ), env.get('PYTHONPATH')]))
+    comando = [sys.executable, '-m', 'analisis_comun.lectura', str(ruta),
+               '--cache', str(cache_dir), '--kwargs', json.dumps(kwargs)]
+    if motores:
+        comando += ['--motores', ','.join(motores)]
+    return subprocess.run(comando, env=env, capture_output=True, text=True)
+
+
+def leer_excels_paralelo(rutas, clave, cache_dir='cache', max_procesos=None, motores=None, **kwargs):
+    """
+    Lee y anonimiza varios Excel en paralelo (un proceso por archivo, hasta
+    `max_procesos`). Devuelve los DataFrames en el mismo orden que `rutas`.
+    Los archivos que ya estan en cache no lanzan procesos.
+    """
+    from analisis_comun.anonimizacion import huella_clave, leer_excel_anonimizado, ruta_cache
+
+    kwargs = _normalizar(kwargs)
+    rutas = [Path(r) for r in rutas]
+    extra = (huella_clave(clave), json.dumps(kwargs, sort_keys=True), tuple(motores or ()))
+    if all(_clave_memoria(r, *extra) in _MEMORIA for r in rutas):
+        return [en_memoria(r, None, *extra) for r in rutas]
+    temporal = None
+    if cache_dir is None:
+        temporal = tempfile.TemporaryDirectory(prefix='uti_lectura_')
+        cache_dir = temporal.name
+    try:
+        pendientes = [r for r in rutas if _clave_memoria(r, *extra) not in _MEMORIA
+                      and not ruta_cache(r, clave, cache_dir, kwargs).exists()]
+        n_procesos = min(len(pendientes), max_procesos or os.cpu_count() or 1)
+        if n_procesos > 1:
+            with ThreadPoolExecutor(max_workers=n_procesos) as pool:
+                resultados = list(pool.map(
+                    lambda r: _leer_en_hijo(r, clave, cache_dir, motores, kwargs), pendientes))
+            for ruta, res in zip(pendientes, resultados):
+                if res.returncode != 0:
+                    # Se reintenta en este proceso para mostrar el error real
+                    print(f"    Aviso: lectura en paralelo de {ruta.name} fallo, se lee en serie",
+                          file=sys.stderr)
+        # Los que quedaron en cache se cargan del pickle; el resto se lee aqui
+        return [en_memoria(r, lambda r=r: leer_excel_anonimizado(
+                    r, clave, cache_dir=cache_dir, motores=motores, **kwargs), *extra)
+                for r in rutas]
+    finally:
+        if temporal is not None:
+            temporal.cleanup()
+
+
+def _main():
+    parser = argparse.ArgumentParser(description='Lee y anonimiza un Excel dejando el resultado en cache.')
+    parser.add_argument('ruta')
+    parser.add_argument('--cache', required=True)
+    parser.add_argument('--kwargs', default='{}')
+    parser.add_argument('--motores', default=None)
+    args = parser.parse_args()
+
+    from analisis_comun.anonimizacion import cargar_clave, leer_excel_anonimizado
+    motores = args.motores.split(',') if args.motores else None
+    leer_excel_anonimizado(args.ruta, cargar_clave(), cache_dir=args.cache, motores=motores,
+                           **json.loads(args.kwargs))
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,375 @@
+"""
+Capa de metricas con motor intercambiable (pandas / Polars / DuckDB)
+===================================================================
+Las metricas se declaran una sola vez como especificaciones (dicts) que no
+dependen del motor:
+
+    {'nombre': 'mortalidad_uti', 'tipo': 'proporcion', 'por': ['UTI'],
+     'condicion': ('FALLECIDO', 'in', [1])}
+
+Tipos: 'conteo' (filas), 'unicos' (valores distintos de `columna`), 'media'
+(de `columna`) y 'proporcion' (fraccion de filas que cumplen `condicion`).
+`filtro` restringe las filas antes de agrupar (operadores 'in' con una lista
+y '>=' con un valor) y `por` puede incluir
+'<columna>:mes' para agrupar por mes ('AAAA-MM') de una fecha. Las filas con
+clave nula quedan fuera (como en groupby y crosstab).
+
+Cada motor traduce las especificaciones a su propio plan: pandas (groupby),
+Polars LazyFrame (un plan por metrica, ejecutado con collect_all) o DuckDB
+embebido (una consulta SQL por metrica). Polars y DuckDB son opcionales; se
+usan si estan instalados. El motor se elige por ejecucion con
+``--backend=polars`` o la variable de entorno UTI_BACKEND.
+
+Todas las metricas devuelven un DataFrame con las columnas de `por` y VALOR,
+ordenado por las claves, para poder comparar motores.
+``python -m analisis_comun.metricas`` verifica la paridad de METRICAS_EDA y
+METRICAS_CUDYR en todos los motores instalados con datos de prueba propios
+(completos y vacios) y falla si alguno difiere de pandas; ``--paridad
+datos.csv`` repite la prueba con un CSV del EDA.
+
+METRICAS_EDA las usa el reporte estrategico y METRICAS_CUDYR
+``kpis.kpis_periodo`` (categorizaciones, pacientes, % A+B, A1 y conteos por
+mes de kpis.json). Los KPIs de trayectoria de cada paciente (cambios de
+categoria, evolucion del puntaje) siguen en ``kpis.py``.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.carga import CATEGORIAS_CUDYR
+
+VARIABLE_BACKEND = 'UTI_BACKEND'
+MODULOS_BACKEND = {'pandas': 'pandas', 'polars': 'polars', 'duckdb': 'duckdb'}
+ORDEN_BACKENDS = ('pandas', 'polars', 'duckdb')
+
+# Metricas del dataset EDA (estadias) que usan los dashboards estrategicos
+SEVERIDAD_MODERADA_O_MAS = ['Moderado (11-20)', 'Severo (21-30)', 'Muy severo (31+)']
+METRICAS_EDA = [
+    {'nombre': 'estadias_uti', 'tipo': 'conteo', 'por': ['UTI']},
+    {'nombre': 'ingresos_mes_uti', 'tipo': 'conteo', 'por': ['INGRESO:mes', 'UTI']},
+    {'nombre': 'severidad_uti', 'tipo': 'conteo', 'por': ['UTI', 'SEVERIDAD_APACHE']},
+    {'nombre': 'severidad_moderada_uti', 'tipo': 'proporcion', 'por': ['UTI'],
+     'condicion': ('SEVERIDAD_APACHE', 'in', SEVERIDAD_MODERADA_O_MAS)},
+    {'nombre': 'severidad_severa_uti', 'tipo': 'proporcion', 'por': ['UTI'],
+     'condicion': ('SEVERIDAD_APACHE', 'in', SEVERIDAD_MODERADA_O_MAS[1:])},
+    {'nombre': 'mortalidad_uti', 'tipo': 'media', 'columna': 'FALLECIDO', 'por': ['UTI']},
+    {'nombre': 'apache_medio_uti', 'tipo': 'media', 'columna': 'APACHE_II', 'por': ['UTI']},
+]
+
+# Metricas de categorizaciones CUDYR de un periodo (una unidad); las usa kpis.kpis_periodo
+CATEGORIAS_ALTO_RIESGO = [c for c in CATEGORIAS_CUDYR if c[0] in 'AB']
+METRICAS_CUDYR = [
+    {'nombre': 'total', 'tipo': 'conteo'},
+    {'nombre': 'pacientes', 'tipo': 'unicos', 'columna': 'COD_PACIENTE',
+     'filtro': ('COD_PACIENTE', '>=', 0)},
+    {'nombre': 'alto_riesgo', 'tipo': 'conteo', 'filtro': ('CATEGORIA', 'in', CATEGORIAS_ALTO_RIESGO)},
+    {'nombre': 'pct_alto_riesgo', 'tipo': 'proporcion',
+     'condicion': ('CATEGORIA', 'in', CATEGORIAS_ALTO_RIESGO)},
+    {'nombre': 'a1', 'tipo': 'conteo', 'filtro': ('CATEGORIA', 'in', ['A1'])},
+    {'nombre': 'total_mes', 'tipo': 'conteo', 'por': ['MES']},
+    {'nombre': 'alto_riesgo_mes', 'tipo': 'conteo', 'por': ['MES'],
+     'filtro': ('CATEGORIA', 'in', CATEGORIAS_ALTO_RIESGO)},
+]
+
+# Datos de prueba de paridad: claves y valores nulos, IDs faltantes y categorias no reconocidas
+PRUEBA_EDA = {
+    'UTI': ['UTINQX', 'UTINQX', 'UTIQX', 'UTIQX', 'UTIQX', None],
+    'INGRESO': pd.to_datetime(['2024-01-05', '2024-02-10', '2024-01-20', None, '2024-02-01', '2024-02-03']),
+    'SEVERIDAD_APACHE': ['Leve (0-10)', 'Severo (21-30)', None, 'Moderado (11-20)',
+                         'Muy severo (31+)', 'Leve (0-10)'],
+    'FALLECIDO': [0, 1, 0, 0, 1, 0],
+    'APACHE_II': [8.0, 25.0, np.nan, 14.0, 33.0, 5.0],
+}
+PRUEBA_CUDYR = {
+    'COD_PACIENTE': np.array([0, 0, 1, 2, -1, 3, 1], dtype=np.int32),
+    'CATEGORIA': ['A1', 'B2', 'C1', None, 'D3', 'X9', 'A3'],
+    'MES': [1, 1, 2, 2, 3, 3, 3],
+}
+
+
+def backends_disponibles(backends=None):
+    """Motores de `backends` (o ORDEN_BACKENDS) cuyo modulo esta instalado."""
+    backends = ORDEN_BACKENDS if backends is None else backends
+    return [b for b in backends if importlib.util.find_spec(MODULOS_BACKEND[b]) is not None]
+
+
+def backend_elegido(argv=None):
+    """--backend=<motor> en argv, o UTI_BACKEND, o pandas. Si no esta instalado se usa pandas."""
+    argv = sys.argv if argv is None else argv
+    elegido = os.environ.get(VARIABLE_BACKEND, 'pandas')
+    for arg in argv:
+        if arg.startswith('--backend='):
+            elegido = arg.split('=', 1)[1]
+    if elegido not in MODULOS_BACKEND:
+        raise ValueError(f"Backend desconocido: {elegido} (opciones: {', '.join(ORDEN_BACKENDS)})")
+    if elegido not in backends_disponibles([elegido]):
+        print(f"    Aviso: backend {elegido} no instalado, se usa pandas", file=sys.stderr)
+        return 'pandas'
+    return elegido
+
+
+def _columna_por(clave):
+    """'INGRESO:mes' -> ('INGRESO', 'mes', 'INGRESO_MES'); 'UTI' -> ('UTI', None, 'UTI')."""
+    if ':' in clave:
+        col, derivada = clave.split(':', 1)
+        return col, derivada, f'{col}_{derivada.upper()}'
+    return clave, None, clave
+
+
+def columnas_usadas(spec):
+    """Columnas del DataFrame que lee una especificacion (claves, columna, filtro y condicion)."""
+    columnas = [_columna_por(c)[0] for c in spec.get('por', [])]
+    if 'columna' in spec:
+        columnas.append(spec['columna'])
+    columnas += [spec[k][0] for k in ('filtro', 'condicion') if k in spec]
+    return list(dict.fromkeys(columnas))
+
+
+def _normalizar(resultado, spec):
+    por = [_columna_por(c)[2] for c in spec.get('por', [])]
+    resultado = resultado[por + ['VALOR']].copy()
+    for c in por:
+        resultado[c] = resultado[c].astype(str)
+    resultado['VALOR'] = resultado['VALOR'].astype(float)
+    return resultado.sort_values(por, ignore_index=True) if por else resultado.reset_index(drop=True)
+
+
+# ── pandas ───────────────────────────────────────────────────────
+
+def _mascara_pandas(df, condicion):
+    col, op, valores = condicion
+    if op == 'in':
+        return df[col].isin(valores).to_numpy()
+    if op == '>=':
+        return (df[col] >= valores).fillna(False).to_numpy(dtype=bool)
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+def _ejecutar_pandas(df, specs):
+    resultados = {}
+    for spec in specs:
+        datos = df[_mascara_pandas(df, spec['filtro'])] if 'filtro' in spec else df
+        claves = []
+        for clave in spec.get('por', []):
+            col, derivada, nombre = _columna_por(clave)
+            serie = datos[col]
+            if derivada == 'mes':
+                serie = pd.to_datetime(serie).dt.strftime('%Y-%m')
+            claves.append(serie.rename(nombre))
+        tipo = spec['tipo']
+        if tipo == 'conteo':
+            valores = pd.Series(1, index=datos.index)
+        elif tipo in ('unicos', 'media'):
+            valores = datos[spec['columna']]
+        elif tipo == 'proporcion':
+            valores = pd.Series(_mascara_pandas(datos, spec['condicion']).astype(float), index=datos.index)
+        else:
+            raise ValueError(f"Tipo de metrica desconocido: {tipo}")
+        agregacion = {'conteo': 'count', 'unicos': 'nunique', 'media': 'mean', 'proporcion': 'mean'}[tipo]
+        if claves:
+            r = valores.groupby(claves, observed=True).agg(agregacion)
+            r = r.rename('VALOR').reset_index()
+        else:
+            r = pd.DataFrame({'VALOR': [valores.agg(agregacion)]})
+        resultados[spec['nombre']] = _normalizar(r, spec)
+    return resultados
+
+
+# ── Polars (LazyFrame) ──────────────────────────────────────────
+
+def _a_polars(df, columnas):
+    """
+    DataFrame de Polars con `columnas` de df. Con pyarrow se usa from_pandas;
+    sin pyarrow cada columna se pasa como arreglo numpy (NaN -> nulo) o, si
+    es de texto u otro dtype de pandas, como lista con None en los faltantes.
+    """
+    import polars as pl
+
+    df = df[columnas]
+    if importlib.util.find_spec('pyarrow') is not None:
+        return pl.from_pandas(df)
+    series = []
+    for col in columnas:
+        s = df[col]
+        if isinstance(s.dtype, np.dtype) and s.dtype.kind in 'biufM':
+            series.append(pl.Series(col, s.to_numpy(), nan_to_null=s.dtype.kind == 'f'))
+        else:
+            series.append(pl.Series(col, s.astype(object).where(s.notna(), None).tolist()))
+    return pl.DataFrame(series)
+
+
+def _expr_polars(condicion):
+    import polars as pl
+
+    col, op, valores = condicion
+    if op == 'in':
+        return pl.col(col).is_in(valores).fill_null(False)
+    if op == '>=':
+        return (pl.col(col) >= valores).fill_null(False)
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+def _ejecutar_polars(df, specs):
+    import polars as pl
+
+    columnas = list(dict.fromkeys(c for spec in specs for c in columnas_usadas(spec)))
+    base = _a_polars(df, columnas).lazy()
+    planes = []
+    for spec in specs:
+        plan = base
+        if 'filtro' in spec:
+            plan = plan.filter(_expr_polars(spec['filtro']))
+        claves = []
+        for clave in spec.get('por', []):
+            col, derivada, nombre = _columna_por(clave)
+            expr = pl.col(col)
+            if derivada == 'mes':
+                expr = expr.cast(pl.Datetime).dt.strftime('%Y-%m')
+            plan = plan.filter(pl.col(col).is_not_null())
+            claves.append(expr.cast(pl.Utf8).alias(nombre))
+        tipo = spec['tipo']
+        if tipo == 'conteo':
+            agregado = pl.len()
+        elif tipo == 'unicos':
+            agregado = pl.col(spec['columna']).drop_nulls().n_unique()
+        elif tipo == 'media':
+            agregado = pl.col(spec['columna']).mean()
+        else:
+            agregado = _expr_polars(spec['condicion']).cast(pl.Float64).mean()
+        agregado = agregado.cast(pl.Float64).alias('VALOR')
+        plan = plan.group_by(claves).agg(agregado) if claves else plan.select(agregado)
+        planes.append(plan)
+    # Un solo collect_all: Polars comparte el escaneo de la base entre planes
+    tablas = pl.collect_all(planes)
+    # Los resultados son chicos: se pasan por dict para no depender de pyarrow
+    return {spec['nombre']: _normalizar(pd.DataFrame(t.to_dict(as_series=False)), spec)
+            for spec, t in zip(specs, tablas)}
+
+
+# ── DuckDB ──────────────────────────────────────────────────────
+
+def _sql_condicion(condicion, parametros):
+    col, op, valores = condicion
+    if op == 'in':
+        parametros.extend(valores)
+        return f'"{col}" IN ({", ".join("?" * len(valores))})'
+    if op == '>=':
+        parametros.append(valores)
+        return f'"{col}" >= ?'
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+def _ejecutar_duckdb(df, specs):
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        con.register('datos', df)
+        resultados = {}
+        for spec in specs:
+            parametros = []
+            claves = []
+            for clave in spec.get('por', []):
+                col, derivada, nombre = _columna_por(clave)
+                expr = f'strftime(CAST("{col}" AS TIMESTAMP), \'%Y-%m\')' if derivada == 'mes' else f'"{col}"'
+                claves.append((f'CAST({expr} AS VARCHAR)', nombre))
+            tipo = spec['tipo']
+            if tipo == 'conteo':
+                agregado = 'COUNT(*)'
+            elif tipo == 'unicos':
+                agregado = f'COUNT(DISTINCT "{spec["columna"]}")'
+            elif tipo == 'media':
+                agregado = f'AVG("{spec["columna"]}")'
+            else:
+                agregado = f'AVG(CASE WHEN {_sql_condicion(spec["condicion"], parametros)} THEN 1.0 ELSE 0.0 END)'
+            select = [f'{e} AS "{n}"' for e, n in claves] + [f'CAST({agregado} AS DOUBLE) AS VALOR']
+            sql = f'SELECT {", ".join(select)} FROM datos'
+            where = [f'"{_columna_por(c)[0]}" IS NOT NULL' for c in spec.get('por', [])]
+            if 'filtro' in spec:
+                where.append(_sql_condicion(spec['filtro'], parametros))
+            if where:
+                sql += f' WHERE {" AND ".join(where)}'
+            if claves:
+                sql += f' GROUP BY {", ".join(e for e, _ in claves)}'
+            resultados[spec['nombre']] = _normalizar(con.execute(sql, parametros).df(), spec)
+        return resultados
+    finally:
+        con.close()
+
+
+BACKENDS = {'pandas': _ejecutar_pandas, 'polars': _ejecutar_polars, 'duckdb': _ejecutar_duckdb}
+
+
+def calcular_metricas(df, specs, backend='pandas'):
+    """{nombre: DataFrame(por..., VALOR)} para cada especificacion de `specs`."""
+    return BACKENDS[backend](df, specs)
+
+
+def como_tabla(resultado, filas, columnas, relleno=0):
+    """Pivotea una metrica con dos claves (p. ej. UTI x SEVERIDAD) a una tabla ancha."""
+    return resultado.pivot(index=filas, columns=columnas, values='VALOR').fillna(relleno)
+
+
+def como_dict(resultado, clave):
+    """{valor de la clave: VALOR} para metricas con una sola clave."""
+    return dict(zip(resultado[clave], resultado['VALOR']))
+
+
+def verificar_paridad(df, specs, backends=None, rtol=1e-9):
+    """
+    Ejecuta las metricas en todos los motores instalados y devuelve la lista
+    de diferencias contra pandas (vacia si todos coinciden).
+    """
+    backends = backends_disponibles(backends)
+    referencia = calcular_metricas(df, specs, 'pandas')
+    diferencias = []
+    for backend in backends:
+        if backend == 'pandas':
+            continue
+        otro = calcular_metricas(df, specs, backend)
+        for nombre, esperado in referencia.items():
+            obtenido = otro[nombre]
+            claves = [c for c in esperado.columns if c != 'VALOR']
+            if not esperado[claves].equals(obtenido[claves]):
+                diferencias.append(f'{backend}/{nombre}: claves distintas')
+            elif not np.allclose(esperado['VALOR'], obtenido['VALOR'], rtol=rtol, equal_nan=True):
+                diferencias.append(f'{backend}/{nombre}: valores distintos')
+    return diferencias
+
+
+def paridad_prueba(backends=None):
+    """
+    verificar_paridad de METRICAS_EDA y METRICAS_CUDYR sobre PRUEBA_EDA y
+    PRUEBA_CUDYR, completos y sin filas. Lista vacia si todos coinciden.
+    """
+    diferencias = []
+    for nombre, datos, specs in (('eda', PRUEBA_EDA, METRICAS_EDA), ('cudyr', PRUEBA_CUDYR, METRICAS_CUDYR)):
+        df = pd.DataFrame(datos)
+        for caso, tabla in (('', df), (' (vacio)', df.iloc[:0])):
+            diferencias += [f'{nombre}{caso}: {d}' for d in verificar_paridad(tabla, specs, backends)]
+    return diferencias
+
+
+def _main():
+    parser = argparse.ArgumentParser(description='Compara las metricas entre motores (pandas, Polars, DuckDB).')
+    parser.add_argument('--paridad', help='CSV del dataset EDA (estadias); sin el, solo los datos de prueba')
+    args = parser.parse_args()
+
+    motores = backends_disponibles()
+    diferencias = paridad_prueba()
+    if args.paridad:
+        df = pd.read_csv(args.paridad, parse_dates=['INGRESO', 'EGRESO'])
+        diferencias += [f'csv: {d}' for d in verificar_paridad(df, METRICAS_EDA)]
+    print(f"Motores comparados: {', '.join(motores)}")
+    for d in diferencias:
+        print(f'  DIFERENCIA {d}')
+    print('Paridad OK' if not diferencias else f'{len(diferencias)} diferencias')
+    sys.exit(1 if diferencias else 0)
+
+
+if __name__ == '__main__':
+    _main()
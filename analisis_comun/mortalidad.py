@@ -0,0 +1,171 @@
+"""
+Mortalidad ajustada por riesgo: observada vs esperada por APACHE II (SMR)
+========================================================================
+Cada estadia recibe una probabilidad de muerte predicha con la ecuacion
+logistica de APACHE II:
+
+    logit = intercepto + coef_apache * APACHE_II + peso_dx[CATEGORIA_DX]
+
+calculada de forma vectorizada sobre todo el DataFrame. El SMR de un grupo es
+observados / esperados (suma de fallecidos / suma de probabilidades), con
+intervalo de confianza exacto de Poisson para los observados y limites de
+control de grafico de embudo (funnel plot) alrededor de SMR = 1.
+
+La tabla se arma en una sola agrupacion al nivel mas fino (UTI, mes,
+categoria diagnostica, severidad); los niveles agregados se obtienen sumando
+esa tabla chica, porque observados, esperados y n son aditivos. Los
+dashboards solo leen el resultado.
+"""
+import numpy as np
+import pandas as pd
+
+from analisis_comun.perezoso import importar_perezoso
+
+stats = importar_perezoso('scipy.stats')
+
+# Ecuacion de Knaus et al. (1985). El peso diagnostico original es por
+# diagnostico especifico; CATEGORIA_DX agrupa diagnosticos distintos, por eso
+# los pesos por defecto son 0 (ecuacion base). Ajustar segun el case-mix local.
+COEF_APACHE = {'intercepto': -3.517, 'apache': 0.146}
+PESOS_DX = {
+    'ONCOLÓGICO': 0.0, 'NEUROLÓGICO': 0.0, 'TRAUMÁTICO': 0.0,
+    'CARDIOVASCULAR': 0.0, 'INFECCIOSO': 0.0, 'RESPIRATORIO': 0.0,
+    'GASTROINTESTINAL': 0.0, 'RENAL/UROLÓGICO': 0.0, 'NO REGISTRADO': 0.0,
+}
+
+# Limites del embudo: 95% (2 DE) y 99.8% (3 DE)
+NIVELES_EMBUDO = (0.95, 0.998)
+
+# Dimensiones del nivel mas fino y agregaciones que se precalculan
+DIMENSIONES_SMR = ('UTI', 'MES', 'CATEGORIA_DX', 'SEVERIDAD_APACHE')
+NIVELES_SMR = (
+    ('UTI',),
+    ('UTI', 'MES'),
+    ('UTI', 'CATEGORIA_DX'),
+    ('UTI', 'SEVERIDAD_APACHE'),
+    ('UTI', 'MES', 'CATEGORIA_DX'),
+)
+TODOS = 'TODOS'
+
+
+def probabilidad_muerte(df, col_apache='APACHE_II', col_dx='CATEGORIA_DX',
+                        coeficientes=None, pesos_dx=None):
+    """Probabilidad de muerte predicha por estadia (NaN si falta APACHE II)."""
+    coef = COEF_APACHE if coeficientes is None else coeficientes
+    pesos = PESOS_DX if pesos_dx is None else pesos_dx
+    logit = coef['intercepto'] + coef['apache'] * df[col_apache].to_numpy(dtype=float)
+    if col_dx in df.columns and pesos:
+        # Un valor por categoria distinta, no por fila
+        codigos, categorias = pd.factorize(df[col_dx])
+        w = np.array([float(pesos.get(c, 0.0)) for c in categorias] + [0.0])
+        logit = logit + w[codigos]
+    return 1.0 / (1.0 + np.exp(-logit))
+
+
+def ic_poisson_exacto(observados, alfa=0.05):
+    """Intervalo exacto (Garwood) para un conteo de Poisson observado."""
+    o = np.asarray(observados, dtype=float)
+    inferior = np.where(o > 0, stats.chi2.ppf(alfa / 2, 2 * o) / 2, 0.0)
+    superior = stats.chi2.ppf(1 - alfa / 2, 2 * o + 2) / 2
+    return inferior, superior
+
+
+def limites_embudo(esperados, niveles=NIVELES_EMBUDO):
+    """
+    Limites de control del SMR para cada valor de esperados, bajo la hipotesis
+    SMR = 1 (observados ~ Poisson(esperados)). Devuelve {nivel: (inf, sup)}.
+    """
+    e = np.asarray(esperados, dtype=float)
+    con_e = e > 0
+    e_seguro = np.where(con_e, e, 1.0)
+    limites = {}
+    for nivel in niveles:
+        cola = (1 - nivel) / 2
+        inf = np.where(con_e, stats.poisson.ppf(cola, e_seguro) / e_seguro, np.nan)
+        sup = np.where(con_e, stats.poisson.ppf(1 - cola, e_seguro) / e_seguro, np.nan)
+        limites[nivel] = (inf, sup)
+    return limites
+
+
+def curvas_embudo(esperado_max, puntos=200, niveles=NIVELES_EMBUDO):
+    """Curvas del embudo (x = esperados) para dibujar detras de los puntos."""
+    x = np.linspace(max(esperado_max / puntos, 0.05), esperado_max, puntos)
+    return x, limites_embudo(x, niveles)
+
+
+def _nombre_nivel(nivel):
+    return '+'.join(nivel)
+
+
+def tabla_smr(df, col_fallecido='FALLECIDO', col_ingreso='INGRESO',
+              niveles=NIVELES_SMR, coeficientes=None, pesos_dx=None, alfa=0.05):
+    """
+    Tabla ordenada con una fila por grupo de cada nivel de NIVELES_SMR:
+    NIVEL, las columnas de DIMENSIONES_SMR (TODOS si el nivel no la usa), N,
+    OBSERVADOS, ESPERADOS, SMR, IC_INF, IC_SUP, TASA_OBSERVADA,
+    TASA_ESPERADA, los limites del embudo (LIM95_INF, LIM95_SUP, LIM998_INF,
+    LIM998_SUP) y FUERA_95 / FUERA_998 (-1 bajo, 0 dentro, 1 sobre).
+    Las estadias sin APACHE II no entran en el calculo.
+    """
+    base = pd.DataFrame({
+        'UTI': df['UTI'].astype(str),
+        'MES': pd.to_datetime(df[col_ingreso]).dt.to_period('M').astype(str),
+        'CATEGORIA_DX': df['CATEGORIA_DX'].astype(str) if 'CATEGORIA_DX' in df else TODOS,
+        'SEVERIDAD_APACHE': df['SEVERIDAD_APACHE'].astype(str) if 'SEVERIDAD_APACHE' in df else TODOS,
+        'OBSERVADOS': df[col_fallecido].to_numpy(dtype=float),
+        'ESPERADOS': probabilidad_muerte(df, coeficientes=coeficientes, pesos_dx=pesos_dx),
+    })
+    base = base[~np.isnan(base['ESPERADOS']) & base['OBSERVADOS'].notna()]
+    base['N'] = 1
+
+    # Unica pasada sobre las filas; los niveles agregados suman esta tabla
+    fina = base.groupby(list(DIMENSIONES_SMR), sort=True, observed=True)[
+        ['N', 'OBSERVADOS', 'ESPERADOS']].sum().reset_index()
+
+    partes = []
+    for nivel in niveles:
+        g = fina.groupby(list(nivel), sort=True)[['N', 'OBSERVADOS', 'ESPERADOS']].sum().reset_index()
+        for dim in DIMENSIONES_SMR:
+            if dim not in nivel:
+                g[dim] = TODOS
+        g.insert(0, 'NIVEL', _nombre_nivel(nivel))
+        partes.append(g)
+    tabla = pd.concat(partes, ignore_index=True)[
+        ['NIVEL', *DIMENSIONES_SMR, 'N', 'OBSERVADOS', 'ESPERADOS']]
+
+    o = tabla['OBSERVADOS'].to_numpy()
+    e = tabla['ESPERADOS'].to_numpy()
+    e_div = np.where(e > 0, e, np.nan)
+    ic_inf, ic_sup = ic_poisson_exacto(o, alfa)
+    tabla['N'] = tabla['N'].astype(np.int64)
+    tabla['OBSERVADOS'] = o.astype(np.int64)
+    tabla['SMR'] = o / e_div
+    tabla['IC_INF'] = ic_inf / e_div
+    tabla['IC_SUP'] = ic_sup / e_div
+    tabla['TASA_OBSERVADA'] = o / tabla['N'] * 100
+    tabla['TASA_ESPERADA'] = e / tabla['N'] * 100
+    for nivel, (inf, sup) in limites_embudo(e).items():
+        sufijo = f'{nivel * 100:g}'.replace('.', '')
+        tabla[f'LIM{sufijo}_INF'] = inf
+        tabla[f'LIM{sufijo}_SUP'] = sup
+        smr = tabla['SMR'].to_numpy()
+        tabla[f'FUERA_{sufijo}'] = np.where(smr > sup, 1, np.where(smr < inf, -1, 0))
+    return tabla
+
+
+def seleccionar(tabla, nivel, **filtros):
+    """Filas de un nivel (tupla o 'UTI+MES'), opcionalmente filtradas por dimension."""
+    nombre = nivel if isinstance(nivel, str) else _nombre_nivel(nivel)
+    sel = tabla[tabla['NIVEL'] == nombre]
+    for col, valor in filtros.items():
+        sel = sel[sel[col] == valor]
+    return sel
+
+
+def guardar_tabla_smr(tabla, ruta='eda_outputs/smr.csv'):
+    tabla.to_csv(ruta, index=False)
+    return ruta
+
+
+def leer_tabla_smr(ruta='eda_outputs/smr.csv'):
+    return pd.read_csv(ruta, dtype={d: str for d in DIMENSIONES_SMR})
@@ -0,0 +1,119 @@
+"""
+Deteccion de outliers por grupo y columna (IQR, MAD y z-score)
+==============================================================
+Los cuartiles de todas las combinaciones (grupo, columna) salen de un solo
+``groupby().quantile([0.25, 0.5, 0.75])``; media y desviacion de un solo
+``agg``. Los umbrales quedan en matrices grupos x columnas y se llevan a cada
+fila indexando por el codigo de grupo, de modo que las tres reglas se evaluan
+con broadcasting sobre la matriz filas x columnas, sin recorrer columnas ni
+unidades.
+
+- IQR: fuera de [Q1 - k*IQR, Q3 + k*IQR] (k = 1.5 por defecto).
+- MAD: |x - mediana| / (1.4826 * MAD) > 3.5 (z robusto de Iglewicz-Hoaglin).
+- z-score: |x - media| / DE > 3.
+
+En UCI los valores extremos suelen ser pacientes graves reales: la tabla
+sirve para documentarlos, no para eliminarlos.
+"""
+import numpy as np
+import pandas as pd
+
+FACTOR_IQR = 1.5
+UMBRAL_MAD = 3.5
+UMBRAL_Z = 3.0
+ESCALA_MAD = 1.4826
+METODOS = ('IQR', 'MAD', 'Z')
+
+
+def _estadisticos(df, columnas, grupo):
+    """Codigos de grupo, nombres y matrices (grupos x columnas) de cada estadistico."""
+    codigos, grupos = pd.factorize(df[grupo], sort=True)
+    valores = df[list(columnas)].to_numpy(dtype=float)
+    marco = pd.DataFrame(valores, columns=list(columnas))
+    validos = codigos >= 0
+    por_grupo = marco[validos].groupby(codigos[validos])
+
+    n_g, n_c = len(grupos), len(columnas)
+    cuartiles = por_grupo.quantile([0.25, 0.5, 0.75]).to_numpy().reshape(n_g, 3, n_c)
+    momentos = por_grupo.agg(['count', 'mean', 'std'])
+    est = {
+        'N': momentos.xs('count', axis=1, level=1).to_numpy(),
+        'MEDIA': momentos.xs('mean', axis=1, level=1).to_numpy(),
+        'DE': momentos.xs('std', axis=1, level=1).to_numpy(),
+        'Q1': cuartiles[:, 0], 'MEDIANA': cuartiles[:, 1], 'Q3': cuartiles[:, 2],
+    }
+    # MAD: mediana de |x - mediana del grupo|, con la mediana llevada a cada fila
+    desvio = np.abs(valores[validos] - est['MEDIANA'][codigos[validos]])
+    est['MAD'] = pd.DataFrame(desvio).groupby(codigos[validos]).median().to_numpy()
+    est['IQR'] = est['Q3'] - est['Q1']
+    return codigos, grupos, valores, est
+
+
+def _marcas(codigos, valores, est, factor_iqr, umbral_mad, umbral_z):
+    """Matrices booleanas filas x columnas por metodo (False para NaN o sin grupo)."""
+    fila = np.where(codigos >= 0, codigos, 0)
+    con_grupo = (codigos >= 0)[:, None] & ~np.isnan(valores)
+    iqr = est['IQR'][fila]
+    fuera_iqr = ((valores < est['Q1'][fila] - factor_iqr * iqr)
+                 | (valores > est['Q3'][fila] + factor_iqr * iqr))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_robusto = np.abs(valores - est['MEDIANA'][fila]) / (ESCALA_MAD * est['MAD'][fila])
+        z = np.abs(valores - est['MEDIA'][fila]) / est['DE'][fila]
+    return {
+        'IQR': con_grupo & fuera_iqr,
+        'MAD': con_grupo & (z_robusto > umbral_mad),
+        'Z': con_grupo & (z > umbral_z),
+    }, z_robusto, z
+
+
+def resumen_outliers(df, columnas, grupo='UTI', factor_iqr=FACTOR_IQR,
+                     umbral_mad=UMBRAL_MAD, umbral_z=UMBRAL_Z):
+    """
+    Tabla ordenada con una fila por (grupo, columna): N, MEDIA, DE, Q1,
+    MEDIANA, Q3, IQR, MAD, LIM_INF/LIM_SUP (IQR), y N_/PCT_ de outliers por
+    cada metodo de METODOS.
+    """
+    codigos, grupos, valores, est = _estadisticos(df, columnas, grupo)
+    marcas, _, _ = _marcas(codigos, valores, est, factor_iqr, umbral_mad, umbral_z)
+    n_g, n_c = len(grupos), len(columnas)
+    validos = codigos >= 0
+
+    tabla = pd.DataFrame({
+        grupo: np.repeat(np.asarray(grupos, dtype=object), n_c),
+        'COLUMNA': np.tile(np.asarray(columnas, dtype=object), n_g),
+    })
+    for nombre in ['N', 'MEDIA', 'DE', 'Q1', 'MEDIANA', 'Q3', 'IQR', 'MAD']:
+        tabla[nombre] = est[nombre].ravel()
+    tabla['N'] = tabla['N'].astype(np.int64)
+    tabla['LIM_INF'] = (est['Q1'] - factor_iqr * est['IQR']).ravel()
+    tabla['LIM_SUP'] = (est['Q3'] + factor_iqr * est['IQR']).ravel()
+    for metodo in METODOS:
+        conteo = np.zeros((n_g, n_c), dtype=np.int64)
+        np.add.at(conteo, codigos[validos], marcas[metodo][validos].astype(np.int64))
+        tabla[f'N_{metodo}'] = conteo.ravel()
+        tabla[f'PCT_{metodo}'] = tabla[f'N_{metodo}'] / tabla['N'].where(tabla['N'] > 0) * 100
+    return tabla
+
+
+def marcar_outliers(df, columnas, grupo='UTI', factor_iqr=FACTOR_IQR,
+                    umbral_mad=UMBRAL_MAD, umbral_z=UMBRAL_Z):
+    """
+    Tabla larga con una fila por valor marcado por al menos un metodo:
+    FILA (indice de `df`), grupo, COLUMNA, VALOR, PUNTAJE_Z, PUNTAJE_Z_ROBUSTO
+    y una columna booleana por metodo (IQR, MAD, Z).
+    """
+    codigos, grupos, valores, est = _estadisticos(df, columnas, grupo)
+    marcas, z_robusto, z = _marcas(codigos, valores, est, factor_iqr, umbral_mad, umbral_z)
+    alguna = marcas['IQR'] | marcas['MAD'] | marcas['Z']
+    filas, cols = np.nonzero(alguna)
+    tabla = pd.DataFrame({
+        'FILA': df.index.to_numpy()[filas],
+        grupo: np.asarray(grupos, dtype=object)[codigos[filas]],
+        'COLUMNA': np.asarray(columnas, dtype=object)[cols],
+        'VALOR': valores[filas, cols],
+        'PUNTAJE_Z': z[filas, cols],
+        'PUNTAJE_Z_ROBUSTO': z_robusto[filas, cols],
+    })
+    for metodo in METODOS:
+        tabla[metodo] = marcas[metodo][filas, cols]
+    return tabla
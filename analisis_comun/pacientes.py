@@ -0,0 +1,91 @@
+"""
+Agregaciones a nivel de paciente con codigos enteros densos
+===========================================================
+Los IDs de paciente (int64 seudonimos) se factorizan una sola vez para todos
+los datasets en codigos 0..n-1 (int32). Con esos codigos, conteos de
+pacientes unicos, categorias distintas por paciente y primera/ultima
+categorizacion se resuelven con np.bincount y ordenamientos, sin hashear
+objetos ni recorrer pacientes en Python.
+"""
+import numpy as np
+import pandas as pd
+
+from analisis_comun.anonimizacion import ID_FALTANTE
+
+ORDEN_RIESGO = {'A': 4, 'B': 3, 'C': 2, 'D': 1}
+ORDEN_DEPENDENCIA = {'1': 3, '2': 2, '3': 1}
+
+
+def codificar_pacientes(dfs, col_id='ID_PACIENTE', destino='COD_PACIENTE'):
+    """
+    Asigna a cada DataFrame la columna `destino` con codigos densos comunes a
+    todos (el mismo paciente tiene el mismo codigo en todos los anios/unidades).
+    Los IDs faltantes quedan con -1. Devuelve la cantidad de pacientes distintos.
+    """
+    ids = np.concatenate([df[col_id].to_numpy(dtype=np.int64) for df in dfs])
+    unicos, codigos = np.unique(ids, return_inverse=True)
+    codigos = codigos.astype(np.int32)
+    if len(unicos) and unicos[0] == ID_FALTANTE:
+        codigos -= 1
+        unicos = unicos[1:]
+    inicio = 0
+    for df in dfs:
+        fin = inicio + len(df)
+        df[destino] = codigos[inicio:fin]
+        inicio = fin
+    return len(unicos)
+
+
+def pacientes_unicos(codigos):
+    """Cantidad de pacientes distintos en un arreglo de codigos densos."""
+    codigos = np.asarray(codigos)
+    return int(np.count_nonzero(np.bincount(codigos[codigos >= 0])))
+
+
+def categorias_por_paciente(codigos, categorias):
+    """
+    Cantidad de categorias distintas por paciente (solo pacientes presentes).
+    Equivale a groupby(paciente)[categoria].nunique().
+    """
+    codigos = np.asarray(codigos, dtype=np.int64)
+    cat_cod, cat_unicas = pd.factorize(categorias)
+    mask = (codigos >= 0) & (cat_cod >= 0)
+    n_cat = max(len(cat_unicas), 1)
+    pares = np.unique(codigos[mask] * n_cat + cat_cod[mask])
+    conteo = np.bincount(pares // n_cat)
+    presentes = np.bincount(codigos[codigos >= 0], minlength=len(conteo)) > 0
+    return conteo[presentes]
+
+
+def puntaje_cudyr(categorias):
+    """Puntaje riesgo (A=4..D=1) + dependencia (1=3..3=1); 0 si no se reconoce."""
+    cat = categorias.astype('string')
+    riesgo = cat.str[0].map(ORDEN_RIESGO).fillna(0)
+    dependencia = cat.str[1].map(ORDEN_DEPENDENCIA).fillna(0)
+    return (riesgo + dependencia).to_numpy(dtype=np.int8)
+
+
+def evolucion_pacientes(codigos, fechas, puntajes):
+    """
+    Primera y ultima categorizacion de cada paciente segun fecha.
+    Devuelve un DataFrame indexado por codigo con n, puntaje_inicial y puntaje_final.
+    """
+    codigos = np.asarray(codigos)
+    mask = codigos >= 0
+    codigos = codigos[mask]
+    fechas = np.asarray(fechas)[mask]
+    puntajes = np.asarray(puntajes)[mask]
+    if len(codigos) == 0:
+        return pd.DataFrame({'n': [], 'puntaje_inicial': [], 'puntaje_final': []},
+                            index=pd.Index([], name='COD_PACIENTE'))
+    orden = np.lexsort((fechas, codigos))
+    c = codigos[orden]
+    p = puntajes[orden]
+    corte = c[1:] != c[:-1]
+    primero = np.r_[True, corte]
+    ultimo = np.r_[corte, True]
+    return pd.DataFrame({
+        'n': np.diff(np.r_[np.flatnonzero(primero), len(c)]),
+        'puntaje_inicial': p[primero],
+        'puntaje_final': p[ultimo],
+    }, index=pd.Index(c[primero], name='COD_PACIENTE'))
@@ -0,0 +1,30 @@
+"""
+Importacion diferida de librerias pesadas
+=========================================
+``importar_perezoso('scipy.stats')`` devuelve el modulo registrado en
+sys.modules pero sin ejecutarlo (importlib.util.LazyLoader): el costo de
+importacion se paga recien en el primer acceso a un atributo. Asi los
+modulos de analisis_comun pueden declarar sus dependencias pesadas arriba del
+archivo y un script que solo genera tablas o el snapshot de KPIs no carga
+scipy ni plotly.
+
+Un ``from modulo import nombre`` posterior funciona igual: dispara la carga
+real y recibe el mismo objeto.
+"""
+import importlib.util
+import sys
+
+
+def importar_perezoso(nombre):
+    """Modulo `nombre` cuya ejecucion se difiere hasta el primer uso."""
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    spec = importlib.util.find_spec(nombre)
+    if spec is None:
+        raise ModuleNotFoundError(f"No se encontro el modulo {nombre}", name=nombre)
+    cargador = importlib.util.LazyLoader(spec.loader)
+    spec.loader = cargador
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre] = modulo
+    cargador.exec_module(modulo)
+    return modulo
@@ -0,0 +1,34 @@
+/*
+ * Dibuja los graficos diferidos (div.plotly-diferido con el JSON de la figura
+ * en un script de tipo application/json) cuando se acercan a la pantalla.
+ * Sin IntersectionObserver se dibujan todos al cargar.
+ */
+(function () {
+    'use strict';
+
+    var CONFIG = {responsive: true};
+
+    function hidratar(el) {
+        var fuente = el.querySelector('script[type="application/json"]');
+        if (!fuente) { return; }
+        var fig = JSON.parse(fuente.textContent);
+        el.removeChild(fuente);
+        el.classList.remove('plotly-diferido');
+        Plotly.newPlot(el, fig.data, fig.layout || {}, CONFIG);
+    }
+
+    var pendientes = document.querySelectorAll('.plotly-diferido');
+    if (!('IntersectionObserver' in window)) {
+        pendientes.forEach(hidratar);
+        return;
+    }
+    var observador = new IntersectionObserver(function (entradas) {
+        entradas.forEach(function (e) {
+            if (e.isIntersecting) {
+                observador.unobserve(e.target);
+                hidratar(e.target);
+            }
+        });
+    }, {rootMargin: '200px 0px'});
+    pendientes.forEach(function (el) { observador.observe(el); });
+}());
@@ -0,0 +1,202 @@
+"""
+Pronostico de volumen mensual: GLM de Poisson con efecto de mes
+===============================================================
+Cada serie mensual (ingresos o categorizaciones por unidad) se modela como
+
+    log E[conteo] = b0 + b1 * t + efecto_mes[m]
+
+ajustado por IRLS en numpy. Todas las series se ajustan a la vez: los pesos y
+las ecuaciones normales se arman con np.einsum sobre una matriz series x meses
+y se resuelven en lote con np.linalg.solve, sin un ajuste por serie. Los
+efectos de mes llevan una penalizacion ridge leve para que, con menos de dos
+anios de datos, la estacionalidad se encoja hacia cero en vez de sobreajustar.
+
+Los parametros se guardan en cache/pronostico.json con una clave por serie y
+ventana de datos (primer y ultimo mes y conteos). Si la ventana no cambio se
+reutilizan sin ajustar; si solo se agrego un mes, el ajuste parte de los
+parametros de la ventana anterior (arranque en caliente) y converge en pocas
+iteraciones. Al guardar se descartan las ventanas anteriores de cada serie
+ajustada, asi el archivo no crece con cada mes nuevo. Las bandas combinan la
+incertidumbre de los parametros (metodo delta sobre el predictor lineal) con
+la variabilidad de Poisson.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.exportar import guardar_json
+from analisis_comun.perezoso import importar_perezoso
+
+stats = importar_perezoso('scipy.stats')
+
+HORIZONTE_MESES = 3
+NIVEL_BANDA = 0.95
+PENALIZACION_MES = 1.0
+MAX_ITERACIONES = 50
+TOLERANCIA = 1e-8
+ARCHIVO_CACHE = 'pronostico.json'
+
+
+def _diseno(mes_indice, mes_del_anio):
+    """Intercepto, tendencia (anios desde el inicio) y 11 indicadores de mes (enero = base)."""
+    x = np.zeros((len(mes_indice), 13))
+    x[:, 0] = 1.0
+    x[:, 1] = np.asarray(mes_indice) / 12.0
+    m = np.asarray(mes_del_anio)
+    filas = np.flatnonzero(m > 1)
+    x[filas, m[filas]] = 1.0
+    return x
+
+
+def ajustar_poisson(y, x, beta0=None, penalizacion=PENALIZACION_MES,
+                    max_iter=MAX_ITERACIONES, tol=TOLERANCIA):
+    """
+    IRLS en lote. y: (series, meses) con NaN donde no hay dato; x: (meses, p)
+    compartida. Devuelve (beta (series, p), covarianza (series, p, p), iteraciones).
+    """
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    observado = ~np.isnan(y)
+    yy = np.where(observado, y, 0.0)
+    s, p = y.shape[0], x.shape[1]
+    pen = np.zeros(p)
+    pen[2:] = penalizacion
+    pen_matriz = np.diag(pen)
+
+    if beta0 is None:
+        beta = np.zeros((s, p))
+        media = yy.sum(axis=1) / np.maximum(observado.sum(axis=1), 1)
+        beta[:, 0] = np.log(np.maximum(media, 0.5))
+    else:
+        beta = np.array(beta0, dtype=float)
+
+    for iteracion in range(1, max_iter + 1):
+        eta = beta @ x.T
+        mu = np.exp(eta)
+        w = np.where(observado, mu, 0.0)
+        z = eta + np.where(observado, (yy - mu) / mu, 0.0)
+        xtwx = np.einsum('st,tp,tq->spq', w, x, x) + pen_matriz
+        xtwz = np.einsum('st,tp->sp', w * z, x)
+        nuevo = np.linalg.solve(xtwx, xtwz[..., None])[..., 0]
+        cambio = np.max(np.abs(nuevo - beta)) if s else 0.0
+        beta = nuevo
+        if cambio < tol:
+            break
+    mu = np.exp(beta @ x.T)
+    w = np.where(observado, mu, 0.0)
+    covarianza = np.linalg.inv(np.einsum('st,tp,tq->spq', w, x, x) + pen_matriz)
+    return beta, covarianza, iteracion
+
+
+def _clave_ventana(serie, unidad, periodos, conteos):
+    texto = json.dumps([serie, unidad, list(periodos), [float(c) for c in conteos]])
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def _leer_cache(cache_dir):
+    if cache_dir is None:
+        return {}
+    ruta = Path(cache_dir) / ARCHIVO_CACHE
+    if not ruta.exists():
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _escribir_cache(cache_dir, cache):
+    guardar_json(Path(cache_dir) / ARCHIVO_CACHE, cache)
+
+
+def pronosticar(datos, horizonte=HORIZONTE_MESES, nivel=NIVEL_BANDA, cache_dir='cache'):
+    """
+    datos: tabla larga con SERIE, UNIDAD, PERIODO ('AAAA-MM') y CONTEO.
+    Devuelve una fila por serie y mes (historicos y `horizonte` meses futuros)
+    con SERIE, UNIDAD, PERIODO, TIPO ('ajuste' o 'pronostico'), CONTEO
+    (NaN en el futuro), MEDIA, INF y SUP (banda de prediccion al `nivel`).
+    """
+    datos = datos.copy()
+    datos['PERIODO'] = pd.PeriodIndex(datos['PERIODO'].astype(str), freq='M')
+    inicio = datos['PERIODO'].min()
+    fin = datos['PERIODO'].max()
+    historicos = pd.period_range(inicio, fin, freq='M')
+    futuros = pd.period_range(fin + 1, periods=horizonte, freq='M')
+    todos = historicos.append(futuros)
+
+    # Matriz series x meses (meses sin registro quedan en NaN)
+    ancho = datos.pivot_table(index=['SERIE', 'UNIDAD'], columns='PERIODO', values='CONTEO',
+                              aggfunc='sum').reindex(columns=historicos)
+    y = ancho.to_numpy(dtype=float)
+    indices = np.arange(len(todos))
+    x = _diseno(indices, todos.month)
+    x_hist = x[:len(historicos)]
+
+    cache = _leer_cache(cache_dir)
+    periodos_txt = [str(p) for p in historicos]
+    claves, pendientes, arranque = [], [], []
+    beta = np.zeros((len(ancho), x.shape[1]))
+    cov = np.zeros((len(ancho), x.shape[1], x.shape[1]))
+    for i, (serie, unidad) in enumerate(ancho.index):
+        clave = _clave_ventana(serie, unidad, periodos_txt, np.nan_to_num(y[i], nan=-1))
+        claves.append(clave)
+        if clave in cache:
+            beta[i] = cache[clave]['beta']
+            cov[i] = cache[clave]['cov']
+            continue
+        pendientes.append(i)
+        # Arranque en caliente: ultima ventana guardada de la misma serie con el mismo inicio
+        previas = [v for v in cache.values()
+                   if v['serie'] == serie and v['unidad'] == unidad and v['inicio'] == str(inicio)]
+        arranque.append(max(previas, key=lambda v: v['fin'])['beta'] if previas else None)
+
+    if pendientes:
+        beta0 = None
+        if all(a is not None for a in arranque):
+            beta0 = np.array(arranque)
+        b, c, _ = ajustar_poisson(y[pendientes], x_hist, beta0=beta0)
+        beta[pendientes] = b
+        cov[pendientes] = c
+        for j, i in enumerate(pendientes):
+            serie, unidad = ancho.index[i]
+            cache[claves[i]] = {'serie': serie, 'unidad': unidad, 'inicio': str(inicio),
+                                'fin': str(fin), 'beta': b[j].tolist(), 'cov': c[j].tolist()}
+
+    # De cada serie ajustada solo queda la ventana actual; las de otras series no se tocan
+    ajustadas = set(ancho.index)
+    vigente = {k: v for k, v in cache.items()
+               if k in claves or (v['serie'], v['unidad']) not in ajustadas}
+    if cache_dir is not None and (pendientes or len(vigente) < len(cache)):
+        _escribir_cache(cache_dir, vigente)
+
+    # Predictor lineal y su error estandar para todos los meses y series a la vez
+    eta = beta @ x.T
+    se = np.sqrt(np.einsum('tp,spq,tq->st', x, cov, x))
+    z = stats.norm.ppf(0.5 + nivel / 2)
+    cola = (1 - nivel) / 2
+    media = np.exp(eta)
+    inf = stats.poisson.ppf(cola, np.exp(eta - z * se))
+    sup = stats.poisson.ppf(1 - cola, np.exp(eta + z * se))
+
+    n_series, n_meses = media.shape
+    conteo = np.full((n_series, n_meses), np.nan)
+    conteo[:, :len(historicos)] = y
+    return pd.DataFrame({
+        'SERIE': np.repeat(ancho.index.get_level_values('SERIE'), n_meses),
+        'UNIDAD': np.repeat(ancho.index.get_level_values('UNIDAD'), n_meses),
+        'PERIODO': np.tile(np.asarray([str(p) for p in todos]), n_series),
+        'TIPO': np.tile(np.r_[['ajuste'] * len(historicos), ['pronostico'] * horizonte], n_series),
+        'CONTEO': conteo.ravel(),
+        'MEDIA': media.ravel(),
+        'INF': inf.ravel(),
+        'SUP': sup.ravel(),
+    })
+
+
+def conteos_mensuales(df, col_fecha, col_unidad, serie):
+    """Entrada de `pronosticar` desde filas individuales: conteo por (unidad, mes)."""
+    periodo = pd.to_datetime(df[col_fecha]).dt.to_period('M').astype(str)
+    tabla = df.groupby([df[col_unidad].rename('UNIDAD'), periodo.rename('PERIODO')]).size()
+    tabla = tabla.rename('CONTEO').reset_index()
+    tabla.insert(0, 'SERIE', serie)
+    return tabla
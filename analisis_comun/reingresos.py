@@ -0,0 +1,120 @@
+"""
+Reingresos: tiempo hasta el siguiente ingreso del mismo paciente
+================================================================
+Ninguno de los datasets marca reingresos; se deducen del ID_PACIENTE
+seudonimo (la misma clave HMAC en todos los archivos). ``marcar_reingresos``
+ordena las estadias por (paciente, ingreso, egreso) con un ``np.lexsort`` y
+compara cada fila con la siguiente desplazando los arreglos una posicion: si
+la siguiente es del mismo paciente, la distancia entre este egreso y ese
+ingreso es el tiempo hasta el reingreso. No hay recorrido paciente por
+paciente.
+
+Una estadia es egreso indice para la ventana de 48 h, 7 o 30 dias si el
+paciente egreso vivo, no paso directamente a otra estadia (TRASLADO: la
+siguiente empieza antes del egreso, o el mismo dia en otra UTI) y la ventana
+completa cae antes del corte de los datos (el ultimo ingreso registrado); asi
+los egresos del ultimo mes no cuentan como "sin reingreso" por falta de
+seguimiento.
+
+``tabla_reingresos`` suma esos indicadores por UTI y mes de egreso (mas una
+fila TODOS por UTI) y ``guardar_tabla_reingresos`` la deja en
+``eda_outputs/reingresos_uti_mes.csv`` para los dashboards.
+"""
+import numpy as np
+import pandas as pd
+
+# Ventanas de reingreso (sufijo de columna -> horas desde el egreso)
+VENTANAS = {'48H': 48, '7D': 7 * 24, '30D': 30 * 24}
+TODOS = 'TODOS'
+_HORA = np.timedelta64(1, 'h')
+_NAT = np.datetime64('NaT', 'ns')
+
+
+def _siguiente(valores, mismo, vacio):
+    """valores desplazados una fila hacia arriba; `vacio` donde la siguiente es de otro paciente."""
+    sig = np.empty_like(valores)
+    sig[:-1] = valores[1:]
+    sig[~mismo] = vacio
+    return sig
+
+
+def marcar_reingresos(df, col_paciente='ID_PACIENTE', col_unidad='UTI', col_ingreso='INGRESO',
+                      col_egreso='EGRESO', col_fallecido='FALLECIDO', corte=None):
+    """
+    Una fila por estadia con ID_PACIENTE >= 0 e ingreso, en orden (paciente,
+    ingreso) y con el indice original de `df`: ID_PACIENTE, UTI, INGRESO,
+    EGRESO, SIGUIENTE_INGRESO, SIGUIENTE_UTI, HORAS_A_SIGUIENTE y
+    DIAS_A_SIGUIENTE (desde el egreso; NaN sin egreso o sin otra estadia),
+    TRASLADO, y por cada ventana de VENTANAS ELEGIBLE_<v> (egreso indice con
+    la ventana observable antes de `corte`) y REINGRESO_<v>.
+    `corte` por defecto es el ultimo ingreso de `df`.
+    """
+    ids = pd.to_numeric(df[col_paciente], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    ingreso = pd.to_datetime(df[col_ingreso]).to_numpy(dtype='datetime64[ns]')
+    egreso = pd.to_datetime(df[col_egreso]).to_numpy(dtype='datetime64[ns]')
+    filas = np.flatnonzero((ids >= 0) & ~np.isnat(ingreso))
+    orden = filas[np.lexsort((egreso[filas].view(np.int64), ingreso[filas].view(np.int64), ids[filas]))]
+
+    ids, ingreso, egreso = ids[orden], ingreso[orden], egreso[orden]
+    unidad = df[col_unidad].astype(str).to_numpy(dtype=object)[orden]
+    fallecido = df[col_fallecido].to_numpy(dtype=float)[orden]
+
+    mismo = np.zeros(len(orden), dtype=bool)
+    mismo[:-1] = ids[1:] == ids[:-1]
+    sig_ingreso = _siguiente(ingreso, mismo, _NAT)
+    sig_unidad = _siguiente(unidad, mismo, None)
+    horas = (sig_ingreso - egreso) / _HORA
+
+    # Paso directo a otra estadia: no es un reingreso ni un egreso indice
+    mismo_dia = sig_ingreso.astype('datetime64[D]') == egreso.astype('datetime64[D]')
+    traslado = mismo & ((sig_ingreso < egreso) | (mismo_dia & (sig_unidad != unidad)))
+    indice = ~np.isnat(egreso) & (fallecido == 0) & ~traslado
+
+    corte = np.datetime64(pd.Timestamp(corte if corte is not None else ingreso.max()), 'ns')
+    marcas = {}
+    for sufijo, h in VENTANAS.items():
+        elegible = indice & (egreso + np.timedelta64(h, 'h') <= corte)
+        marcas[f'ELEGIBLE_{sufijo}'] = elegible
+        marcas[f'REINGRESO_{sufijo}'] = elegible & (horas <= h)
+
+    return pd.DataFrame({
+        'ID_PACIENTE': ids, 'UTI': unidad, 'INGRESO': ingreso, 'EGRESO': egreso,
+        'SIGUIENTE_INGRESO': sig_ingreso, 'SIGUIENTE_UTI': sig_unidad,
+        'HORAS_A_SIGUIENTE': horas, 'DIAS_A_SIGUIENTE': horas / 24,
+        'TRASLADO': traslado, **marcas,
+    }, index=df.index[orden])
+
+
+def tabla_reingresos(marcadas):
+    """
+    Suma de marcar_reingresos por UTI y mes de egreso ('AAAA-MM'; TODOS para
+    el total de la UTI): EGRESOS (con fecha), TRASLADOS, ELEGIBLE_<v>,
+    REINGRESO_<v> y TASA_<v> (% de reingresos sobre elegibles, NaN sin elegibles).
+    """
+    con_egreso = marcadas[marcadas['EGRESO'].notna()]
+    conteos = [c for v in VENTANAS for c in (f'ELEGIBLE_{v}', f'REINGRESO_{v}')]
+    base = con_egreso[['TRASLADO', *conteos]].astype(np.int64).rename(columns={'TRASLADO': 'TRASLADOS'})
+    base.insert(0, 'EGRESOS', 1)
+    base.insert(0, 'MES', con_egreso['EGRESO'].dt.to_period('M').astype(str))
+    base.insert(0, 'UTI', con_egreso['UTI'])
+
+    columnas = ['EGRESOS', 'TRASLADOS', *conteos]
+    mensual = base.groupby(['UTI', 'MES'], sort=True)[columnas].sum().reset_index()
+    total = mensual.groupby('UTI', sort=True)[columnas].sum().reset_index()
+    total.insert(1, 'MES', TODOS)
+    tabla = pd.concat([mensual, total], ignore_index=True).sort_values(['UTI', 'MES'], ignore_index=True)
+
+    for v in VENTANAS:
+        elegibles = tabla[f'ELEGIBLE_{v}'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tabla[f'TASA_{v}'] = np.where(elegibles > 0, tabla[f'REINGRESO_{v}'] / elegibles * 100, np.nan)
+    return tabla
+
+
+def guardar_tabla_reingresos(tabla, ruta='eda_outputs/reingresos_uti_mes.csv'):
+    tabla.to_csv(ruta, index=False)
+    return ruta
+
+
+def leer_tabla_reingresos(ruta='eda_outputs/reingresos_uti_mes.csv'):
+    return pd.read_csv(ruta, dtype={'UTI': str, 'MES': str})
@@ -0,0 +1,146 @@
+"""
+Renderizado de paginas HTML con plantillas Jinja2
+=================================================
+Todas las paginas comparten el layout ``plantillas/base.html`` (cabecera,
+barra de navegacion y CSS comun en ``plantillas/css``). Las plantillas se
+compilan una vez y el bytecode queda en ``cache/jinja`` en la raiz del
+repositorio, por lo que las ejecuciones siguientes no vuelven a parsearlas.
+
+La salida se escribe en streaming con ``Template.generate()``: el HTML (que
+incluye varios MB de JSON de graficos) nunca se arma completo en memoria. La
+escritura pasa por ``exportar.escribir_por_trozos``: si la pagina no cambio no
+se reemplaza, y si cambio se generan sus versiones .gz/.br.
+
+Con ``figura_plotly(fig, diferida=True)`` el grafico se guarda como JSON inerte
+y ``plantillas/js/hidratar_graficos.js`` lo dibuja recien cuando entra en
+pantalla (IntersectionObserver), en vez de ejecutar todos los Plotly.newPlot
+al cargar la pagina.
+"""
+import hashlib
+from pathlib import Path
+
+from markupsafe import Markup
+
+from analisis_comun.exportar import activos, escribir_por_trozos
+
+RAIZ = Path(__file__).resolve().parent.parent
+DIR_PLANTILLAS = Path(__file__).resolve().parent / 'plantillas'
+DIR_CACHE = RAIZ / 'cache' / 'jinja'
+
+# (clave, ruta relativa a la raiz del repo, texto del enlace)
+PAGINAS_NAV = [
+    ('index', 'analisis_categorizacion/index.html', 'Resumen UTINQX'),
+    ('dashboard', 'analisis_categorizacion/dashboard_utinqx.html', 'Categorización UTINQX'),
+    ('ambas', 'analisis_categorizacion/ambas_uti.html', 'Ambas UTI (Categorización)'),
+    ('explorador', 'analisis_categorizacion/explorador.html', 'Explorador por fechas'),
+    ('camas', 'analisis_categorizacion/camas.html', 'Intensidad por cama'),
+    ('eda', 'analisis_estadistica_uti/dashboard_eda.html', 'EDA Estadística UTI'),
+    ('justificacion', 'analisis_estadistica_uti/reporte_justificacion_utinqx.html', 'Justificación UTINQX'),
+    ('comparativo', 'analisis_estadistica_uti/dashboard_comparativo_clinico.html', 'Comparativo Clínico'),
+    ('spa', 'spa/index.html', 'Vista única'),
+]
+
+_entorno = None
+
+
+def _miles(valor):
+    return f'{valor:,}'
+
+
+def _dec(valor, n=1):
+    return f'{valor:.{n}f}'
+
+
+def entorno():
+    """Entorno Jinja2 compartido (se crea una sola vez por proceso)."""
+    global _entorno
+    if _entorno is None:
+        from jinja2 import (Environment, FileSystemBytecodeCache, FileSystemLoader,
+                            select_autoescape)
+        DIR_CACHE.mkdir(parents=True, exist_ok=True)
+        _entorno = Environment(
+            loader=FileSystemLoader(DIR_PLANTILLAS),
+            bytecode_cache=FileSystemBytecodeCache(str(DIR_CACHE)),
+            autoescape=select_autoescape(['html']),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            auto_reload=False,
+        )
+        _entorno.filters['miles'] = _miles
+        _entorno.filters['dec'] = _dec
+    return _entorno
+
+
+def reiniciar():
+    """Descarta el entorno para que las plantillas modificadas se vuelvan a cargar."""
+    global _entorno
+    _entorno = None
+
+
+def precompilar():
+    """Compila todas las plantillas y deja el bytecode en cache."""
+    env = entorno()
+    for nombre in env.list_templates(extensions=['html']):
+        env.get_template(nombre)
+
+
+def enlaces_nav(carpeta, activo=None):
+    """
+    Enlaces de la barra de navegacion para una pagina que vive en `carpeta`
+    (relativa a la raiz del repo), con el enlace `activo` resaltado.
+    """
+    enlaces = []
+    for clave, ruta, texto in PAGINAS_NAV:
+        destino_dir, archivo = ruta.rsplit('/', 1)
+        href = archivo if destino_dir == carpeta else f'../{ruta}'
+        enlaces.append({'href': href, 'texto': texto, 'activo': clave == activo})
+    return enlaces
+
+
+def seguro(html):
+    """Marca HTML ya generado (graficos Plotly, tarjetas) para no escaparlo."""
+    return Markup(html)
+
+
+def id_figura(fig):
+    """
+    Id del <div> derivado del contenido de la figura. Plotly usa un uuid
+    aleatorio por defecto, lo que haria cambiar la pagina en cada ejecucion
+    aunque los datos sean los mismos.
+    """
+    return 'fig-' + hashlib.sha1(fig.to_json().encode('utf-8')).hexdigest()[:12]
+
+
+def figura_plotly(fig, diferida=False, alto_defecto=450):
+    """
+    Fragmento HTML de una figura Plotly (sin plotly.js). Si `diferida`, deja un
+    contenedor con la altura final y el JSON de la figura en un
+    <script type="application/json">, que se hidrata al hacerse visible.
+    """
+    if not diferida:
+        return seguro(fig.to_html(full_html=False, include_plotlyjs=False, div_id=id_figura(fig)))
+    alto = fig.layout.height or alto_defecto
+    # '</' dentro del JSON cerraria el <script> antes de tiempo
+    datos = fig.to_json().replace('</', '<\\/')
+    return seguro(
+        f'<div class="plotly-diferido" style="height:{alto}px;width:100%;">'
+        f'<script type="application/json">{datos}</script></div>'
+    )
+
+
+def renderizar(nombre, ruta_salida, **contexto):
+    """
+    Renderiza la plantilla `nombre` escribiendo la salida por trozos (solo si
+    cambio). Las plantillas reciben `activos` con los nombres con hash de la
+    carpeta de salida (ver exportar.activo_con_hash).
+    """
+    plantilla = entorno().get_template(nombre)
+    contexto.setdefault('activos', activos(Path(ruta_salida).parent))
+    escribir_por_trozos(ruta_salida, plantilla.generate(**contexto))
+    return ruta_salida
+
+
+def renderizar_texto(nombre, **contexto):
+    """Renderiza la plantilla `nombre` a un string (fragmentos pequenos)."""
+    return entorno().get_template(nombre).render(**contexto)
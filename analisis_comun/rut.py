@@ -0,0 +1,44 @@
+"""
+Normalizacion de RUT chileno
+============================
+Convierte RUTs escritos como "12.345.678-9", "12345678-9" o "12345678k" en el
+numero del cuerpo (int32) y valida el digito verificador (modulo 11), todo con
+operaciones vectorizadas sobre la Serie completa.
+"""
+import numpy as np
+import pandas as pd
+
+# Los RUT chilenos tienen a lo mas 8 digitos de cuerpo; 9 da margen a extranjeros
+MAX_DIGITOS = 9
+
+
+def digito_verificador(cuerpos):
+    """DV esperado ('0'-'9' o 'K') para un arreglo de cuerpos enteros."""
+    n = np.asarray(cuerpos, dtype=np.int64).copy()
+    suma = np.zeros_like(n)
+    factor = 2
+    for _ in range(MAX_DIGITOS):
+        suma += (n % 10) * factor
+        n //= 10
+        factor = 2 if factor == 7 else factor + 1
+    r = 11 - suma % 11
+    return np.where(r == 11, '0', np.where(r == 10, 'K', r.astype(str)))
+
+
+def parsear_rut(serie):
+    """
+    Devuelve un DataFrame con el mismo indice y columnas:
+    RUT_CUERPO (int32, 0 si no se pudo leer), RUT_DV (str) y RUT_VALIDO (bool).
+    """
+    limpio = serie.astype('string').str.replace(r'[.\s-]', '', regex=True).str.upper()
+    dv = limpio.str[-1]
+    cuerpo = pd.to_numeric(limpio.str[:-1], errors='coerce')
+    legible = cuerpo.notna() & (cuerpo > 0) & (cuerpo < 10 ** MAX_DIGITOS)
+    cuerpo = cuerpo.where(legible, 0).astype(np.int32)
+    esperado = digito_verificador(cuerpo.to_numpy())
+    valido = legible & (dv.fillna('') == esperado)
+    return pd.DataFrame({
+        'RUT_CUERPO': cuerpo,
+        'RUT_DV': dv,
+        'RUT_VALIDO': valido.astype(bool),
+    }, index=serie.index)
@@ -0,0 +1,235 @@
+"""
+Servidor de construccion: reconstruye las paginas al llegar datos nuevos
+=======================================================================
+``python -m analisis_comun.servidor`` deja un proceso vivo que importa una
+sola vez pandas, numpy, plotly, scipy y Jinja2 (plantillas precompiladas) y
+luego vigila los archivos de entrada:
+
+- ``data/categorizacion/*.xlsx`` -> ``analisis_categorizacion/crear_dashboard.py``
+- ``analisis_estadistica_uti/eda_outputs/dataset_limpio_anonimizado.csv`` ->
+  los dos scripts de ``analisis_estadistica_uti`` y el de categorizacion
+  (vincula categorizaciones con estadias)
+- ``analisis_comun/plantillas`` -> todos los scripts
+
+Despues de cada reconstruccion se regenera la SPA (``analisis_comun.spa``).
+
+Cuando cambia un archivo se espera a que deje de cambiar (``--espera``, para
+no leer un Excel a medio copiar) y se ejecutan solo los scripts afectados,
+con ``runpy`` en su propia carpeta, como si se corrieran a mano. Los datasets
+leidos quedan en memoria entre ejecuciones (``lectura.en_memoria``), asi que
+un script cuyo archivo no cambio no vuelve a leerlo; las caches en disco
+(``cache/``) siguen valiendo igual que en una ejecucion normal.
+
+Se usa watchdog si esta instalado para despertar apenas llega un evento; si
+no, se revisan mtime y tamano cada ``--intervalo`` segundos. Las salidas que
+los scripts escriben en ``eda_outputs`` no coinciden con los patrones
+vigilados, por lo que no disparan reconstrucciones en cadena.
+"""
+import argparse
+import fnmatch
+import importlib.util
+import os
+import runpy
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+SCRIPT_CATEGORIZACION = 'analisis_categorizacion/crear_dashboard.py'
+SCRIPT_EDA = 'analisis_estadistica_uti/crear_dashboard_eda.py'
+SCRIPT_ESTRATEGICOS = 'analisis_estadistica_uti/crear_dashboards_estrategicos.py'
+# Orden de ejecucion cuando varios scripts se ven afectados
+SCRIPTS = (SCRIPT_EDA, SCRIPT_ESTRATEGICOS, SCRIPT_CATEGORIZACION)
+
+# (carpeta relativa a la raiz, patrones de archivo, scripts afectados)
+DEPENDENCIAS = [
+    ('data/categorizacion', ('*.xlsx', '*.xls'), (SCRIPT_CATEGORIZACION,)),
+    ('analisis_estadistica_uti/eda_outputs', ('dataset_limpio_anonimizado.csv',), SCRIPTS),
+    ('analisis_comun/plantillas', ('*.html', '*.css', '*.js'), SCRIPTS),
+]
+
+INTERVALO_SONDEO = 0.5
+ESPERA_ESTABLE = 0.3
+MODULOS_PRECARGA = ('numpy', 'pandas', 'plotly.graph_objects', 'plotly.subplots', 'scipy.stats')
+
+
+def precargar():
+    """Importa las librerias pesadas y compila las plantillas una sola vez."""
+    inicio = time.perf_counter()
+    for modulo in MODULOS_PRECARGA:
+        __import__(modulo)
+    from analisis_comun.render import precompilar
+    precompilar()
+    return time.perf_counter() - inicio
+
+
+def estado_archivos(raiz=RAIZ):
+    """{ruta: (mtime_ns, tamano)} de los archivos vigilados en DEPENDENCIAS."""
+    estado = {}
+    for carpeta, patrones, _ in DEPENDENCIAS:
+        base = Path(raiz) / carpeta
+        if not base.is_dir():
+            continue
+        for actual, _, archivos in os.walk(base):
+            for nombre in archivos:
+                if nombre.startswith(('~$', '.')) or not any(fnmatch.fnmatch(nombre, p) for p in patrones):
+                    continue
+                ruta = Path(actual) / nombre
+                try:
+                    st = ruta.stat()
+                except FileNotFoundError:
+                    continue
+                estado[ruta] = (st.st_mtime_ns, st.st_size)
+    return estado
+
+
+def cambios(anterior, actual):
+    """Rutas agregadas, modificadas o eliminadas entre dos estados."""
+    return {r for r in anterior.keys() | actual.keys() if anterior.get(r) != actual.get(r)}
+
+
+def scripts_afectados(rutas, raiz=RAIZ):
+    """Scripts a reconstruir por los archivos `rutas`, en el orden de SCRIPTS."""
+    afectados = set()
+    for ruta in rutas:
+        for carpeta, _, scripts in DEPENDENCIAS:
+            if Path(ruta).is_relative_to(Path(raiz) / carpeta):
+                afectados.update(scripts)
+    return [s for s in SCRIPTS if s in afectados]
+
+
+def ejecutar_script(script, raiz=RAIZ, argv=()):
+    """
+    Corre `script` con runpy en su carpeta (como ``python script.py``).
+    Devuelve (ok, segundos); los errores se muestran y no detienen el servidor.
+    """
+    ruta = Path(raiz) / script
+    cwd = os.getcwd()
+    argv_original, path_original = sys.argv, list(sys.path)
+    inicio = time.perf_counter()
+    try:
+        os.chdir(ruta.parent)
+        sys.argv = [str(ruta), *argv]
+        runpy.run_path(str(ruta), run_name='__main__')
+        return True, time.perf_counter() - inicio
+    except SystemExit as salida:
+        # sys.exit(0) es una salida anticipada normal (ej: --solo-tablas)
+        if salida.code not in (None, 0):
+            traceback.print_exc()
+        return salida.code in (None, 0), time.perf_counter() - inicio
+    except Exception:
+        traceback.print_exc()
+        return False, time.perf_counter() - inicio
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv_original
+        sys.path[:] = path_original
+
+
+def reconstruir(scripts, raiz=RAIZ, argv=()):
+    """Ejecuta `scripts` en orden y muestra el tiempo de cada uno."""
+    from analisis_comun.render import reiniciar
+    reiniciar()
+    for script in scripts:
+        ok, segundos = ejecutar_script(script, raiz, argv)
+        print(f"    [{'OK' if ok else 'ERROR'}] {script} ({segundos:.2f} s)", flush=True)
+    if scripts:
+        # La SPA reune las salidas de todos los scripts en un solo paquete
+        from analisis_comun.spa import construir_spa
+        inicio = time.perf_counter()
+        try:
+            construir_spa(raiz)
+            print(f"    [OK] spa/index.html ({time.perf_counter() - inicio:.2f} s)", flush=True)
+        except Exception:
+            traceback.print_exc()
+
+
+def _despertador(raiz):
+    """Evento que watchdog activa al ver cambios (None si watchdog no esta instalado)."""
+    if importlib.util.find_spec('watchdog') is None:
+        return None, None
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    evento = threading.Event()
+
+    class _Aviso(FileSystemEventHandler):
+        def on_any_event(self, _):
+            evento.set()
+
+    observador = Observer()
+    for carpeta, _, _ in DEPENDENCIAS:
+        base = Path(raiz) / carpeta
+        if base.is_dir():
+            observador.schedule(_Aviso(), str(base), recursive=True)
+    observador.start()
+    return evento, observador
+
+
+def vigilar(raiz=RAIZ, intervalo=INTERVALO_SONDEO, espera=ESPERA_ESTABLE, argv=(), inicial=True):
+    """Bucle principal: construye todo (si `inicial`) y luego reconstruye ante cambios."""
+    print(f"Precarga de librerias y plantillas: {precargar():.2f} s", flush=True)
+    if inicial:
+        reconstruir(SCRIPTS, raiz, argv)
+    evento, observador = _despertador(raiz)
+    print(f"Vigilando {', '.join(c for c, _, _ in DEPENDENCIAS)} "
+          f"({'watchdog' if evento else f'sondeo cada {intervalo} s'}). Ctrl+C para salir.", flush=True)
+    estado = estado_archivos(raiz)
+    try:
+        while True:
+            if evento is not None:
+                evento.wait(intervalo * 4)
+                evento.clear()
+            else:
+                time.sleep(intervalo)
+            nuevo = estado_archivos(raiz)
+            modificados = cambios(estado, nuevo)
+            if not modificados:
+                continue
+            # Esperar a que los archivos dejen de cambiar (copia en curso)
+            while True:
+                time.sleep(espera)
+                siguiente = estado_archivos(raiz)
+                if siguiente == nuevo:
+                    break
+                modificados |= cambios(nuevo, siguiente)
+                nuevo = siguiente
+            estado = nuevo
+            scripts = scripts_afectados(modificados, raiz)
+            print(f"\nCambios: {', '.join(sorted(p.name for p in modificados))}", flush=True)
+            reconstruir(scripts, raiz, argv)
+    except KeyboardInterrupt:
+        print('\nServidor detenido')
+    finally:
+        if observador is not None:
+            observador.stop()
+            observador.join()
+
+
+def _main():
+    parser = argparse.ArgumentParser(description='Reconstruye las paginas HTML cuando cambian los datos de entrada.')
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_SONDEO,
+                        help='segundos entre revisiones sin watchdog')
+    parser.add_argument('--espera', type=float, default=ESPERA_ESTABLE,
+                        help='segundos sin cambios antes de reconstruir')
+    parser.add_argument('--sin-inicial', action='store_true',
+                        help='no construir todo al arrancar')
+    parser.add_argument('--una-vez', action='store_true',
+                        help='construir todo y salir (util para medir la precarga)')
+    parser.add_argument('args_scripts', nargs='*',
+                        help='argumentos para los scripts (ej: -- --inmediato --backend=duckdb)')
+    args = parser.parse_args()
+
+    if args.una_vez:
+        print(f"Precarga de librerias y plantillas: {precargar():.2f} s", flush=True)
+        reconstruir(SCRIPTS, argv=args.args_scripts)
+        return
+    vigilar(intervalo=args.intervalo, espera=args.espera, argv=args.args_scripts,
+            inicial=not args.sin_inicial)
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,300 @@
+"""
+Resumenes combinables por (unidad, mes): HyperLogLog y t-digest
+===============================================================
+Para consolidar varios hospitales sin compartir filas de pacientes, cada
+celda (unidad, mes) guarda:
+
+- n: cantidad de estadias,
+- pacientes: registros HyperLogLog (uint8, 2**p) de los ID_PACIENTE,
+- un t-digest (centroides media/peso + min/max) por variable numerica
+  (APACHE_II, DIAS_ESTADIA, EDAD).
+
+Unir celdas es asociativo y conmutativo (maximo de registros, union de
+centroides recomprimida), asi que cualquier region o periodo se calcula a
+partir de resumenes parciales con memoria constante. Los pacientes unicos
+tienen un error relativo tipico de 1.04/sqrt(2**p) (~1.6% con p=12) y los
+cuantiles extremos (p95) quedan dentro de pocas decimas del valor exacto.
+
+Todo se construye de forma vectorizada: los registros HLL de todas las celdas
+se llenan con un solo np.maximum.at y los t-digest de todas las celdas se
+arman ordenando (celda, valor) una vez y agrupando con np.bincount.
+
+El HLL cuenta ID_PACIENTE, que es un HMAC del RUT con la clave de cada
+instalacion (``anonimizacion.cargar_clave``). Para que un paciente atendido en
+dos hospitales cuente una sola vez, todos los sitios deben seudonimizar con la
+misma UTI_CLAVE_SEUDONIMO; con claves distintas el mismo RUT da IDs distintos y
+la union lo cuenta dos veces. Cada celda guarda la huella de la clave
+(``anonimizacion.huella_clave``, no permite recuperarla) y unir celdas con
+huellas distintas es un error.
+"""
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+
+VERSION_SKETCH = 2
+PRECISION_HLL = 12
+COMPRESION_TDIGEST = 100
+VARIABLES_TDIGEST = ('APACHE_II', 'DIAS_ESTADIA', 'EDAD')
+# Campos de una celda que no son t-digest
+CAMPOS_CELDA = ('n', 'pacientes', 'clave')
+
+
+# ── HyperLogLog ──────────────────────────────────────────────────
+
+def _mezclar64(valores):
+    """splitmix64: dispersa enteros (IDs) en 64 bits uniformes."""
+    z = np.asarray(valores).astype(np.int64).view(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _largo_bits32(x):
+    # frexp es exacto para enteros de 32 bits (representables en float64)
+    return np.frexp(x.astype(np.float64))[1]
+
+
+def _posicion_hll(valores, p):
+    """Registro y rango (ceros a la izquierda + 1) de cada valor."""
+    h = _mezclar64(valores)
+    registro = (h >> np.uint64(64 - p)).astype(np.int64)
+    resto = h << np.uint64(p)
+    alto = resto >> np.uint64(32)
+    bajo = resto & np.uint64(0xFFFFFFFF)
+    ceros = np.where(alto > 0, 32 - _largo_bits32(alto), 64 - _largo_bits32(bajo))
+    rango = np.minimum(ceros + 1, 64 - p + 1).astype(np.uint8)
+    return registro, rango
+
+
+def hll_nuevo(p=PRECISION_HLL):
+    return np.zeros(2 ** p, dtype=np.uint8)
+
+
+def hll_agregar(registros, valores):
+    """Agrega valores (enteros) a los registros, en el lugar."""
+    p = int(np.log2(len(registros)))
+    registro, rango = _posicion_hll(valores, p)
+    np.maximum.at(registros, registro, rango)
+    return registros
+
+
+def hll_unir(*registros):
+    return np.maximum.reduce(registros)
+
+
+def hll_estimar(registros):
+    """Cardinalidad estimada (con correccion de rango pequeno)."""
+    m = len(registros)
+    alfa = 0.7213 / (1 + 1.079 / m)
+    estimado = alfa * m * m / np.sum(np.ldexp(1.0, -registros.astype(np.int64)))
+    vacios = int(np.count_nonzero(registros == 0))
+    if estimado <= 2.5 * m and vacios:
+        estimado = m * np.log(m / vacios)
+    return float(estimado)
+
+
+# ── t-digest ─────────────────────────────────────────────────────
+
+def _comprimir(medias, pesos, grupos, n_grupos, compresion):
+    """
+    Agrupa centroides (ordenados por grupo y media) en clusters de tamano k1:
+    k(q) = compresion / (2*pi) * asin(2q - 1); cada cluster abarca a lo mas
+    una unidad de k, por lo que las colas quedan con clusters muy pequenos.
+    """
+    total = np.bincount(grupos, weights=pesos, minlength=n_grupos)
+    acumulado = np.cumsum(pesos)
+    inicio_grupo = np.r_[0.0, np.cumsum(total)][grupos]
+    q = (acumulado - pesos / 2 - inicio_grupo) / total[grupos]
+    k = compresion / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+    ancho = int(compresion // 2) + 2
+    cluster = grupos * ancho + np.floor(k + compresion / 4).astype(np.int64)
+    peso = np.bincount(cluster, weights=pesos, minlength=n_grupos * ancho)
+    suma = np.bincount(cluster, weights=medias * pesos, minlength=n_grupos * ancho)
+    presentes = np.flatnonzero(peso > 0)
+    return presentes // ancho, suma[presentes] / peso[presentes], peso[presentes]
+
+
+def tdigest_desde_valores(valores, compresion=COMPRESION_TDIGEST):
+    valores = np.asarray(valores, dtype=float)
+    return tdigests_por_grupo(valores, np.zeros(len(valores), dtype=np.int64), 1, compresion)[0]
+
+
+def tdigests_por_grupo(valores, grupos, n_grupos, compresion=COMPRESION_TDIGEST):
+    """Un t-digest por grupo (0..n_grupos-1) en una sola pasada ordenada."""
+    valores = np.asarray(valores, dtype=float)
+    grupos = np.asarray(grupos, dtype=np.int64)
+    validos = ~np.isnan(valores)
+    valores, grupos = valores[validos], grupos[validos]
+    orden = np.lexsort((valores, grupos))
+    valores, grupos = valores[orden], grupos[orden]
+    g, medias, pesos = _comprimir(valores, np.ones(len(valores)), grupos, n_grupos, compresion)
+
+    bordes = np.searchsorted(g, np.arange(n_grupos + 1))
+    bordes_val = np.searchsorted(grupos, np.arange(n_grupos + 1))
+    digests = []
+    for i in range(n_grupos):
+        a, b = bordes[i], bordes[i + 1]
+        va, vb = bordes_val[i], bordes_val[i + 1]
+        digests.append({
+            'medias': medias[a:b], 'pesos': pesos[a:b],
+            'min': float(valores[va]) if vb > va else None,
+            'max': float(valores[vb - 1]) if vb > va else None,
+        })
+    return digests
+
+
+def tdigest_unir(*digests, compresion=COMPRESION_TDIGEST):
+    digests = [d for d in digests if len(d['pesos'])]
+    if not digests:
+        return {'medias': np.zeros(0), 'pesos': np.zeros(0), 'min': None, 'max': None}
+    medias = np.concatenate([d['medias'] for d in digests])
+    pesos = np.concatenate([d['pesos'] for d in digests])
+    orden = np.argsort(medias, kind='stable')
+    _, medias, pesos = _comprimir(medias[orden], pesos[orden],
+                                  np.zeros(len(medias), dtype=np.int64), 1, compresion)
+    return {'medias': medias, 'pesos': pesos,
+            'min': min(d['min'] for d in digests), 'max': max(d['max'] for d in digests)}
+
+
+def tdigest_cuantil(digest, q):
+    """Cuantil(es) q en [0, 1] interpolando entre centros de centroides."""
+    pesos = digest['pesos']
+    if not len(pesos):
+        return np.nan
+    total = pesos.sum()
+    centros = np.cumsum(pesos) - pesos / 2
+    x = np.r_[0.0, centros, total]
+    y = np.r_[digest['min'], digest['medias'], digest['max']]
+    return np.interp(np.asarray(q) * total, x, y)
+
+
+def tdigest_media(digest):
+    pesos = digest['pesos']
+    return float(np.average(digest['medias'], weights=pesos)) if len(pesos) else np.nan
+
+
+# ── Celdas (unidad, mes) ────────────────────────────────────────
+
+def resumir_celdas(df, huella, col_unidad='UTI', col_fecha='INGRESO', col_id='ID_PACIENTE',
+                   variables=VARIABLES_TDIGEST, p=PRECISION_HLL,
+                   compresion=COMPRESION_TDIGEST):
+    """
+    Devuelve {(unidad, 'AAAA-MM'): celda} con n, pacientes (HLL), clave y un
+    t-digest por variable. `huella` es ``huella_clave`` de la clave con que se
+    seudonimizo `col_id`; para unir resumenes de varios hospitales todos deben
+    usar la misma UTI_CLAVE_SEUDONIMO.
+    """
+    mes = pd.to_datetime(df[col_fecha]).dt.to_period('M').astype(str)
+    codigos, claves = pd.MultiIndex.from_arrays([df[col_unidad], mes]).factorize()
+    n_celdas = len(claves)
+    m = 2 ** p
+
+    registros = np.zeros((n_celdas, m), dtype=np.uint8)
+    ids = df[col_id].to_numpy(dtype=np.int64)
+    con_id = (ids >= 0) & (codigos >= 0)
+    registro, rango = _posicion_hll(ids[con_id], p)
+    np.maximum.at(registros.reshape(-1), codigos[con_id] * m + registro, rango)
+
+    digests = {v: tdigests_por_grupo(df[v].to_numpy(dtype=float)[codigos >= 0],
+                                     codigos[codigos >= 0], n_celdas, compresion)
+               for v in variables if v in df.columns}
+    conteo = np.bincount(codigos[codigos >= 0], minlength=n_celdas)
+
+    celdas = {}
+    for i, clave in enumerate(claves):
+        celda = {'n': int(conteo[i]), 'pacientes': registros[i], 'clave': huella}
+        for v, lista in digests.items():
+            celda[v] = lista[i]
+        celdas[tuple(clave)] = celda
+    return celdas
+
+
+def huella_comun(celdas):
+    """Huella de clave compartida por todas las celdas; ValueError si hay mas de una."""
+    huellas = {c['clave'] for c in celdas}
+    if len(huellas) > 1:
+        raise ValueError(f"Celdas seudonimizadas con claves distintas "
+                         f"({', '.join(sorted(map(str, huellas)))}): los pacientes compartidos "
+                         f"se contarian dos veces; todos los sitios deben usar la misma "
+                         f"UTI_CLAVE_SEUDONIMO")
+    return huellas.pop() if huellas else None
+
+
+def unir_celdas(celdas, compresion=COMPRESION_TDIGEST):
+    """
+    Une una lista de celdas (de cualquier unidad, mes u hospital) en una sola.
+    Todas deben tener la misma huella de clave (ver ``huella_comun``).
+    """
+    celdas = list(celdas)
+    unida = {'n': sum(c['n'] for c in celdas),
+             'pacientes': hll_unir(*[c['pacientes'] for c in celdas]),
+             'clave': huella_comun(celdas)}
+    variables = set().union(*[c.keys() for c in celdas]) - set(CAMPOS_CELDA)
+    for v in sorted(variables):
+        unida[v] = tdigest_unir(*[c[v] for c in celdas if v in c], compresion=compresion)
+    return unida
+
+
+def agregar(celdas, unidades=None, meses=None):
+    """Une las celdas filtrando por unidades y/o meses ('AAAA-MM'); None = todas."""
+    elegidas = [c for (u, m), c in celdas.items()
+                if (unidades is None or u in unidades) and (meses is None or m in meses)]
+    return unir_celdas(elegidas) if elegidas else None
+
+
+def indicadores_celda(celda, cuantiles=(0.5, 0.95)):
+    """n, pacientes estimados y media/cuantiles de cada variable de una celda."""
+    resultado = {'n': celda['n'], 'pacientes': round(hll_estimar(celda['pacientes']))}
+    for v, d in celda.items():
+        if v in CAMPOS_CELDA:
+            continue
+        resultado[f'{v}_media'] = tdigest_media(d)
+        for q, valor in zip(cuantiles, np.atleast_1d(tdigest_cuantil(d, cuantiles))):
+            resultado[f'{v}_p{int(q * 100)}'] = float(valor)
+    return resultado
+
+
+# ── Serializacion ───────────────────────────────────────────────
+
+def celdas_a_json(celdas, ruta, origen=''):
+    """
+    Guarda las celdas (sin filas de pacientes) en un JSON versionado, con la
+    huella de la clave comun a todas.
+    """
+    clave = huella_comun(celdas.values())
+    salida = []
+    for (unidad, mes), c in celdas.items():
+        fila = {'unidad': unidad, 'mes': mes, 'n': c['n'],
+                'pacientes': base64.b64encode(c['pacientes'].tobytes()).decode('ascii')}
+        for v, d in c.items():
+            if v in CAMPOS_CELDA:
+                continue
+            fila[v] = {'medias': d['medias'].round(6).tolist(), 'pesos': d['pesos'].tolist(),
+                       'min': d['min'], 'max': d['max']}
+        salida.append(fila)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'version': VERSION_SKETCH, 'origen': origen, 'clave': clave, 'celdas': salida},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    return ruta
+
+
+def celdas_desde_json(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        datos = json.load(f)
+    if datos.get('version') != VERSION_SKETCH:
+        raise ValueError(f"Version de sketches {datos.get('version')} no soportada "
+                         f"(se esperaba {VERSION_SKETCH})")
+    celdas = {}
+    for fila in datos['celdas']:
+        celda = {'n': fila['n'],
+                 'pacientes': np.frombuffer(base64.b64decode(fila['pacientes']), dtype=np.uint8).copy(),
+                 'clave': datos['clave']}
+        for v, d in fila.items():
+            if isinstance(d, dict):
+                celda[v] = {'medias': np.array(d['medias'], dtype=float),
+                            'pesos': np.array(d['pesos'], dtype=float),
+                            'min': d['min'], 'max': d['max']}
+        celdas[(fila['unidad'], fila['mes'])] = celda
+    return celdas
@@ -0,0 +1,163 @@
+"""
+Version de una sola pagina (SPA) con un unico paquete de datos
+==============================================================
+``python -m analisis_comun.spa`` arma ``spa/`` en la raiz del repositorio:
+
+- ``datos.json`` (y ``datos.js`` para abrir desde disco): un solo paquete
+  columnar con el snapshot de KPIs CUDYR (``kpis.json``), conteos de estadias
+  del EDA por (UTI, mes de ingreso, dimension, valor) y las tablas ya
+  calculadas por los scripts (SMR por UTI, mes y severidad; SPC mensual;
+  pronostico de ingresos),
+- ``index.html``: una pagina con las cinco vistas (resumen, categorizacion,
+  ambas UTI, justificacion y comparativo) que ``spa.js`` dibuja en el navegador
+  a partir del paquete. El cambio de vista es por ``#hash``, sin recargar, y
+  cada vista se dibuja la primera vez que se abre.
+
+Formato columnar: las columnas de texto se guardan como ``niveles`` +
+``codigos`` (indices, -1 = nulo), las fechas como dias desde 1970-01-01 y las
+numericas como listas con null para faltantes. Es varias veces mas chico que
+repetir los nombres de columna en cada fila.
+
+Al navegador no llegan filas de pacientes: fechas exactas, edad, genero y
+diagnostico juntos permitirian reidentificar estadias. Cada dimension de
+DIMENSIONES_ESTADIAS se cuenta por separado (marginales por UTI y mes, como
+los cubos de ``cubos.py``); con los conteos por valor de APACHE_II y
+DIAS_ESTADIA ``spa.js`` calcula exactamente medias, desvios y medianas.
+
+Se lee lo que ya generaron ``crear_dashboard.py`` y los scripts de
+``analisis_estadistica_uti``; las partes faltantes quedan fuera del paquete y
+la vista correspondiente lo indica.
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.exportar import activo_con_hash, escribir_artefacto
+from analisis_comun.render import enlaces_nav, renderizar
+
+RAIZ = Path(__file__).resolve().parent.parent
+DIR_SPA = RAIZ / 'spa'
+SPA_JS = Path(__file__).resolve().parent / 'static' / 'spa.js'
+VERSION_PAQUETE = 1
+
+RUTA_KPIS = 'analisis_categorizacion/kpis.json'
+DIR_EDA = 'analisis_estadistica_uti/eda_outputs'
+# Dimensiones que se cuentan por (UTI, MES); TOTAL es la fila sin dimension
+DIMENSIONES_ESTADIAS = ['SEVERIDAD_APACHE', 'CATEGORIA_DX', 'GRUPO_ETARIO', 'APACHE_II', 'DIAS_ESTADIA']
+TOTAL = 'TOTAL'
+NIVELES_SMR_SPA = ('UTI', 'UTI+MES', 'UTI+SEVERIDAD_APACHE')
+COLUMNAS_SMR_SPA = ['NIVEL', 'UTI', 'MES', 'SEVERIDAD_APACHE', 'N', 'OBSERVADOS', 'ESPERADOS',
+                    'SMR', 'IC_INF', 'IC_SUP', 'TASA_OBSERVADA', 'TASA_ESPERADA']
+
+# (clave del #hash, texto del enlace)
+VISTAS = [
+    ('resumen', 'Resumen UTINQX'),
+    ('categorizacion', 'Categorización UTINQX'),
+    ('ambas', 'Ambas UTI'),
+    ('justificacion', 'Justificación UTINQX'),
+    ('comparativo', 'Comparativo Clínico'),
+]
+DECIMALES = 4
+
+
+def columnar(df):
+    """{'n': filas, 'columnas': {nombre: columna codificada}} (ver docstring del modulo)."""
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            dias = (serie - pd.Timestamp('1970-01-01')) / pd.Timedelta(days=1)
+            columnas[col] = {'tipo': 'fecha',
+                             'valores': [None if np.isnan(v) else round(v, DECIMALES) for v in dias]}
+        elif pd.api.types.is_bool_dtype(serie):
+            columnas[col] = {'tipo': 'num', 'valores': serie.astype(int).tolist()}
+        elif pd.api.types.is_numeric_dtype(serie):
+            valores = serie.to_numpy(dtype=float)
+            entero = np.all(np.isnan(valores) | (valores == np.round(valores)))
+            columnas[col] = {'tipo': 'num', 'valores': [
+                None if np.isnan(v) else (int(v) if entero else round(float(v), DECIMALES))
+                for v in valores]}
+        else:
+            codigos, niveles = pd.factorize(serie, sort=True)
+            columnas[col] = {'tipo': 'cat', 'niveles': [str(n) for n in niveles],
+                             'codigos': codigos.tolist()}
+    return {'n': len(df), 'columnas': columnas}
+
+
+def conteos_estadias(estadias, dimensiones=DIMENSIONES_ESTADIAS):
+    """
+    Tabla larga UTI, MES ('AAAA-MM' del ingreso), DIMENSION, VALOR (texto), N y
+    FALLECIDOS: una fila TOTAL por (UTI, MES) y una por cada valor presente de
+    cada dimension. Los valores faltantes no se cuentan en su dimension.
+    """
+    base = pd.DataFrame({
+        'UTI': estadias['UTI'].astype(str),
+        'MES': pd.to_datetime(estadias['INGRESO']).dt.to_period('M').astype(str),
+        'FALLECIDOS': estadias['FALLECIDO'].fillna(0).astype(np.int64),
+    })
+    partes = [base.assign(DIMENSION=TOTAL, VALOR='')]
+    for dim in dimensiones:
+        if dim not in estadias.columns:
+            continue
+        valores = estadias[dim]
+        if pd.api.types.is_numeric_dtype(valores):
+            texto = valores.map(lambda v: f'{v:g}', na_action='ignore')
+        else:
+            texto = valores.astype('string')
+        partes.append(base.assign(DIMENSION=dim, VALOR=texto)[texto.notna()])
+    return (pd.concat(partes, ignore_index=True)
+            .groupby(['UTI', 'MES', 'DIMENSION', 'VALOR'], sort=True)['FALLECIDOS']
+            .agg(N='size', FALLECIDOS='sum').reset_index())
+
+
+def construir_paquete(raiz=RAIZ):
+    """Paquete de datos de la SPA desde las salidas existentes de los scripts."""
+    raiz = Path(raiz)
+    paquete = {'version': VERSION_PAQUETE, 'tablas': {}}
+    ruta_kpis = raiz / RUTA_KPIS
+    if ruta_kpis.exists():
+        with open(ruta_kpis, encoding='utf-8') as f:
+            paquete['kpis'] = json.load(f)
+
+    eda = raiz / DIR_EDA
+    ruta_estadias = eda / 'dataset_limpio_anonimizado.csv'
+    if ruta_estadias.exists():
+        estadias = pd.read_csv(ruta_estadias, parse_dates=['INGRESO'])
+        paquete['tablas']['estadias'] = columnar(conteos_estadias(estadias))
+    if (eda / 'smr.csv').exists():
+        smr = pd.read_csv(eda / 'smr.csv')
+        smr = smr[smr['NIVEL'].isin(NIVELES_SMR_SPA)]
+        paquete['tablas']['smr'] = columnar(smr[[c for c in COLUMNAS_SMR_SPA if c in smr.columns]])
+    for nombre, archivo in [('spc', 'spc_mensual.csv'), ('pronostico', 'pronostico_ingresos.csv')]:
+        if (eda / archivo).exists():
+            paquete['tablas'][nombre] = columnar(pd.read_csv(eda / archivo))
+    return paquete
+
+
+def construir_spa(raiz=RAIZ, destino=DIR_SPA):
+    """Escribe datos.json, datos.js, spa.<hash>.js e index.html en `destino`."""
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    texto = json.dumps(construir_paquete(raiz), ensure_ascii=False, separators=(',', ':'))
+    escribir_artefacto(destino / 'datos.json', texto)
+    escribir_artefacto(destino / 'datos.js', f'window.DATOS_SPA = {texto};\n')
+    activo_con_hash(SPA_JS, destino)
+    # La barra de navegacion asume destino = spa/ (un nivel bajo la raiz, como las demas paginas)
+    renderizar('spa.html', destino / 'index.html', vistas=VISTAS, nav=enlaces_nav('spa', 'spa'))
+    return destino / 'index.html'
+
+
+def _main():
+    parser = argparse.ArgumentParser(description='Genera la version de una sola pagina (spa/).')
+    parser.add_argument('--destino', default=str(DIR_SPA))
+    args = parser.parse_args()
+    ruta = construir_spa(destino=args.destino)
+    tam = (Path(args.destino) / 'datos.json').stat().st_size
+    print(f"[OK] {ruta} generado (datos.json: {tam / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,166 @@
+"""
+Control estadistico de procesos: graficos p y u con reglas Western Electric
+==========================================================================
+Cada serie mensual (p. ej. % A+B, mortalidad, ingresos por dia) se evalua
+contra su linea central y limites variables segun el denominador del mes:
+
+- grafico p (proporcion): LC = sum(eventos) / sum(n),
+  limites LC +/- 3 * sqrt(LC * (1 - LC) / n_i), recortados a [0, 1].
+- grafico u (tasa por exposicion): LC = sum(conteos) / sum(exposicion),
+  limites LC +/- 3 * sqrt(LC / exposicion_i).
+
+Todas las series (unidad x indicador) se pasan a una matriz series x meses y
+las cuatro reglas Western Electric se detectan con ventanas deslizantes sobre
+el puntaje z, sin recorrer serie por serie:
+
+1. un punto fuera de 3 sigma,
+2. 2 de 3 puntos consecutivos mas alla de 2 sigma del mismo lado,
+3. 4 de 5 puntos consecutivos mas alla de 1 sigma del mismo lado,
+4. 8 puntos consecutivos del mismo lado de la linea central.
+
+La senal se marca en el punto que completa la regla. La linea central se fija
+con el periodo base; al agregar un mes nuevo solo se evalua ese mes con las
+ultimas 7 observaciones de cada serie (``agregar_periodo``).
+"""
+import numpy as np
+import pandas as pd
+
+SIGMAS_CONTROL = 3
+REGLAS_WE = ('REGLA_1', 'REGLA_2', 'REGLA_3', 'REGLA_4')
+# (puntos en la ventana, minimo que deben cumplir, umbral en sigmas)
+VENTANAS_WE = {'REGLA_2': (3, 2, 2.0), 'REGLA_3': (5, 4, 1.0), 'REGLA_4': (8, 8, 0.0)}
+HISTORIA_WE = max(v[0] for v in VENTANAS_WE.values()) - 1
+
+COLUMNAS_SPC = ['SERIE', 'UNIDAD', 'PERIODO', 'TIPO', 'EVENTOS', 'N', 'VALOR',
+                'LC', 'LCI', 'LCS', 'Z', *REGLAS_WE, 'SENAL']
+
+
+def _sigma(tipo, lc, n):
+    n = np.where(n > 0, n, np.nan)
+    varianza = np.where(tipo == 'p', lc * (1 - lc), lc)
+    return np.sqrt(np.clip(varianza, 0, None) / n)
+
+
+def _ventana_cuenta(marcas, largo):
+    """Cantidad de marcas en la ventana que termina en cada columna (0 si la ventana no cabe)."""
+    acumulado = np.cumsum(marcas, axis=1)
+    cuenta = acumulado.copy()
+    cuenta[:, largo:] -= acumulado[:, :-largo]
+    cuenta[:, :largo - 1] = 0
+    return cuenta
+
+
+def reglas_western_electric(z):
+    """
+    z: matriz (series x periodos) de puntajes z, NaN donde no hay dato.
+    Devuelve {regla: matriz booleana} con la senal en el punto que completa
+    la regla (y que ademas esta del lado que la dispara).
+    """
+    z = np.atleast_2d(np.asarray(z, dtype=float))
+    valido = ~np.isnan(z)
+    zz = np.where(valido, z, 0.0)
+    senales = {'REGLA_1': valido & (np.abs(zz) > SIGMAS_CONTROL)}
+    for regla, (largo, minimo, umbral) in VENTANAS_WE.items():
+        if z.shape[1] < largo:
+            senales[regla] = np.zeros(z.shape, dtype=bool)
+            continue
+        arriba = valido & (zz > umbral)
+        abajo = valido & (zz < -umbral)
+        senales[regla] = ((arriba & (_ventana_cuenta(arriba, largo) >= minimo))
+                          | (abajo & (_ventana_cuenta(abajo, largo) >= minimo)))
+    return senales
+
+
+def _evaluar(tabla, lc):
+    """Agrega LC, limites, Z y reglas a `tabla` (ordenada por SERIE, UNIDAD, PERIODO)."""
+    tipo = tabla['TIPO'].to_numpy()
+    n = tabla['N'].to_numpy(dtype=float)
+    sigma = _sigma(tipo, lc, n)
+    valor = tabla['EVENTOS'].to_numpy(dtype=float) / np.where(n > 0, n, np.nan)
+    tabla['VALOR'] = valor
+    tabla['LC'] = lc
+    tabla['LCI'] = lc - SIGMAS_CONTROL * sigma
+    tabla['LCS'] = lc + SIGMAS_CONTROL * sigma
+    tabla['LCI'] = tabla['LCI'].clip(lower=0)
+    tabla.loc[tipo == 'p', 'LCS'] = tabla.loc[tipo == 'p', 'LCS'].clip(upper=1)
+    tabla['Z'] = (valor - lc) / np.where(sigma > 0, sigma, np.nan)
+
+    # Matriz series x periodos (los periodos faltantes quedan en NaN)
+    serie, _ = pd.MultiIndex.from_frame(tabla[['SERIE', 'UNIDAD']]).factorize()
+    periodo, periodos = pd.factorize(tabla['PERIODO'], sort=True)
+    z = np.full((serie.max() + 1, len(periodos)), np.nan)
+    z[serie, periodo] = tabla['Z'].to_numpy()
+    for regla, matriz in reglas_western_electric(z).items():
+        tabla[regla] = matriz[serie, periodo]
+    tabla['SENAL'] = tabla[list(REGLAS_WE)].any(axis=1)
+    return tabla
+
+
+def _normalizar_entrada(datos):
+    tabla = datos[['SERIE', 'UNIDAD', 'PERIODO', 'TIPO', 'EVENTOS', 'N']].copy()
+    tabla['PERIODO'] = tabla['PERIODO'].astype(str)
+    return tabla.sort_values(['SERIE', 'UNIDAD', 'PERIODO'], ignore_index=True)
+
+
+def tabla_spc(datos, base_hasta=None):
+    """
+    datos: tabla larga con SERIE, UNIDAD, PERIODO ('AAAA-MM'), TIPO ('p' o 'u'),
+    EVENTOS y N (denominador del grafico p o exposicion del grafico u).
+    La linea central de cada serie se calcula con los periodos <= `base_hasta`
+    (todos si es None). Devuelve la tabla con COLUMNAS_SPC.
+    """
+    tabla = _normalizar_entrada(datos)
+    base = tabla if base_hasta is None else tabla[tabla['PERIODO'] <= str(base_hasta)]
+    totales = base.groupby(['SERIE', 'UNIDAD'])[['EVENTOS', 'N']].sum()
+    centro = (totales['EVENTOS'] / totales['N']).rename('LC')
+    lc = tabla[['SERIE', 'UNIDAD']].merge(centro, left_on=['SERIE', 'UNIDAD'],
+                                          right_index=True, how='left')['LC'].to_numpy()
+    return _evaluar(tabla, lc)[COLUMNAS_SPC]
+
+
+def agregar_periodo(resultado, nuevos):
+    """
+    Evalua periodos nuevos sin recalcular la historia: se conserva la linea
+    central de cada serie y las reglas se aplican sobre las ultimas
+    HISTORIA_WE observaciones mas los nuevos puntos. Las series sin historia
+    toman su linea central de los propios datos nuevos.
+    """
+    nuevos = _normalizar_entrada(nuevos)
+    centro = resultado.groupby(['SERIE', 'UNIDAD'])['LC'].last()
+    cola = resultado.groupby(['SERIE', 'UNIDAD'], group_keys=False).tail(HISTORIA_WE)
+    tramo = pd.concat([cola[nuevos.columns], nuevos], ignore_index=True)
+    tramo = tramo.sort_values(['SERIE', 'UNIDAD', 'PERIODO'], ignore_index=True)
+    es_nuevo = ~tramo.set_index(['SERIE', 'UNIDAD', 'PERIODO']).index.isin(
+        cola.set_index(['SERIE', 'UNIDAD', 'PERIODO']).index)
+
+    lc = tramo[['SERIE', 'UNIDAD']].merge(centro, left_on=['SERIE', 'UNIDAD'],
+                                          right_index=True, how='left')['LC'].to_numpy()
+    sin_base = np.isnan(lc)
+    if sin_base.any():
+        propios = tramo[sin_base].groupby(['SERIE', 'UNIDAD'])[['EVENTOS', 'N']].sum()
+        lc_propio = (propios['EVENTOS'] / propios['N']).rename('LC')
+        lc[sin_base] = tramo.loc[sin_base, ['SERIE', 'UNIDAD']].merge(
+            lc_propio, left_on=['SERIE', 'UNIDAD'], right_index=True, how='left')['LC'].to_numpy()
+    evaluado = _evaluar(tramo, lc)[COLUMNAS_SPC]
+    return pd.concat([resultado, evaluado[es_nuevo]], ignore_index=True).sort_values(
+        ['SERIE', 'UNIDAD', 'PERIODO'], ignore_index=True)
+
+
+def serie_mensual(df, col_fecha, col_unidad, serie, eventos=None, tipo='p'):
+    """
+    Arma la entrada de tabla_spc desde filas individuales: por (unidad, mes),
+    EVENTOS = suma de la columna booleana `eventos` y N = cantidad de filas
+    (grafico p), o EVENTOS = filas y N = dias del mes (grafico u, tasa diaria).
+    """
+    periodo = pd.to_datetime(df[col_fecha]).dt.to_period('M')
+    g = df.groupby([df[col_unidad].rename('UNIDAD'), periodo.rename('PERIODO')])
+    if tipo == 'p':
+        tabla = pd.DataFrame({'EVENTOS': g[eventos].sum(), 'N': g.size()})
+    else:
+        tabla = pd.DataFrame({'EVENTOS': g.size()})
+        tabla['N'] = tabla.index.get_level_values('PERIODO').days_in_month
+    tabla = tabla.reset_index()
+    tabla['PERIODO'] = tabla['PERIODO'].astype(str)
+    tabla.insert(0, 'SERIE', serie)
+    tabla['TIPO'] = tipo
+    return tabla
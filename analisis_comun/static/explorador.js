@@ -0,0 +1,259 @@
+/*
+ * Explorador por fechas (explorador.html): filtra y vuelve a agregar los cubos
+ * diarios de categorizaciones en el navegador.
+ *
+ * El cubo (cubos.js -> window.CUBOS, o cubos.json) trae conteos por
+ * (unidad, dia, categoria) y las listas de pacientes por (unidad, dia) en CSR,
+ * como arreglos en base64 que se decodifican una vez a Uint16Array/Uint32Array.
+ * Cada cambio de filtro recorre solo los dias del rango: sumas por categoria y
+ * pacientes unicos exactos marcando codigos en un Uint8Array.
+ */
+(function () {
+    'use strict';
+
+    var DIA_MS = 86400000;
+    var COLORES = {UTINQX: '#e67e22', UTIQX: '#1f77b4'};
+    var ROJO = '#c0392b';
+    var CONFIG = {displaylogo: false, responsive: true};
+    var LAYOUT = {template: 'plotly_white', margin: {t: 50, b: 50, l: 60, r: 20}, height: 380};
+    var MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic'];
+
+    var cubo = null;
+    var visto = null;
+
+    // ── Decodificacion ──────────────────────────────────────────
+
+    function arreglo(a) {
+        var bin = atob(a.b64);
+        var bytes = new Uint8Array(bin.length);
+        for (var i = 0; i < bin.length; i++) { bytes[i] = bin.charCodeAt(i); }
+        return a.tipo === 'uint16' ? new Uint16Array(bytes.buffer) : new Uint32Array(bytes.buffer);
+    }
+
+    function preparar(datos) {
+        var dia0 = Date.parse(datos.dia0 + 'T00:00:00Z');
+        var nCat = datos.categorias.length;
+        var esAlto = new Uint8Array(nCat);
+        var esA1 = new Uint8Array(nCat);
+        datos.categorias.forEach(function (c, k) {
+            esAlto[k] = c !== null && (c.charAt(0) === 'A' || c.charAt(0) === 'B') ? 1 : 0;
+            esA1[k] = c === 'A1' ? 1 : 0;
+        });
+        return {
+            dia0: dia0,
+            nDias: datos.n_dias,
+            unidades: datos.unidades,
+            categorias: datos.categorias,
+            nCat: nCat,
+            esAlto: esAlto,
+            esA1: esA1,
+            conteos: arreglo(datos.conteos),
+            inicios: arreglo(datos.pacientes.inicios),
+            codigos: arreglo(datos.pacientes.codigos),
+            nPacientes: datos.n_pacientes
+        };
+    }
+
+    // ── Fechas ──────────────────────────────────────────────────
+
+    function iso(dia) { return new Date(cubo.dia0 + dia * DIA_MS).toISOString().slice(0, 10); }
+
+    function indiceDia(texto) {
+        return Math.round((Date.parse(texto + 'T00:00:00Z') - cubo.dia0) / DIA_MS);
+    }
+
+    function acotar(d) { return Math.max(0, Math.min(cubo.nDias - 1, d)); }
+
+    // Clave del periodo de agregacion de un dia: el propio dia, el lunes de su semana o el mes
+    function periodo(dia, grano) {
+        var f = new Date(cubo.dia0 + dia * DIA_MS);
+        if (grano === 'mes') { return f.toISOString().slice(0, 7); }
+        if (grano === 'semana') {
+            return new Date(f.getTime() - ((f.getUTCDay() + 6) % 7) * DIA_MS).toISOString().slice(0, 10);
+        }
+        return f.toISOString().slice(0, 10);
+    }
+
+    function etiquetaPeriodo(clave, grano) {
+        if (grano === 'mes') { return MESES[Number(clave.slice(5, 7)) - 1] + ' ' + clave.slice(0, 4); }
+        return clave;
+    }
+
+    // ── Agregacion ──────────────────────────────────────────────
+
+    /*
+     * Suma el rango [d0, d1] de las unidades elegidas. Devuelve totales, conteos
+     * por categoria, pacientes unicos y la serie por periodo y unidad.
+     */
+    function agregar(d0, d1, elegidas, grano) {
+        var nCat = cubo.nCat;
+        var porCategoria = new Float64Array(nCat);
+        var total = 0, alto = 0, a1 = 0, pacientes = 0;
+        var claves = [], indiceClave = {};
+        var series = {};
+
+        visto.fill(0);
+        elegidas.forEach(function (u) {
+            var serie = series[cubo.unidades[u]] = {total: {}, alto: {}};
+            for (var d = d0; d <= d1; d++) {
+                var clave = periodo(d, grano);
+                if (!(clave in indiceClave)) { indiceClave[clave] = claves.length; claves.push(clave); }
+                var base = (u * cubo.nDias + d) * nCat;
+                var nDia = 0, altoDia = 0;
+                for (var c = 0; c < nCat; c++) {
+                    var v = cubo.conteos[base + c];
+                    if (!v) { continue; }
+                    porCategoria[c] += v;
+                    nDia += v;
+                    if (cubo.esAlto[c]) { altoDia += v; }
+                    if (cubo.esA1[c]) { a1 += v; }
+                }
+                total += nDia;
+                alto += altoDia;
+                serie.total[clave] = (serie.total[clave] || 0) + nDia;
+                serie.alto[clave] = (serie.alto[clave] || 0) + altoDia;
+                var fila = u * cubo.nDias + d;
+                for (var i = cubo.inicios[fila]; i < cubo.inicios[fila + 1]; i++) {
+                    var p = cubo.codigos[i];
+                    if (!visto[p]) { visto[p] = 1; pacientes++; }
+                }
+            }
+        });
+        claves.sort();
+        return {total: total, alto: alto, a1: a1, pacientes: pacientes,
+                porCategoria: porCategoria, claves: claves, series: series, dias: d1 - d0 + 1};
+    }
+
+    // ── Controles ───────────────────────────────────────────────
+
+    function elemento(id) { return document.getElementById(id); }
+
+    function leerFiltros() {
+        var d0 = acotar(indiceDia(elemento('filtro-desde').value));
+        var d1 = acotar(indiceDia(elemento('filtro-hasta').value));
+        var elegidas = [];
+        cubo.unidades.forEach(function (u, k) {
+            if (elemento('filtro-unidad-' + k).checked) { elegidas.push(k); }
+        });
+        return {d0: Math.min(d0, d1), d1: Math.max(d0, d1), elegidas: elegidas,
+                grano: elemento('filtro-grano').value};
+    }
+
+    function fijarRango(d0, d1) {
+        elemento('filtro-desde').value = iso(acotar(d0));
+        elemento('filtro-hasta').value = iso(acotar(d1));
+        actualizar();
+    }
+
+    function rangoAnio(anio) {
+        fijarRango(indiceDia(anio + '-01-01'), indiceDia(anio + '-12-31'));
+    }
+
+    function armarControles() {
+        var unidades = elemento('filtro-unidades');
+        cubo.unidades.forEach(function (u, k) {
+            var etiqueta = document.createElement('label');
+            etiqueta.innerHTML = '<input type="checkbox" id="filtro-unidad-' + k + '" checked> ' + u;
+            unidades.appendChild(etiqueta);
+        });
+        ['filtro-desde', 'filtro-hasta'].forEach(function (id) {
+            elemento(id).min = iso(0);
+            elemento(id).max = iso(cubo.nDias - 1);
+        });
+        var ultimo = new Date(cubo.dia0 + (cubo.nDias - 1) * DIA_MS).getUTCFullYear();
+        var atajos = elemento('filtro-atajos');
+        var botones = [
+            [String(ultimo), function () { rangoAnio(ultimo); }],
+            [String(ultimo - 1), function () { rangoAnio(ultimo - 1); }],
+            ['Ultimos 90 dias', function () { fijarRango(cubo.nDias - 90, cubo.nDias - 1); }],
+            ['Ultimos 30 dias', function () { fijarRango(cubo.nDias - 30, cubo.nDias - 1); }],
+            ['Todo', function () { fijarRango(0, cubo.nDias - 1); }]
+        ];
+        botones.forEach(function (b) {
+            var boton = document.createElement('button');
+            boton.type = 'button';
+            boton.textContent = b[0];
+            boton.addEventListener('click', b[1]);
+            atajos.appendChild(boton);
+        });
+        elemento('filtros').addEventListener('change', actualizar);
+        elemento('filtro-desde').value = iso(indiceDia(ultimo + '-01-01') < 0 ? 0 : indiceDia(ultimo + '-01-01'));
+        elemento('filtro-hasta').value = iso(cubo.nDias - 1);
+    }
+
+    // ── Salida ──────────────────────────────────────────────────
+
+    function fmtInt(v) { return Math.round(v).toLocaleString('en-US'); }
+
+    function fmtDec(v, n) { return isNaN(v) || !isFinite(v) ? '-' : v.toFixed(n); }
+
+    function tarjetas(r) {
+        var valores = {
+            total: fmtInt(r.total),
+            pacientes: fmtInt(r.pacientes),
+            cat_por_paciente: fmtDec(r.total / r.pacientes, 1),
+            pct_alto_riesgo: fmtDec(r.alto / r.total * 100, 1) + '%',
+            a1: fmtInt(r.a1),
+            promedio_diario: fmtDec(r.total / r.dias, 1)
+        };
+        Object.keys(valores).forEach(function (k) {
+            var el = document.querySelector('[data-resultado="' + k + '"]');
+            if (el) { el.textContent = valores[k]; }
+        });
+    }
+
+    function graficos(r, grano) {
+        var trazasVolumen = [], trazasAlto = [];
+        var x = r.claves.map(function (k) { return etiquetaPeriodo(k, grano); });
+        Object.keys(r.series).forEach(function (u) {
+            var s = r.series[u];
+            var color = COLORES[u] || '#7f8c8d';
+            trazasVolumen.push({type: 'bar', name: u, x: x, marker: {color: color},
+                                y: r.claves.map(function (k) { return s.total[k] || 0; })});
+            trazasAlto.push({type: 'scatter', mode: 'lines+markers', name: u, x: x,
+                             line: {color: color, width: 2},
+                             y: r.claves.map(function (k) {
+                                 return s.total[k] ? s.alto[k] / s.total[k] * 100 : null;
+                             })});
+        });
+        Plotly.react('grafico-volumen', trazasVolumen, Object.assign({}, LAYOUT, {
+            title: 'Categorizaciones por ' + grano, barmode: 'stack', xaxis: {type: 'category'}
+        }), CONFIG);
+        Plotly.react('grafico-alto', trazasAlto, Object.assign({}, LAYOUT, {
+            title: '% Alto riesgo (A+B) por ' + grano, xaxis: {type: 'category'},
+            yaxis: {ticksuffix: '%', rangemode: 'tozero'}
+        }), CONFIG);
+
+        var cats = [], valores = [];
+        cubo.categorias.forEach(function (c, k) {
+            if (c !== null && r.porCategoria[k]) { cats.push(c); valores.push(r.porCategoria[k]); }
+        });
+        Plotly.react('grafico-categorias', [{
+            type: 'bar', x: cats, y: valores,
+            marker: {color: cats.map(function (c) { return c.charAt(0) === 'A' || c.charAt(0) === 'B' ? ROJO : '#95a5a6'; })},
+            text: valores.map(function (v) { return r.total ? (v / r.total * 100).toFixed(1) + '%' : ''; }),
+            textposition: 'outside'
+        }], Object.assign({}, LAYOUT, {title: 'Distribucion de categorias', showlegend: false}), CONFIG);
+    }
+
+    function actualizar() {
+        var f = leerFiltros();
+        var r = agregar(f.d0, f.d1, f.elegidas, f.grano);
+        elemento('filtro-resumen').textContent = iso(f.d0) + ' a ' + iso(f.d1) + ' (' + r.dias + ' dias)';
+        tarjetas(r);
+        graficos(r, f.grano);
+    }
+
+    function iniciar(datos) {
+        cubo = preparar(datos);
+        visto = new Uint8Array(Math.max(cubo.nPacientes, 1));
+        armarControles();
+        actualizar();
+    }
+
+    if (window.CUBOS) {
+        iniciar(window.CUBOS);
+    } else {
+        fetch('cubos.json').then(function (r) { return r.json(); }).then(iniciar);
+    }
+})();
@@ -0,0 +1,86 @@
+/*
+ * Rellena una pagina estatica con el snapshot de KPIs (kpis.js o kpis.json).
+ *
+ *   data-kpi="unidades.UTINQX.{actual}.total" data-fmt="int"   -> texto del elemento
+ *   data-defecto="0"                                           -> valor si la ruta no existe
+ *   data-signo="ruta" data-clases="sube|baja|baja"             -> clase segun signo (+|-|0)
+ *   <tbody data-repetir="mes in meses"><template>...</template></tbody>
+ *
+ * {actual} y {anterior} se reemplazan por los anios del snapshot; dentro de un
+ * data-repetir, {mes.num} se reemplaza por el campo del elemento actual.
+ */
+(function () {
+    'use strict';
+
+    var FORMATOS = {
+        int: function (v) { return Math.round(v).toLocaleString('en-US'); },
+        dec1: function (v) { return v.toFixed(1); },
+        pct1: function (v) { return v.toFixed(1) + '%'; },
+        signo_int: function (v) { return (v > 0 ? '+' : '') + Math.round(v); },
+        signo_pct1: function (v) { return (v > 0 ? '+' : '') + v.toFixed(1) + '%'; },
+        signo_pp: function (v) { return (v > 0 ? '+' : '') + v.toFixed(1) + ' pp'; }
+    };
+
+    function resolver(obj, ruta) {
+        var partes = ruta.split('.');
+        for (var i = 0; i < partes.length; i++) {
+            if (obj === null || obj === undefined) { return undefined; }
+            obj = obj[partes[i]];
+        }
+        return obj;
+    }
+
+    function interpolar(texto, ambito) {
+        return texto.replace(/\{([\w.]+)\}/g, function (_, ruta) {
+            var v = resolver(ambito, ruta);
+            return v === undefined ? '' : v;
+        });
+    }
+
+    function buscar(datos, ambito, ruta) {
+        ruta = interpolar(ruta, ambito);
+        var cabeza = ruta.split('.')[0];
+        return Object.prototype.hasOwnProperty.call(ambito, cabeza)
+            ? resolver(ambito, ruta) : resolver(datos, ruta);
+    }
+
+    function render(raiz, datos, ambito) {
+        raiz.querySelectorAll('[data-repetir]').forEach(function (el) {
+            var partes = el.getAttribute('data-repetir').split(' in ');
+            var lista = buscar(datos, ambito, partes[1].trim()) || [];
+            var plantilla = el.querySelector('template');
+            el.removeAttribute('data-repetir');
+            lista.forEach(function (item) {
+                var sub = Object.assign({}, ambito);
+                sub[partes[0].trim()] = item;
+                var copia = plantilla.content.cloneNode(true);
+                render(copia, datos, sub);
+                el.appendChild(copia);
+            });
+        });
+        raiz.querySelectorAll('[data-kpi]').forEach(function (el) {
+            var v = buscar(datos, ambito, el.getAttribute('data-kpi'));
+            if (v === undefined || v === null) { v = el.getAttribute('data-defecto'); }
+            var fmt = FORMATOS[el.getAttribute('data-fmt')];
+            el.textContent = (fmt && v !== null && v !== '') ? fmt(Number(v)) : (v === null ? '' : v);
+            el.removeAttribute('data-kpi');
+        });
+        raiz.querySelectorAll('[data-signo]').forEach(function (el) {
+            var v = Number(buscar(datos, ambito, el.getAttribute('data-signo')) || 0);
+            var clases = (el.getAttribute('data-clases') || 'sube|baja|baja').split('|');
+            var clase = v > 0 ? clases[0] : (v < 0 ? clases[1] : clases[2]);
+            if (clase) { el.classList.add(clase); }
+            el.removeAttribute('data-signo');
+        });
+    }
+
+    function iniciar(datos) {
+        render(document, datos, {actual: datos.periodo.actual, anterior: datos.periodo.anterior});
+    }
+
+    if (window.KPIS) {
+        iniciar(window.KPIS);
+    } else {
+        fetch('kpis.json').then(function (r) { return r.json(); }).then(iniciar);
+    }
+}());
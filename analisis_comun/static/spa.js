@@ -0,0 +1,436 @@
+/*
+ * Vistas de la SPA (spa/index.html) dibujadas desde un solo paquete de datos.
+ *
+ * El paquete (datos.js -> window.DATOS_SPA, o datos.json) trae el snapshot de
+ * KPIs CUDYR y tablas columnares: estadias, smr, spc y pronostico. Cada tabla
+ * columnar tiene {n, columnas: {nombre: {tipo: 'cat'|'num'|'fecha', ...}}}.
+ * 'estadias' no trae filas de pacientes sino conteos por (UTI, MES, DIMENSION,
+ * VALOR); las medias y medianas salen de las distribuciones por valor.
+ *
+ * La vista se elige con el #hash; cada una se dibuja la primera vez que se
+ * abre y luego solo se muestra u oculta.
+ */
+(function () {
+    'use strict';
+
+    var C_NQX = '#e67e22';
+    var C_QX = '#1f77b4';
+    var ROJO = '#c0392b';
+    var AZUL = '#2c3e50';
+    var GRIS = '#95a5a6';
+    var VERDE = '#27ae60';
+    var SEVERIDADES = ['Leve (0-10)', 'Moderado (11-20)', 'Severo (21-30)', 'Muy severo (31+)'];
+    var COLORES_SEV = ['#27ae60', '#f39c12', '#e74c3c', '#8e44ad'];
+    var CONFIG = {displaylogo: false, responsive: true};
+    var LAYOUT = {template: 'plotly_white', margin: {t: 50, b: 50, l: 60, r: 20}, height: 360};
+
+    var datos = null;
+    var dibujadas = {};
+
+    // ── Tablas columnares ───────────────────────────────────────
+
+    function tabla(nombre) {
+        var t = datos.tablas[nombre];
+        if (!t) { return null; }
+        var cache = {};
+        return {
+            n: t.n,
+            tiene: function (col) { return Object.prototype.hasOwnProperty.call(t.columnas, col); },
+            col: function (col) {
+                if (cache[col]) { return cache[col]; }
+                var c = t.columnas[col];
+                var valores;
+                if (!c) {
+                    valores = new Array(t.n).fill(null);
+                } else if (c.tipo === 'cat') {
+                    valores = c.codigos.map(function (k) { return k < 0 ? null : c.niveles[k]; });
+                } else if (c.tipo === 'fecha') {
+                    valores = c.valores.map(function (d) { return d === null ? null : new Date(d * 86400000); });
+                } else {
+                    valores = c.valores;
+                }
+                cache[col] = valores;
+                return valores;
+            }
+        };
+    }
+
+    function indices(t, filtros) {
+        var cols = Object.keys(filtros).map(function (c) { return [t.col(c), filtros[c]]; });
+        var res = [];
+        for (var i = 0; i < t.n; i++) {
+            var ok = true;
+            for (var j = 0; j < cols.length && ok; j++) { ok = cols[j][0][i] === cols[j][1]; }
+            if (ok) { res.push(i); }
+        }
+        return res;
+    }
+
+    function tomar(arr, idx) { return idx.map(function (i) { return arr[i]; }); }
+
+    // ── Conteos de estadias (UTI, MES, DIMENSION, VALOR, N, FALLECIDOS) ──
+
+    /*
+     * Suma N de las filas de `dimension` en la unidad: {valor: n}, o {mes: n}
+     * si porMes. Con dimension 'TOTAL' y campo 'FALLECIDOS' cuenta muertes.
+     */
+    function marginal(est, unidad, dimension, porMes, campo) {
+        var uti = est.col('UTI'), dim = est.col('DIMENSION');
+        var clave = est.col(porMes ? 'MES' : 'VALOR'), n = est.col(campo || 'N');
+        var res = {};
+        for (var i = 0; i < est.n; i++) {
+            if (uti[i] !== unidad || dim[i] !== dimension) { continue; }
+            res[clave[i]] = (res[clave[i]] || 0) + n[i];
+        }
+        return res;
+    }
+
+    function sumaValores(obj) {
+        return Object.keys(obj).reduce(function (a, k) { return a + obj[k]; }, 0);
+    }
+
+    // n, suma, media, desvio (muestral) y mediana de una distribucion {valor: n}
+    function resumenDist(dist) {
+        var pares = Object.keys(dist).map(function (k) { return [Number(k), dist[k]]; })
+            .sort(function (a, b) { return a[0] - b[0]; });
+        var n = 0, suma = 0, cuad = 0;
+        pares.forEach(function (p) { n += p[1]; suma += p[0] * p[1]; });
+        var m = n ? suma / n : NaN;
+        pares.forEach(function (p) { cuad += (p[0] - m) * (p[0] - m) * p[1]; });
+        // Mediana: valores en las posiciones (n-1)/2 y n/2 de la muestra ordenada
+        var ka = Math.floor((n - 1) / 2), kb = Math.floor(n / 2), a = null, b = null, acum = 0;
+        pares.forEach(function (p) {
+            if (a === null && acum + p[1] > ka) { a = p[0]; }
+            if (b === null && acum + p[1] > kb) { b = p[0]; }
+            acum += p[1];
+        });
+        return {n: n, suma: suma, media: m, desvio: n > 1 ? Math.sqrt(cuad / (n - 1)) : NaN,
+                mediana: n ? (a + b) / 2 : NaN};
+    }
+
+    // ── Formato y DOM ───────────────────────────────────────────
+
+    var FMT = {
+        int: function (v) { return Math.round(v).toLocaleString('en-US'); },
+        dec1: function (v) { return isNaN(v) ? '-' : v.toFixed(1); },
+        pct1: function (v) { return isNaN(v) ? '-' : v.toFixed(1) + '%'; },
+        signo_pct1: function (v) { return (v > 0 ? '+' : '') + v.toFixed(1) + '%'; },
+        signo_pp: function (v) { return (v > 0 ? '+' : '') + v.toFixed(1) + ' pp'; }
+    };
+
+    function nodo(tag, clase, html) {
+        var e = document.createElement(tag);
+        if (clase) { e.className = clase; }
+        if (html !== undefined) { e.innerHTML = html; }
+        return e;
+    }
+
+    function escapar(texto) {
+        return String(texto).replace(/[&<>"]/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c];
+        });
+    }
+
+    function tarjeta(titulo, valor, detalle, variacion) {
+        var t = nodo('div', 'card');
+        t.appendChild(nodo('h3', '', escapar(titulo)));
+        t.appendChild(nodo('div', 'valor chico', escapar(valor)));
+        if (variacion) {
+            t.appendChild(nodo('div', 'cambio ' + (variacion.v > 0 ? 'sube' : variacion.v < 0 ? 'baja' : 'neutro'),
+                escapar(variacion.texto)));
+        }
+        if (detalle) { t.appendChild(nodo('div', 'detalle', escapar(detalle))); }
+        return t;
+    }
+
+    function grilla(cont, tarjetas) {
+        var g = nodo('div', 'grid');
+        tarjetas.forEach(function (t) { g.appendChild(t); });
+        cont.appendChild(g);
+    }
+
+    function grafico(cont, trazas, layout) {
+        var div = nodo('div', 'grafico');
+        cont.appendChild(div);
+        Plotly.newPlot(div, trazas, Object.assign({}, LAYOUT, layout), CONFIG);
+    }
+
+    function tablaHtml(cont, encabezados, filas) {
+        var c = nodo('div', 'tabla-container');
+        var html = '<table><thead><tr>' + encabezados.map(function (h) {
+            return '<th>' + escapar(h) + '</th>';
+        }).join('') + '</tr></thead><tbody>';
+        filas.forEach(function (f) {
+            html += '<tr>' + f.map(function (v) { return '<td>' + escapar(v) + '</td>'; }).join('') + '</tr>';
+        });
+        c.innerHTML = html + '</tbody></table>';
+        cont.appendChild(c);
+    }
+
+    function sinDatos(cont, que) {
+        cont.appendChild(nodo('p', 'sin-datos', 'Sin datos de ' + escapar(que) +
+            ': ejecute el script correspondiente y vuelva a generar la SPA.'));
+    }
+
+    // ── Vistas de categorizacion (snapshot de KPIs) ──────────────
+
+    function anios(unidad) {
+        return Object.keys(datos.kpis.unidades[unidad]).filter(function (a) { return /^\d+$/.test(a); });
+    }
+
+    function vistaResumen(cont) {
+        if (!datos.kpis) { sinDatos(cont, 'categorizacion'); return; }
+        var p = datos.kpis.periodo;
+        var u = datos.kpis.unidades.UTINQX;
+        var k = u[p.actual];
+        var a = u[p.anterior];
+        var vs = ' vs ' + p.anterior;
+        grilla(cont, [
+            tarjeta('Total categorizaciones', FMT.int(k.total), p.anterior + ': ' + FMT.int(a.total),
+                {v: k.variacion.total_pct, texto: FMT.signo_pct1(k.variacion.total_pct) + vs}),
+            tarjeta('Pacientes unicos', FMT.int(k.pacientes), p.anterior + ': ' + FMT.int(a.pacientes),
+                {v: k.variacion.pacientes_pct, texto: FMT.signo_pct1(k.variacion.pacientes_pct) + vs}),
+            tarjeta('Categorizaciones por paciente', FMT.dec1(k.cat_por_paciente),
+                p.anterior + ': ' + FMT.dec1(a.cat_por_paciente)),
+            tarjeta('Alto riesgo (A+B)', FMT.pct1(k.pct_alto_riesgo), FMT.int(k.alto_riesgo) + ' categorizaciones',
+                {v: k.variacion.pct_alto_riesgo_pp, texto: FMT.signo_pp(k.variacion.pct_alto_riesgo_pp) + vs}),
+            tarjeta('Categoria A1', FMT.int(k.a1), 'Maximo riesgo y dependencia total',
+                {v: k.variacion.a1_pct, texto: FMT.signo_pct1(k.variacion.a1_pct) + vs}),
+            tarjeta('Pacientes que cambian de categoria', FMT.pct1(k.pct_cambian),
+                FMT.int(k.empeoran) + ' empeoran entre la primera y la ultima categorizacion')
+        ]);
+    }
+
+    function vistaCategorizacion(cont) {
+        if (!datos.kpis) { sinDatos(cont, 'categorizacion'); return; }
+        var p = datos.kpis.periodo;
+        var u = datos.kpis.unidades.UTINQX;
+        var nombres = datos.kpis.meses.map(function (m) { return m.nombre; });
+        function serie(anio, campo) {
+            return datos.kpis.meses.map(function (m) {
+                var v = (u[anio].meses || {})[m.num];
+                return v ? v[campo] : null;
+            });
+        }
+        grafico(cont, [
+            {type: 'bar', x: nombres, y: serie(p.anterior, 'total'), name: String(p.anterior), marker: {color: GRIS}},
+            {type: 'bar', x: nombres, y: serie(p.actual, 'total'), name: String(p.actual), marker: {color: AZUL}}
+        ], {title: 'Categorizaciones por mes', barmode: 'group'});
+        grafico(cont, [
+            {type: 'scatter', mode: 'lines+markers', x: nombres, y: serie(p.anterior, 'pct_alto_riesgo'),
+             name: String(p.anterior), line: {color: GRIS, dash: 'dot'}},
+            {type: 'scatter', mode: 'lines+markers', x: nombres, y: serie(p.actual, 'pct_alto_riesgo'),
+             name: String(p.actual), line: {color: ROJO}}
+        ], {title: '% Alto riesgo (A+B) por mes', yaxis: {ticksuffix: '%'}});
+        var cats = u[p.actual].categorias || {};
+        var claves = Object.keys(cats);
+        grafico(cont, [{type: 'bar', x: claves, y: claves.map(function (c) { return cats[c]; }),
+            marker: {color: claves.map(function (c) { return c[0] === 'A' || c[0] === 'B' ? ROJO : GRIS; })}}],
+            {title: 'Distribucion de categorias ' + p.actual});
+    }
+
+    function vistaAmbas(cont) {
+        if (!datos.kpis) { sinDatos(cont, 'categorizacion'); return; }
+        var filas = [];
+        Object.keys(datos.kpis.unidades).forEach(function (unidad) {
+            anios(unidad).forEach(function (anio) {
+                var k = datos.kpis.unidades[unidad][anio];
+                filas.push([unidad, anio, FMT.int(k.total), FMT.int(k.pacientes), FMT.pct1(k.pct_alto_riesgo),
+                    FMT.int(k.a1), FMT.dec1(k.cat_por_paciente), FMT.pct1(k.pct_cambian)]);
+            });
+        });
+        tablaHtml(cont, ['Unidad', 'Anio', 'Categorizaciones', 'Pacientes', '% A+B', 'A1',
+            'Cat./paciente', '% cambian'], filas);
+        var p = datos.kpis.periodo;
+        var unidades = Object.keys(datos.kpis.unidades);
+        grafico(cont, unidades.map(function (unidad, i) {
+            var k = datos.kpis.unidades[unidad][p.actual] || {};
+            return {type: 'bar', name: unidad, x: ['Categorizaciones', 'Alto riesgo (A+B)', 'A1'],
+                y: [k.total, k.alto_riesgo, k.a1], marker: {color: i ? C_QX : C_NQX}};
+        }), {title: 'Ambas unidades ' + p.actual, barmode: 'group'});
+    }
+
+    // ── Vistas de estadistica (estadias y tablas calculadas) ─────
+
+    function vistaJustificacion(cont) {
+        var est = tabla('estadias');
+        if (!est) { sinDatos(cont, 'estadias'); return; }
+        var n = sumaValores(marginal(est, 'UTINQX', 'TOTAL'));
+        var muertes = sumaValores(marginal(est, 'UTINQX', 'TOTAL', false, 'FALLECIDOS'));
+        var apache = resumenDist(marginal(est, 'UTINQX', 'APACHE_II'));
+        var los = resumenDist(marginal(est, 'UTINQX', 'DIAS_ESTADIA'));
+        var tarjetas = [
+            tarjeta('Pacientes UTINQX', FMT.int(n)),
+            tarjeta('APACHE II promedio', FMT.dec1(apache.media), 'DE ' + FMT.dec1(apache.desvio)),
+            tarjeta('Mortalidad', FMT.pct1(n ? muertes / n * 100 : NaN), FMT.int(muertes) + ' fallecidos'),
+            tarjeta('Estadia promedio', FMT.dec1(los.media) + ' d', 'Mediana ' + FMT.dec1(los.mediana) + ' d'),
+            tarjeta('Dias-paciente', FMT.int(los.suma))
+        ];
+        var smr = tabla('smr');
+        if (smr) {
+            var i = indices(smr, {NIVEL: 'UTI', UTI: 'UTINQX'})[0];
+            if (i !== undefined) {
+                tarjetas.push(tarjeta('SMR (APACHE II)', smr.col('SMR')[i].toFixed(2),
+                    'IC95% ' + smr.col('IC_INF')[i].toFixed(2) + ' - ' + smr.col('IC_SUP')[i].toFixed(2)));
+            }
+        }
+        grilla(cont, tarjetas);
+
+        var sev = marginal(est, 'UTINQX', 'SEVERIDAD_APACHE');
+        grafico(cont, [{type: 'pie', labels: SEVERIDADES, hole: 0.4, sort: false,
+            values: SEVERIDADES.map(function (s) { return sev[s] || 0; }), marker: {colors: COLORES_SEV}}],
+            {title: 'Severidad APACHE II'});
+
+        if (smr) {
+            var filas = indices(smr, {NIVEL: 'UTI+SEVERIDAD_APACHE', UTI: 'UTINQX'});
+            var nombre = tomar(smr.col('SEVERIDAD_APACHE'), filas);
+            grafico(cont, [
+                {type: 'bar', x: nombre, y: tomar(smr.col('TASA_OBSERVADA'), filas), name: 'Observada',
+                 marker: {color: ROJO}},
+                {type: 'scatter', mode: 'markers', x: nombre, y: tomar(smr.col('TASA_ESPERADA'), filas),
+                 name: 'Esperada (APACHE II)', marker: {color: AZUL, symbol: 'diamond', size: 12}}
+            ], {title: 'Mortalidad observada vs esperada por severidad', yaxis: {ticksuffix: '%'}});
+        }
+
+        var pron = tabla('pronostico');
+        var trazas = [];
+        if (pron) {
+            var aj = indices(pron, {UNIDAD: 'UTINQX', TIPO: 'ajuste'});
+            var fu = indices(pron, {UNIDAD: 'UTINQX', TIPO: 'pronostico'});
+            var media_f = tomar(pron.col('MEDIA'), fu);
+            trazas.push({type: 'bar', x: tomar(pron.col('PERIODO'), aj), y: tomar(pron.col('CONTEO'), aj),
+                name: 'Ingresos', marker: {color: C_NQX}});
+            trazas.push({type: 'bar', x: tomar(pron.col('PERIODO'), fu), y: media_f, name: 'Pronostico',
+                marker: {color: C_NQX, opacity: 0.35},
+                error_y: {type: 'data', symmetric: false,
+                    array: tomar(pron.col('SUP'), fu).map(function (v, j) { return v - media_f[j]; }),
+                    arrayminus: tomar(pron.col('INF'), fu).map(function (v, j) { return media_f[j] - v; })}});
+        } else {
+            var meses = marginal(est, 'UTINQX', 'TOTAL', true);
+            var ks = Object.keys(meses).sort();
+            trazas.push({type: 'bar', x: ks, y: ks.map(function (m) { return meses[m]; }), marker: {color: C_NQX}});
+        }
+        grafico(cont, trazas, {title: 'Ingresos mensuales UTINQX'});
+
+        var spc = tabla('spc');
+        if (spc) {
+            var f = indices(spc, {SERIE: 'MORTALIDAD', UNIDAD: 'UTINQX'});
+            if (f.length) {
+                var x = tomar(spc.col('PERIODO'), f);
+                var valor = tomar(spc.col('VALOR'), f).map(function (v) { return v * 100; });
+                var senal = tomar(spc.col('SENAL'), f);
+                var pct = function (col) { return tomar(spc.col(col), f).map(function (v) { return v * 100; }); };
+                grafico(cont, [
+                    {type: 'scatter', mode: 'lines+markers', x: x, y: valor, name: 'Mortalidad',
+                     marker: {color: senal.map(function (s) { return s === true || s === 'True' || s === 1 ? ROJO : AZUL; }), size: 8}},
+                    {type: 'scatter', mode: 'lines', x: x, y: pct('LC'), name: 'LC', line: {color: VERDE}},
+                    {type: 'scatter', mode: 'lines', x: x, y: pct('LCS'), name: 'LCS', line: {color: GRIS, dash: 'dash'}},
+                    {type: 'scatter', mode: 'lines', x: x, y: pct('LCI'), name: 'LCI', line: {color: GRIS, dash: 'dash'}}
+                ], {title: 'Mortalidad mensual (grafico p; en rojo meses con senal)', yaxis: {ticksuffix: '%'}});
+            }
+        }
+    }
+
+    function vistaComparativo(cont) {
+        var est = tabla('estadias');
+        if (!est) { sinDatos(cont, 'estadias'); return; }
+        var unidades = [['UTIQX', C_QX], ['UTINQX', C_NQX]];
+        var totales = unidades.map(function (u) { return sumaValores(marginal(est, u[0], 'TOTAL')); });
+        function metrica(dim, campo) {
+            return unidades.map(function (u) { return resumenDist(marginal(est, u[0], dim))[campo]; });
+        }
+        function porcentaje(dim, valores) {
+            return unidades.map(function (u) {
+                var d = marginal(est, u[0], dim);
+                var total = sumaValores(d);
+                var parte = valores.reduce(function (a, v) { return a + (d[v] || 0); }, 0);
+                return FMT.pct1(total ? parte / total * 100 : NaN);
+            });
+        }
+        var muertes = unidades.map(function (u) { return sumaValores(marginal(est, u[0], 'TOTAL', false, 'FALLECIDOS')); });
+        var filas = [
+            ['Pacientes'].concat(totales.map(FMT.int)),
+            ['APACHE II promedio'].concat(metrica('APACHE_II', 'media').map(FMT.dec1)),
+            ['Estadia promedio (d)'].concat(metrica('DIAS_ESTADIA', 'media').map(FMT.dec1)),
+            ['Estadia mediana (d)'].concat(metrica('DIAS_ESTADIA', 'mediana').map(FMT.dec1)),
+            ['Mortalidad'].concat(muertes.map(function (m, i) { return FMT.pct1(totales[i] ? m / totales[i] * 100 : NaN); })),
+            ['60 anos o mas'].concat(porcentaje('GRUPO_ETARIO', ['60-74', '75+']))
+        ];
+        tablaHtml(cont, ['Indicador', 'UTIQX', 'UTINQX'], filas);
+
+        grafico(cont, unidades.map(function (u, i) {
+            var d = marginal(est, u[0], 'APACHE_II');
+            var x = Object.keys(d);
+            return {type: 'histogram', x: x.map(Number), y: x.map(function (k) { return d[k]; }),
+                histfunc: 'sum', name: u[0], opacity: 0.6, histnorm: 'percent', marker: {color: u[1]},
+                xbins: {size: 2}};
+        }), {title: 'Distribucion de APACHE II (%)', barmode: 'overlay'});
+
+        grafico(cont, unidades.map(function (u, i) {
+            var c = marginal(est, u[0], 'SEVERIDAD_APACHE');
+            return {type: 'bar', name: u[0], x: SEVERIDADES, marker: {color: u[1]},
+                y: SEVERIDADES.map(function (s) { return (c[s] || 0) / totales[i] * 100; })};
+        }), {title: 'Severidad APACHE II (% de cada unidad)', barmode: 'group', yaxis: {ticksuffix: '%'}});
+
+        var dx = {};
+        unidades.forEach(function (u) {
+            var c = marginal(est, u[0], 'CATEGORIA_DX');
+            Object.keys(c).forEach(function (k) { dx[k] = (dx[k] || 0) + c[k]; });
+        });
+        var top = Object.keys(dx).sort(function (a, b) { return dx[b] - dx[a]; }).slice(0, 8);
+        grafico(cont, unidades.map(function (u, i) {
+            var c = marginal(est, u[0], 'CATEGORIA_DX');
+            return {type: 'bar', name: u[0], orientation: 'h', y: top, marker: {color: u[1]},
+                x: top.map(function (d) { return c[d] || 0; })};
+        }), {title: 'Categorias diagnosticas (8 mas frecuentes)', barmode: 'group',
+            margin: {t: 50, b: 40, l: 180, r: 20}, height: 420});
+
+        grafico(cont, unidades.map(function (u, i) {
+            var m = marginal(est, u[0], 'TOTAL', true);
+            var ks = Object.keys(m).sort();
+            return {type: 'bar', name: u[0], x: ks, y: ks.map(function (k) { return m[k]; }), marker: {color: u[1]}};
+        }), {title: 'Ingresos mensuales', barmode: 'group'});
+    }
+
+    var VISTAS = {
+        resumen: vistaResumen,
+        categorizacion: vistaCategorizacion,
+        ambas: vistaAmbas,
+        justificacion: vistaJustificacion,
+        comparativo: vistaComparativo
+    };
+
+    // ── Navegacion ──────────────────────────────────────────────
+
+    function mostrar() {
+        var clave = location.hash.slice(1);
+        if (!VISTAS[clave]) { clave = 'resumen'; }
+        document.querySelectorAll('.vista').forEach(function (s) {
+            s.hidden = s.id !== 'vista-' + clave;
+        });
+        document.querySelectorAll('[data-vista]').forEach(function (a) {
+            a.classList.toggle('active', a.getAttribute('data-vista') === clave);
+        });
+        var seccion = document.getElementById('vista-' + clave);
+        if (!dibujadas[clave]) {
+            VISTAS[clave](seccion.querySelector('.contenido'));
+            dibujadas[clave] = true;
+        }
+    }
+
+    function iniciar(paquete) {
+        datos = paquete;
+        if (datos.kpis) {
+            document.getElementById('spa-periodo').textContent =
+                datos.kpis.periodo.anterior + '-' + datos.kpis.periodo.actual;
+        }
+        window.addEventListener('hashchange', mostrar);
+        mostrar();
+    }
+
+    if (window.DATOS_SPA) {
+        iniciar(window.DATOS_SPA);
+    } else {
+        fetch('datos.json').then(function (r) { return r.json(); }).then(iniciar);
+    }
+}());
@@ -0,0 +1,206 @@
+"""
+Estadia como tiempo hasta el egreso: Kaplan-Meier e incidencia acumulada
+=======================================================================
+Las estadias sin EGRESO al momento de la extraccion no tienen duracion
+conocida: se censuran en la fecha de corte en vez de descartarlas o truncar
+el histograma. Para cada estrato (p. ej. UTI x SEVERIDAD_APACHE x
+CATEGORIA_DX) se calcula:
+
+- S(t): probabilidad de seguir en la unidad a los t dias (Kaplan-Meier,
+  evento = cualquier egreso),
+- incidencia acumulada de muerte en la unidad (Aalen-Johansen, con el egreso
+  vivo como riesgo competitivo).
+
+Todos los estratos se resuelven en una sola pasada: se ordena por (estrato,
+tiempo), se cuentan eventos y censuras por tiempo distinto con np.bincount y
+el producto de Kaplan-Meier se acumula con np.cumsum de log(1 - d/n),
+reiniciando en cada estrato. La prueba log-rank entre grupos usa la misma
+tabla de tiempos en forma matricial (tiempos x grupos).
+
+Las curvas se guardan en cache por hash del dataset como arreglos de
+escalones compactos (tiempos y valores redondeados) listos para los graficos.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis_comun.exportar import guardar_json, hash_dataset
+from analisis_comun.perezoso import importar_perezoso
+
+stats = importar_perezoso('scipy.stats')
+
+ESTRATOS_KM = ('UTI', 'SEVERIDAD_APACHE', 'CATEGORIA_DX')
+DECIMALES_KM = 4
+
+
+def tiempos_estadia(df, col_ingreso='INGRESO', col_egreso='EGRESO', fecha_corte=None):
+    """
+    Dias desde el ingreso hasta el egreso (evento) o hasta la fecha de corte
+    (censura, estadias abiertas). Devuelve (tiempo, evento) como arreglos.
+    """
+    ingreso = pd.to_datetime(df[col_ingreso])
+    egreso = pd.to_datetime(df[col_egreso])
+    if fecha_corte is None:
+        fecha_corte = max(ingreso.max(), egreso.max())
+    evento = egreso.notna().to_numpy()
+    fin = egreso.fillna(pd.Timestamp(fecha_corte))
+    tiempo = ((fin - ingreso).dt.total_seconds() / 86400).to_numpy()
+    return np.round(tiempo, 2), evento
+
+
+def _tabla_tiempos(codigo, tiempo, evento, muerte):
+    """Una fila por (estrato, tiempo distinto) con n en riesgo, eventos, muertes y censuras."""
+    orden = np.lexsort((tiempo, codigo))
+    cod, t, ev, mu = codigo[orden], tiempo[orden], evento[orden], muerte[orden]
+    nuevo = np.r_[True, (cod[1:] != cod[:-1]) | (t[1:] != t[:-1])]
+    id_fila = np.cumsum(nuevo) - 1
+    n_filas = id_fila[-1] + 1
+    d = np.bincount(id_fila, weights=ev.astype(float), minlength=n_filas)
+    d_muerte = np.bincount(id_fila, weights=(ev & mu).astype(float), minlength=n_filas)
+    total = np.bincount(id_fila, minlength=n_filas)
+    cod_fila, t_fila = cod[nuevo], t[nuevo]
+
+    # En riesgo: tamano del estrato menos los que salieron antes (evento o censura)
+    tam = np.bincount(cod)
+    salieron = np.cumsum(total) - total
+    inicio = np.r_[True, cod_fila[1:] != cod_fila[:-1]]
+    base = np.maximum.accumulate(np.where(inicio, salieron, 0))
+    en_riesgo = tam[cod_fila] - (salieron - base)
+    return cod_fila, t_fila, en_riesgo, d, d_muerte, inicio
+
+
+def curvas_km(df, estratos=ESTRATOS_KM, col_muerte='FALLECIDO', **kwargs_tiempo):
+    """
+    Curvas de todos los estratos (combinaciones de las columnas `estratos`)
+    en una pasada. Devuelve un DataFrame largo con las columnas de estrato,
+    TIEMPO, EN_RIESGO, EGRESOS, MUERTES, SUPERVIVENCIA (KM) y CIF_MUERTE.
+    """
+    tiempo, evento = tiempos_estadia(df, **kwargs_tiempo)
+    muerte = (df[col_muerte].fillna(0).to_numpy() > 0) if col_muerte in df else np.zeros(len(df), bool)
+    validos = ~np.isnan(tiempo) & (tiempo >= 0)
+    claves = pd.MultiIndex.from_frame(df.loc[validos, list(estratos)].astype(str))
+    codigo, niveles = claves.factorize()
+
+    cod, t, n, d, dm, inicio = _tabla_tiempos(codigo, tiempo[validos], evento[validos], muerte[validos])
+    factor = 1 - d / n
+    # Producto acumulado por estrato via log; factor 0 solo ocurre en el ultimo tiempo del estrato
+    log_f = np.log(np.where(factor > 0, factor, 1.0))
+    acum = np.cumsum(log_f)
+    base = np.maximum.accumulate(np.where(inicio, np.arange(len(acum)), 0))
+    previo = np.where(base > 0, acum[base - 1], 0.0)
+    surv = np.exp(acum - previo)
+    surv[factor <= 0] = 0.0
+
+    # Aalen-Johansen: CIF(t) = sum S(t-) * d_muerte / n, con S(t-) = S del tiempo anterior del estrato
+    s_prev = np.where(inicio, 1.0, np.r_[1.0, surv[:-1]])
+    inc = s_prev * dm / n
+    acum_inc = np.cumsum(inc)
+    cif = acum_inc - np.where(base > 0, acum_inc[base - 1], 0.0)
+
+    tabla = pd.DataFrame(np.asarray(niveles.tolist(), dtype=object)[cod], columns=list(estratos))
+    tabla['TIEMPO'] = t
+    tabla['EN_RIESGO'] = n.astype(np.int64)
+    tabla['EGRESOS'] = d.astype(np.int64)
+    tabla['MUERTES'] = dm.astype(np.int64)
+    tabla['SUPERVIVENCIA'] = surv
+    tabla['CIF_MUERTE'] = cif
+    return tabla
+
+
+def mediana_km(curvas, estratos):
+    """Primer tiempo con S(t) <= 0.5 por estrato (NaN si la curva no baja de 0.5)."""
+    bajo = curvas[curvas['SUPERVIVENCIA'] <= 0.5]
+    med = bajo.groupby(list(estratos), sort=False)['TIEMPO'].first()
+    todos = curvas.groupby(list(estratos), sort=False).size().index
+    return med.reindex(todos)
+
+
+def log_rank(df, grupo, estrato=None, **kwargs_tiempo):
+    """
+    Prueba log-rank de igualdad de curvas entre los niveles de `grupo`
+    (estratificada por `estrato` si se indica). Devuelve (estadistico, gl, p).
+    """
+    tiempo, evento = tiempos_estadia(df, **kwargs_tiempo)
+    validos = ~np.isnan(tiempo) & (tiempo >= 0)
+    g, _ = pd.factorize(df.loc[validos, grupo].astype(str))
+    s = (pd.factorize(df.loc[validos, estrato].astype(str))[0] if estrato
+         else np.zeros(validos.sum(), dtype=np.int64))
+    t, ev = tiempo[validos], evento[validos]
+    k = g.max() + 1
+
+    # Matriz (estrato, tiempo) x grupo de eventos y salidas
+    codigo_t, _ = pd.MultiIndex.from_arrays([s, t]).factorize(sort=True)
+    n_t = codigo_t.max() + 1
+    eventos = np.bincount(codigo_t * k + g, weights=ev.astype(float), minlength=n_t * k).reshape(n_t, k)
+    salidas = np.bincount(codigo_t * k + g, minlength=n_t * k).reshape(n_t, k)
+    estrato_t = np.zeros(n_t, dtype=np.int64)
+    estrato_t[codigo_t] = s
+
+    # En riesgo por grupo: total del estrato menos salidas acumuladas antes de cada tiempo
+    acum = np.cumsum(salidas, axis=0) - salidas
+    inicio = np.r_[True, estrato_t[1:] != estrato_t[:-1]]
+    fila_base = np.maximum.accumulate(np.where(inicio, np.arange(n_t), 0))
+    tam = np.zeros((estrato_t.max() + 1, k))
+    np.add.at(tam, (s, g), 1)
+    en_riesgo = tam[estrato_t] - (acum - acum[fila_base])
+
+    n = en_riesgo.sum(axis=1)
+    d = eventos.sum(axis=1)
+    con = (n > 1) & (d > 0)
+    n, d, en_riesgo, eventos = n[con], d[con], en_riesgo[con], eventos[con]
+    esperados = en_riesgo * (d / n)[:, None]
+    o_menos_e = (eventos - esperados).sum(axis=0)
+    # V = sum_t f_t * (n_t * diag(n_it) - n_it n_jt), f_t = d(n - d) / (n^2 (n - 1))
+    factor = d * (n - d) / (n * n * (n - 1))
+    v = np.diag((factor * n) @ en_riesgo) - np.einsum('t,ti,tj->ij', factor, en_riesgo, en_riesgo)
+    # Se descarta un grupo (la varianza es singular)
+    estadistico = float(o_menos_e[:-1] @ np.linalg.pinv(v[:-1, :-1]) @ o_menos_e[:-1])
+    gl = int(k - 1)
+    return estadistico, gl, float(stats.chi2.sf(estadistico, gl)) if gl > 0 else np.nan
+
+
+def mediana_escalon(entrada):
+    """Mediana de una curva de `escalones` (primer t con S <= 0.5), o None."""
+    s = np.asarray(entrada['SUPERVIVENCIA'])
+    bajo = np.flatnonzero(s <= 0.5)
+    return entrada['t'][bajo[0]] if len(bajo) else None
+
+
+def escalones(curvas, estratos, columnas=('SUPERVIVENCIA', 'CIF_MUERTE')):
+    """
+    {estrato 'A|B|C': {'n': n, 't': [...], 'SUPERVIVENCIA': [...], ...}} con
+    t = 0 al inicio y valores redondeados (funcion escalon, 'hv' en plotly).
+    """
+    resultado = {}
+    for clave, g in curvas.groupby(list(estratos), sort=True):
+        clave = clave if isinstance(clave, tuple) else (clave,)
+        entrada = {'n': int(g['EN_RIESGO'].iloc[0]), 't': [0.0] + g['TIEMPO'].round(2).tolist()}
+        for col in columnas:
+            inicial = 1.0 if col == 'SUPERVIVENCIA' else 0.0
+            entrada[col] = [inicial] + g[col].round(DECIMALES_KM).tolist()
+        resultado['|'.join(clave)] = entrada
+    return resultado
+
+
+def curvas_en_cache(df, estratos=ESTRATOS_KM, cache_dir='cache', **kwargs_tiempo):
+    """
+    Escalones de curvas_km para `estratos`, leidos de cache/km_<hash>.json si
+    el dataset (columnas usadas) y las opciones de tiempo no cambiaron.
+    """
+    columnas = [*estratos, 'INGRESO', 'EGRESO', 'FALLECIDO',
+                *(v for k, v in sorted(kwargs_tiempo.items()) if k.startswith('col_'))]
+    columnas = [c for c in dict.fromkeys(columnas) if c in df.columns]
+    clave = hash_dataset(df, columnas) + '_' + '-'.join(estratos)
+    if kwargs_tiempo:
+        opciones = json.dumps(kwargs_tiempo, sort_keys=True, default=str)
+        clave += '_' + hashlib.sha1(opciones.encode('utf-8')).hexdigest()[:8]
+    ruta = Path(cache_dir) / f'km_{clave}.json'
+    if ruta.exists():
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    datos = escalones(curvas_km(df, estratos, **kwargs_tiempo), estratos)
+    guardar_json(ruta, datos)
+    return datos
@@ -0,0 +1,110 @@
+"""
+Presupuesto de tiempo de importacion (python -X importtime)
+===========================================================
+Cada conjunto agrupa los modulos que importa un tipo de ejecucion. Se importan
+en un interprete nuevo con ``-X importtime`` y se suma el tiempo propio de
+cada modulo cargado (mejor de varias repeticiones). El conjunto falla si
+supera su presupuesto en ms o si carga alguno de los modulos prohibidos
+(p. ej. scipy.stats o plotly para generar solo tablas o el snapshot de KPIs).
+
+    python -m analisis_comun.tiempos_importacion
+    python -m analisis_comun.tiempos_importacion --conjunto tablas --repeticiones 5
+
+Los presupuestos son para un equipo de escritorio; en maquinas lentas se
+pueden escalar con ``--factor``.
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+SCRIPT_TABLAS = RAIZ / 'analisis_categorizacion' / 'crear_dashboard.py'
+
+
+def modulos_del_script(ruta, paquete='analisis_comun'):
+    """Modulos de `paquete` que `ruta` importa a nivel de modulo (leidos con ast, sin ejecutarlo)."""
+    arbol = ast.parse(Path(ruta).read_text(encoding='utf-8'))
+    modulos = set()
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.ImportFrom) and nodo.module and nodo.module.split('.')[0] == paquete:
+            modulos.add(nodo.module)
+        elif isinstance(nodo, ast.Import):
+            modulos.update(a.name for a in nodo.names if a.name.split('.')[0] == paquete)
+    return sorted(modulos)
+
+
+# Modulos que importa crear_dashboard.py (tomados del script para que no se desactualicen)
+MODULOS_TABLAS = modulos_del_script(SCRIPT_TABLAS)
+PESADOS = ('scipy.stats', 'plotly.graph_objects', 'plotly.subplots', 'plotly.express')
+
+# nombre -> (modulos a importar, presupuesto en ms, modulos que no deben cargarse)
+CONJUNTOS = {
+    'kpis': (['analisis_comun.kpis'], 600, PESADOS),
+    'tablas': (MODULOS_TABLAS, 700, PESADOS),
+    'estadistica': (['analisis_comun.mortalidad', 'analisis_comun.pronostico',
+                     'analisis_comun.supervivencia', 'analisis_comun.spc',
+                     'analisis_comun.metricas', 'analisis_comun.render'], 700, PESADOS),
+}
+
+
+def medir(modulos):
+    """
+    Importa `modulos` en un proceso nuevo con -X importtime.
+    Devuelve (total_ms, {modulo: (propio_ms, acumulado_ms)}).
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(RAIZ), env.get('PYTHONPATH')]))
+    codigo = '; '.join(f'import {m}' for m in modulos)
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                         env=env, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr.strip().splitlines()[-1])
+    tiempos = {}
+    for linea in res.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        tiempos[nombre.strip()] = (int(propio) / 1000, int(acumulado) / 1000)
+    return sum(p for p, _ in tiempos.values()), tiempos
+
+
+def evaluar(nombre, repeticiones=3, factor=1.0):
+    """Mejor medicion de `repeticiones` para el conjunto `nombre` y sus fallas."""
+    modulos, presupuesto, prohibidos = CONJUNTOS[nombre]
+    total, tiempos = min((medir(modulos) for _ in range(repeticiones)), key=lambda r: r[0])
+    fallas = [f'carga {m}' for m in prohibidos if m in tiempos]
+    if total > presupuesto * factor:
+        fallas.append(f'{total:.0f} ms > presupuesto {presupuesto * factor:.0f} ms')
+    return total, tiempos, fallas
+
+
+def _main():
+    parser = argparse.ArgumentParser(description='Verifica el presupuesto de tiempo de importacion.')
+    parser.add_argument('--conjunto', choices=sorted(CONJUNTOS), action='append',
+                        help='conjunto a medir (por defecto todos)')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--factor', type=float, default=1.0,
+                        help='multiplica los presupuestos (maquinas lentas)')
+    parser.add_argument('--top', type=int, default=8, help='modulos mas lentos a mostrar')
+    args = parser.parse_args()
+
+    con_fallas = False
+    for nombre in args.conjunto or list(CONJUNTOS):
+        total, tiempos, fallas = evaluar(nombre, args.repeticiones, args.factor)
+        presupuesto = CONJUNTOS[nombre][1] * args.factor
+        print(f"{nombre:<12} {total:7.0f} ms  (presupuesto {presupuesto:.0f} ms)  "
+              f"{'OK' if not fallas else 'FALLA: ' + '; '.join(fallas)}")
+        # Paquetes de primer nivel mas costosos (tiempo acumulado)
+        primer_nivel = {m: a for m, (_, a) in tiempos.items() if '.' not in m}
+        for m, acumulado in sorted(primer_nivel.items(), key=lambda x: -x[1])[:args.top]:
+            print(f"    {acumulado:7.1f} ms  {m}")
+        con_fallas |= bool(fallas)
+    sys.exit(1 if con_fallas else 0)
+
+
+if __name__ == '__main__':
+    _main()
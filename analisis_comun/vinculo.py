@@ -0,0 +1,130 @@
+"""
+Vinculo entre categorizaciones CUDYR y estadias del dataset EDA
+==============================================================
+Ambos datasets usan el mismo ID_PACIENTE seudonimo (misma clave HMAC), por lo
+que cada categorizacion diaria se puede asignar a la estadia que la contiene:
+un merge_asof ordenado por fecha, agrupado por paciente y unidad, toma la
+ultima estadia con ingreso <= fecha de categorizacion y luego se descartan
+las que caen despues del egreso. No hay busqueda anidada paciente por
+paciente.
+
+El resultado es una tabla por estadia (columnar) con APACHE II, desenlace y el
+resumen de la trayectoria CUDYR: cantidad de categorizaciones, primera,
+ultima y maxima categoria, puntajes y % de dias en alto riesgo.
+"""
+import numpy as np
+import pandas as pd
+
+from analisis_comun.pacientes import puntaje_cudyr
+
+
+def unir_categorizaciones(datasets, col_fecha='FECHA_CATEGORIZACION'):
+    """
+    Concatena {(unidad, anio): DataFrame} en un solo DataFrame con las
+    columnas necesarias para el vinculo (UNIDAD se toma de la clave).
+    """
+    partes = []
+    for (unidad, _), df in datasets.items():
+        partes.append(pd.DataFrame({
+            'ID_PACIENTE': df['ID_PACIENTE'].to_numpy(dtype=np.int64),
+            'UNIDAD': unidad,
+            'FECHA': pd.to_datetime(df[col_fecha]).dt.normalize(),
+            'CATEGORIA': df['CATEGORIA'].astype('string'),
+        }))
+    return pd.concat(partes, ignore_index=True)
+
+
+def vincular_categorizaciones(categorizaciones, estadias, col_unidad='UTI',
+                              col_ingreso='INGRESO', col_egreso='EGRESO'):
+    """
+    Agrega a cada categorizacion la columna ID_ESTADIA (indice de la fila en
+    `estadias`) de la estadia que la contiene, o -1 si no hay ninguna.
+    Una categorizacion pertenece a la estadia si es de la misma unidad y su
+    fecha esta entre el dia de ingreso y el dia de egreso (ambos incluidos);
+    las estadias sin egreso se consideran abiertas. Si dos estadias del mismo
+    paciente se solapan, se prueba solo la de ingreso mas reciente.
+    """
+    cat = categorizaciones[(categorizaciones['ID_PACIENTE'] >= 0)
+                           & categorizaciones['FECHA'].notna()].copy()
+    cat['_fila'] = np.arange(len(cat))
+    est = pd.DataFrame({
+        'ID_PACIENTE': estadias['ID_PACIENTE'].to_numpy(dtype=np.int64),
+        'UNIDAD': estadias[col_unidad].astype(str).to_numpy(),
+        'DIA_INGRESO': pd.to_datetime(estadias[col_ingreso]).dt.normalize().to_numpy(),
+        'DIA_EGRESO': pd.to_datetime(estadias[col_egreso]).dt.normalize().to_numpy(),
+        'ID_ESTADIA': np.arange(len(estadias)),
+    })
+    est = est[(est['ID_PACIENTE'] >= 0) & est['DIA_INGRESO'].notna()]
+    cat['UNIDAD'] = cat['UNIDAD'].astype(str)
+
+    unido = pd.merge_asof(
+        cat.sort_values('FECHA'), est.sort_values('DIA_INGRESO'),
+        left_on='FECHA', right_on='DIA_INGRESO', by=['ID_PACIENTE', 'UNIDAD'],
+        direction='backward',
+    )
+    dentro = unido['ID_ESTADIA'].notna() & ~(unido['FECHA'] > unido['DIA_EGRESO'])
+    id_estadia = np.full(len(cat), -1, dtype=np.int64)
+    id_estadia[unido.loc[dentro, '_fila'].to_numpy()] = unido.loc[dentro, 'ID_ESTADIA'].to_numpy(dtype=np.int64)
+
+    resultado = categorizaciones.copy()
+    resultado['ID_ESTADIA'] = -1
+    resultado.loc[cat.index, 'ID_ESTADIA'] = id_estadia
+    return resultado
+
+
+def tabla_estadias_vinculadas(estadias, categorizaciones, col_unidad='UTI',
+                              col_ingreso='INGRESO', col_egreso='EGRESO'):
+    """
+    Tabla por estadia: las columnas de `estadias` mas la trayectoria CUDYR
+    (N_CATEGORIZACIONES, CATEGORIA_INICIAL, CATEGORIA_FINAL, CATEGORIA_MAXIMA,
+    PUNTAJE_INICIAL, PUNTAJE_FINAL, PUNTAJE_MAXIMO, PUNTAJE_MEDIO,
+    PCT_ALTO_RIESGO y TRAYECTORIA, p. ej. "A1>B1>B2"). Las estadias sin
+    categorizaciones quedan con N_CATEGORIZACIONES = 0.
+    """
+    vinc = vincular_categorizaciones(categorizaciones, estadias, col_unidad,
+                                     col_ingreso, col_egreso)
+    vinc = vinc[vinc['ID_ESTADIA'] >= 0]
+    orden = np.lexsort((vinc['FECHA'].to_numpy(), vinc['ID_ESTADIA'].to_numpy()))
+    ids = vinc['ID_ESTADIA'].to_numpy()[orden]
+    cats = vinc['CATEGORIA'].to_numpy(dtype=object)[orden]
+    puntajes = puntaje_cudyr(vinc['CATEGORIA'])[orden].astype(np.int64)
+    alto = vinc['CATEGORIA'].str[0].isin(['A', 'B']).to_numpy(dtype=bool)[orden]
+
+    n_est = len(estadias)
+    n = np.bincount(ids, minlength=n_est)
+    corte = np.r_[True, ids[1:] != ids[:-1]] if len(ids) else np.zeros(0, dtype=bool)
+    primero = np.flatnonzero(corte)
+    ultimo = np.r_[primero[1:] - 1, len(ids) - 1] if len(ids) else primero
+    est_ids = ids[primero]
+
+    tabla = estadias.reset_index(drop=True).copy()
+    tabla['N_CATEGORIZACIONES'] = n
+    tabla['CATEGORIA_INICIAL'] = pd.Series(pd.NA, index=tabla.index, dtype='string')
+    tabla['CATEGORIA_FINAL'] = pd.Series(pd.NA, index=tabla.index, dtype='string')
+    tabla['CATEGORIA_MAXIMA'] = pd.Series(pd.NA, index=tabla.index, dtype='string')
+    tabla.loc[est_ids, 'CATEGORIA_INICIAL'] = cats[primero]
+    tabla.loc[est_ids, 'CATEGORIA_FINAL'] = cats[ultimo]
+
+    if len(ids):
+        # Categoria maxima: primera fila (en orden de fecha) que alcanza el puntaje maximo
+        suma = np.add.reduceat(puntajes, primero)
+        maximo = np.maximum.reduceat(puntajes, primero)
+        es_max = puntajes == np.repeat(maximo, np.diff(np.r_[primero, len(ids)]))
+        pos_max = np.minimum.reduceat(np.where(es_max, np.arange(len(ids)), len(ids)), primero)
+        tabla.loc[est_ids, 'CATEGORIA_MAXIMA'] = cats[pos_max]
+        tabla['PUNTAJE_INICIAL'] = pd.Series(puntajes[primero], index=est_ids).reindex(tabla.index).astype('Int8')
+        tabla['PUNTAJE_FINAL'] = pd.Series(puntajes[ultimo], index=est_ids).reindex(tabla.index).astype('Int8')
+        tabla['PUNTAJE_MAXIMO'] = pd.Series(maximo, index=est_ids).reindex(tabla.index).astype('Int8')
+        tabla['PUNTAJE_MEDIO'] = pd.Series(suma / n[est_ids], index=est_ids).reindex(tabla.index)
+        tabla['PCT_ALTO_RIESGO'] = pd.Series(
+            np.add.reduceat(alto.astype(np.int64), primero) / n[est_ids] * 100, index=est_ids
+        ).reindex(tabla.index)
+        trayectoria = pd.Series(cats).fillna('?').groupby(ids, sort=True).agg('>'.join)
+        tabla['TRAYECTORIA'] = trayectoria.reindex(tabla.index).astype('string')
+    else:
+        for c in ['PUNTAJE_INICIAL', 'PUNTAJE_FINAL', 'PUNTAJE_MAXIMO']:
+            tabla[c] = pd.Series(pd.NA, index=tabla.index, dtype='Int8')
+        tabla['PUNTAJE_MEDIO'] = np.nan
+        tabla['PCT_ALTO_RIESGO'] = np.nan
+        tabla['TRAYECTORIA'] = pd.Series(pd.NA, index=tabla.index, dtype='string')
+    return tabla
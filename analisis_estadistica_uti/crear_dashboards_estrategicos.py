@@ -3,18 +3,48 @@ Genera dos dashboards HTML estratégicos:
 1. reporte_justificacion_utinqx.html — Evidencia clínica para justificar segundo enfermero
 2. dashboard_comparativo_clinico.html — Comparación de perfiles UTINQX vs UTIQX
 """
+import sys
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from scipy.stats import mannwhitneyu, chi2_contingency
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analisis_comun.anonimizacion import cargar_clave, huella_clave
+from analisis_comun.censo import censo_diario, resumen_censo
+from analisis_comun.flujo import SIN_DATO, conteos, figura_sankey, flujo_en_cache
+from analisis_comun.lectura import leer_csv
+from analisis_comun.metricas import (METRICAS_EDA, backend_elegido, calcular_metricas,
+                                     columnas_usadas, como_dict, como_tabla)
+from analisis_comun.mortalidad import (NIVELES_EMBUDO, curvas_embudo, guardar_tabla_smr,
+                                       seleccionar, tabla_smr)
+from analisis_comun.pronostico import conteos_mensuales, pronosticar
+from analisis_comun.reingresos import (guardar_tabla_reingresos, marcar_reingresos,
+                                       tabla_reingresos)
+from analisis_comun.render import enlaces_nav, figura_plotly, renderizar
+from analisis_comun.sketches import celdas_a_json, resumir_celdas
+from analisis_comun.spc import serie_mensual, tabla_spc
+from analisis_comun.supervivencia import curvas_en_cache, log_rank, mediana_escalon
+
 # ── Cargar datos ─────────────────────────────────────────────────
-df = pd.read_csv('eda_outputs/dataset_limpio_anonimizado.csv',
-                 parse_dates=['INGRESO', 'EGRESO'])
+df = leer_csv('eda_outputs/dataset_limpio_anonimizado.csv',
+              parse_dates=['INGRESO', 'EGRESO'])
 nqx = df[df.UTI == 'UTINQX'].copy()
 qx = df[df.UTI == 'UTIQX'].copy()
 
+# KPIs agregados con el motor elegido (--backend=pandas|polars|duckdb o UTI_BACKEND)
+BACKEND = backend_elegido()
+metricas = calcular_metricas(
+    df, [m for m in METRICAS_EDA if set(columnas_usadas(m)) <= set(df.columns)], BACKEND)
+estadias_uti = como_dict(metricas['estadias_uti'], 'UTI')
+mortalidad_uti = como_dict(metricas['mortalidad_uti'], 'UTI')
+apache_uti = como_dict(metricas['apache_medio_uti'], 'UTI')
+mod_plus_uti = como_dict(metricas['severidad_moderada_uti'], 'UTI')
+severo_plus_uti = como_dict(metricas['severidad_severa_uti'], 'UTI')
+
 # ── Paleta ───────────────────────────────────────────────────────
 C_NQX = '#e67e22'
 C_QX = '#1f77b4'
@@ -27,8 +57,8 @@ edad_order = ['<18', '18-39', '40-59', '60-74', '75+']
 estadia_order = ['Corta (<2d)', 'Media (2-4d)', 'Larga (5-9d)', 'Prolongada (10+d)']
 
 # ── Estadísticas UTINQX ─────────────────────────────────────────
-n_total = len(nqx)
-apache_mean = round(nqx.APACHE_II.mean(), 1)
+n_total = int(estadias_uti['UTINQX'])
+apache_mean = round(apache_uti['UTINQX'], 1)
 apache_std = round(nqx.APACHE_II.std(), 1)
 apache_median = nqx.APACHE_II.median()
 apache_p75 = nqx.APACHE_II.quantile(0.75)
@@ -40,7 +70,7 @@ los_p75 = nqx.DIAS_ESTADIA.quantile(0.75)
 los_p90 = nqx.DIAS_ESTADIA.quantile(0.90)
 los_p95 = nqx.DIAS_ESTADIA.quantile(0.95)
 edad_mean = round(nqx.EDAD.mean(), 1)
-mort_pct = round(nqx.FALLECIDO.mean() * 100, 2)
+mort_pct = round(mortalidad_uti['UTINQX'] * 100, 2)
 n_fallecidos = int(nqx.FALLECIDO.sum())
 patient_days = int(nqx.DIAS_ESTADIA.sum())
 # Calcular meses reales con datos
@@ -51,29 +81,65 @@ anio_max = int(nqx.INGRESO.dt.year.max())
 periodo_label = f'{anio_min}-{anio_max}' if anio_min != anio_max else str(anio_min)
 pct_masculino = round((nqx.GENERO == 'M').mean() * 100, 1)
 
+# Ocupacion: censo de medianoche por dia (intervalos INGRESO/EGRESO) contra las camas de CAMAS_UTI
+censo = censo_diario(df)
+ocupacion = resumen_censo(censo)
+ocup_nqx = ocupacion.loc['UTINQX']
+
+# Resumen combinable por (UTI, mes): HLL de pacientes + t-digest de APACHE/estadia/edad.
+# Es lo que se comparte para consolidar con otros hospitales (sin filas de pacientes); lleva la
+# huella de la clave de seudonimo, que debe ser la misma UTI_CLAVE_SEUDONIMO en todos los sitios.
+if 'ID_PACIENTE' in df.columns:
+    celdas_sketch = resumir_celdas(df, huella_clave(cargar_clave()))
+    celdas_a_json(celdas_sketch, 'eda_outputs/sketches_uti_mes.json')
+
+# Reingresos a 48 h / 7 d / 30 d del egreso vivo, por UTI y mes de egreso (vinculados por ID_PACIENTE)
+reingresos = None
+if 'ID_PACIENTE' in df.columns:
+    reingresos = tabla_reingresos(marcar_reingresos(df))
+    guardar_tabla_reingresos(reingresos)
+
 # Severity
-mod_plus = len(nqx[nqx.SEVERIDAD_APACHE.isin(['Moderado (11-20)', 'Severo (21-30)', 'Muy severo (31+)'])]) / n_total * 100
-severo_plus = len(nqx[nqx.SEVERIDAD_APACHE.isin(['Severo (21-30)', 'Muy severo (31+)'])]) / n_total * 100
+mod_plus = mod_plus_uti['UTINQX'] * 100
+severo_plus = severo_plus_uti['UTINQX'] * 100
+
+# Mortalidad observada vs esperada (APACHE II): tabla SMR precalculada por UTI/mes/diagnostico
+smr = tabla_smr(df)
+guardar_tabla_smr(smr)
+smr_nqx = seleccionar(smr, 'UTI', UTI='UTINQX').iloc[0]
+
+# Control estadistico mensual (grafico u de ingresos/dia y p de mortalidad), todas las UTI a la vez
+spc = tabla_spc(pd.concat([
+    serie_mensual(df, 'INGRESO', 'UTI', 'INGRESOS_DIA', tipo='u'),
+    serie_mensual(df, 'INGRESO', 'UTI', 'MORTALIDAD', eventos='FALLECIDO', tipo='p'),
+]))
+spc.to_csv('eda_outputs/spc_mensual.csv', index=False)
+
+# Pronostico de ingresos (GLM de Poisson con efecto de mes), parametros en cache por ventana de datos
+pronostico = pronosticar(conteos_mensuales(df, 'INGRESO', 'UTI', 'INGRESOS'))
+pronostico.to_csv('eda_outputs/pronostico_ingresos.csv', index=False)
+futuro = pronostico[pronostico.TIPO == 'pronostico']
 
 # Mortality by severity
-mort_by_sev = {}
-for cat in sev_order:
-    sub = nqx[nqx.SEVERIDAD_APACHE == cat]
-    if len(sub) > 0:
-        mort_by_sev[cat] = {
-            'n': len(sub),
-            'fallecidos': int(sub.FALLECIDO.sum()),
-            'tasa': round(sub.FALLECIDO.mean() * 100, 1)
-        }
+mort_by_sev = {
+    fila.SEVERIDAD_APACHE: {
+        'n': int(fila.N),
+        'fallecidos': int(fila.OBSERVADOS),
+        'tasa': round(fila.TASA_OBSERVADA, 1),
+        'esperada': round(fila.TASA_ESPERADA, 1),
+    }
+    for fila in seleccionar(smr, ('UTI', 'SEVERIDAD_APACHE'), UTI='UTINQX').itertuples()
+    if fila.SEVERIDAD_APACHE in sev_order
+}
 
 # Comparative stats
-apache_mean_qx = round(qx.APACHE_II.mean(), 1)
-mod_plus_qx = len(qx[qx.SEVERIDAD_APACHE.isin(['Moderado (11-20)', 'Severo (21-30)', 'Muy severo (31+)'])]) / len(qx) * 100
-mort_qx = round(qx.FALLECIDO.mean() * 100, 2)
+apache_mean_qx = round(apache_uti['UTIQX'], 1)
+mod_plus_qx = mod_plus_uti['UTIQX'] * 100
+mort_qx = round(mortalidad_uti['UTIQX'] * 100, 2)
 
 # Statistical tests
 u_stat_apache, p_apache = mannwhitneyu(qx.APACHE_II.dropna(), nqx.APACHE_II.dropna())
-ct_sev = pd.crosstab(df['UTI'], df['SEVERIDAD_APACHE'])
+ct_sev = como_tabla(metricas['severidad_uti'], 'UTI', 'SEVERIDAD_APACHE')
 chi2_sev, p_sev, _, _ = chi2_contingency(ct_sev)
 ct_dx = pd.crosstab(df['UTI'], df['CATEGORIA_DX'])
 chi2_dx, p_dx, _, _ = chi2_contingency(ct_dx)
@@ -123,26 +189,83 @@ fig_mort_sev.add_trace(go.Bar(
     x=cats_with_data, y=tasas,
     marker_color=['#27ae60', '#f39c12', '#e74c3c', '#8e44ad'][:len(cats_with_data)],
     text=[f'{t}%<br>(n={n})' for t, n in zip(tasas, ns)],
-    textposition='outside'
+    textposition='outside', name='Observada'
+))
+fig_mort_sev.add_trace(go.Scatter(
+    x=cats_with_data, y=[mort_by_sev[c]['esperada'] for c in cats_with_data],
+    mode='markers', name='Esperada (APACHE II)',
+    marker=dict(symbol='line-ew-open', size=40, line=dict(width=3, color='#2c3e50'))
 ))
 fig_mort_sev.update_layout(
     title='Tasa de Mortalidad según Severidad APACHE II',
     xaxis_title='Categoría de severidad', yaxis_title='Mortalidad (%)',
     template='plotly_white', height=380, margin=dict(t=60, b=40),
-    yaxis=dict(range=[0, max(tasas)*1.3 if tasas else 50])
+    yaxis=dict(range=[0, max(tasas + [mort_by_sev[c]['esperada'] for c in cats_with_data])*1.3 if tasas else 50]),
+    legend=dict(orientation='h', y=-0.2)
+)
+
+# 3b. Funnel plot: SMR mensual de cada UTI contra los limites de control
+smr_mes = seleccionar(smr, ('UTI', 'MES'))
+fig_smr = go.Figure()
+x_emb, lim_emb = curvas_embudo(max(smr_mes.ESPERADOS.max(), 1) * 1.1)
+for nivel, dash in zip(NIVELES_EMBUDO, ['dash', 'dot']):
+    inf, sup = lim_emb[nivel]
+    for y, mostrar in ((sup, True), (inf, False)):
+        fig_smr.add_trace(go.Scatter(
+            x=x_emb, y=y, mode='lines', line=dict(color='#7f8c8d', dash=dash, width=1, shape='hv'),
+            name=f'Límite {nivel*100:g}%', legendgroup=str(nivel), showlegend=mostrar, hoverinfo='skip'
+        ))
+fig_smr.add_hline(y=1, line_color='#2c3e50', line_width=1)
+for uti, color in [('UTINQX', C_NQX), ('UTIQX', C_QX)]:
+    pts = smr_mes[smr_mes.UTI == uti]
+    fig_smr.add_trace(go.Scatter(
+        x=pts.ESPERADOS, y=pts.SMR, mode='markers', name=uti,
+        marker=dict(color=color, size=9, line=dict(width=1, color='white'),
+                    symbol=np.where(pts.FUERA_998 != 0, 'diamond', 'circle')),
+        text=pts.MES,
+        hovertemplate='%{text}<br>Esperados: %{x:.1f}<br>SMR: %{y:.2f}<extra>' + uti + '</extra>'
+    ))
+fig_smr.update_layout(
+    title='SMR mensual (observada / esperada APACHE II) — gráfico de embudo',
+    xaxis_title='Muertes esperadas en el mes', yaxis_title='SMR',
+    template='plotly_white', height=400, margin=dict(t=60, b=40),
+    legend=dict(orientation='h', y=-0.2)
 )
 
 # 4. Monthly admissions trend (by ANIO-MES, not summed)
 nqx['ANIO_MES'] = nqx['INGRESO'].dt.to_period('M').astype(str)
 monthly_nqx = nqx.groupby('ANIO_MES').size()
 fig_monthly = go.Figure()
-# Colorear barras: rojo desde el mes donde inicia el aumento sostenido (2025-06)
-bar_colors = [C_ACCENT if m >= '2025-06' else C_NQX for m in monthly_nqx.index]
+# Colorear barras: rojo en los meses con senal SPC por sobre la linea central (grafico u)
+spc_ing = spc[(spc.SERIE == 'INGRESOS_DIA') & (spc.UNIDAD == 'UTINQX')].set_index('PERIODO').reindex(monthly_nqx.index)
+senal_alta = spc_ing.SENAL.fillna(False).astype(bool) & (spc_ing.Z > 0)
+meses_senal = monthly_nqx.index[senal_alta.to_numpy()].tolist()
+bar_colors = [C_ACCENT if s else C_NQX for s in senal_alta]
 fig_monthly.add_trace(go.Bar(
     x=monthly_nqx.index.tolist(),
     y=monthly_nqx.values,
     marker_color=bar_colors,
-    text=monthly_nqx.values, textposition='outside'
+    text=monthly_nqx.values, textposition='outside', showlegend=False
+))
+# Limites de control en ingresos/mes (tasa diaria x dias del mes)
+fig_monthly.add_trace(go.Scatter(
+    x=monthly_nqx.index.tolist(), y=(spc_ing.LCS * spc_ing.N).round(1),
+    mode='lines', line=dict(color='#7f8c8d', dash='dot', width=1, shape='hvh'),
+    name='Límite superior 3σ'
+))
+fig_monthly.add_trace(go.Scatter(
+    x=monthly_nqx.index.tolist(), y=(spc_ing.LCI * spc_ing.N).round(1),
+    mode='lines', line=dict(color='#7f8c8d', dash='dot', width=1, shape='hvh'),
+    name='Límite inferior 3σ', showlegend=False
+))
+# Proximos meses: barras claras con banda de prediccion 95%
+futuro_nqx = futuro[futuro.UNIDAD == 'UTINQX']
+fig_monthly.add_trace(go.Bar(
+    x=futuro_nqx.PERIODO.tolist(), y=futuro_nqx.MEDIA.round(1),
+    marker=dict(color=C_NQX, opacity=0.35, line=dict(color=C_NQX, width=1)),
+    error_y=dict(type='data', symmetric=False, array=(futuro_nqx.SUP - futuro_nqx.MEDIA).round(1),
+                 arrayminus=(futuro_nqx.MEDIA - futuro_nqx.INF).round(1), color='#7f8c8d'),
+    name='Pronóstico (IC95%)'
 ))
 fig_monthly.add_hline(y=avg_monthly, line_dash='dash', line_color=C_ACCENT,
                       annotation_text=f'Promedio: {avg_monthly}/mes')
@@ -150,7 +273,7 @@ fig_monthly.update_layout(
     title=f'Ingresos Mensuales a UTINQX ({periodo_label})',
     xaxis_title='Período', yaxis_title='Cantidad de ingresos',
     template='plotly_white', height=380, margin=dict(t=60, b=80),
-    xaxis=dict(tickangle=-45)
+    xaxis=dict(tickangle=-45), legend=dict(orientation='h', y=1.08, x=1, xanchor='right')
 )
 
 # 5. APACHE trend by month (by ANIO-MES)
@@ -202,6 +325,28 @@ fig_los.update_layout(
     template='plotly_white', height=350, margin=dict(t=60, b=40)
 )
 
+# 7b. Kaplan-Meier: probabilidad de seguir en la UTI por severidad (estadias abiertas censuradas)
+km_sev = curvas_en_cache(df, ('UTI', 'SEVERIDAD_APACHE'))
+_, _, p_km_sev = log_rank(nqx, 'SEVERIDAD_APACHE')
+medianas_km_sev = {}
+fig_km = go.Figure()
+for sev, color in zip(sev_order, ['#27ae60', '#f39c12', '#e74c3c', '#8e44ad']):
+    curva = km_sev.get(f'UTINQX|{sev}')
+    if curva is None:
+        continue
+    medianas_km_sev[sev] = mediana_escalon(curva)
+    fig_km.add_trace(go.Scatter(
+        x=curva['t'], y=curva['SUPERVIVENCIA'], mode='lines', line=dict(color=color, width=2, shape='hv'),
+        name=f"{sev} (n={curva['n']})"
+    ))
+fig_km.update_layout(
+    title='Probabilidad de Seguir en UTINQX según Severidad (Kaplan-Meier)',
+    xaxis_title='Días desde el ingreso', yaxis_title='Proporción aún internada',
+    template='plotly_white', height=380, margin=dict(t=60, b=40),
+    xaxis=dict(range=[0, 30]), yaxis=dict(range=[0, 1.02]),
+    legend=dict(orientation='h', y=-0.2)
+)
+
 # 8. Estadia category pie
 est_counts = nqx.CAT_ESTADIA.value_counts().reindex(estadia_order).fillna(0)
 fig_est_pie = go.Figure(go.Pie(
@@ -215,26 +360,11 @@ fig_est_pie.update_layout(
     margin=dict(t=60, b=40, l=40, r=40)
 )
 
-# 9. Patient flow (procedencia/destino)
-proc_counts = nqx.PROC_GRUPO.value_counts().head(6)
-dest_counts = nqx.DEST_GRUPO.value_counts().head(8)
-fig_flow = make_subplots(rows=1, cols=2, subplot_titles=[
-    'Procedencia de pacientes', 'Destino al egreso'
-])
-fig_flow.add_trace(go.Bar(
-    y=proc_counts.index[::-1], x=proc_counts.values[::-1],
-    orientation='h', marker_color=C_NQX, showlegend=False,
-    text=proc_counts.values[::-1], textposition='outside'
-), row=1, col=1)
-fig_flow.add_trace(go.Bar(
-    y=dest_counts.index[::-1], x=dest_counts.values[::-1],
-    orientation='h', marker_color='#e67e22', showlegend=False,
-    text=dest_counts.values[::-1], textposition='outside'
-), row=1, col=2)
-fig_flow.update_layout(
-    title='Flujo de Pacientes UTINQX', template='plotly_white',
-    height=420, margin=dict(t=60, b=40, l=180)
-)
+# 9. Flujo de pacientes: procedencia -> UTINQX -> destino (tabla de enlaces en cache, ambas UTI)
+flujo = flujo_en_cache(df)
+proc_counts = conteos(flujo, 'PROC_GRUPO', unidades=['UTINQX']).drop(SIN_DATO, errors='ignore')
+fig_flow = figura_sankey(flujo, {'UTINQX': C_NQX}, unidades=['UTINQX'],
+                         titulo='Flujo de Pacientes UTINQX: Procedencia → Destino')
 
 # 10. Age groups bar
 edad_counts = nqx.GRUPO_ETARIO.value_counts().reindex(edad_order).fillna(0)
@@ -251,62 +381,14 @@ fig_edad.update_layout(
     template='plotly_white', height=350, margin=dict(t=60, b=40)
 )
 
-# Helper: wrap plotly fig in HTML with narrative
-def chart_block(fig, narrative=''):
-    plot_html = fig.to_html(full_html=False, include_plotlyjs=False)
-    narr = f'<div class="narrative">{narrative}</div>' if narrative else ''
-    return f'<div class="chart-block">{plot_html}{narr}</div>'
-
-# CSS compartido
-SHARED_CSS = """
-* { margin:0; padding:0; box-sizing:border-box; }
-body { font-family: 'Segoe UI', system-ui, sans-serif; background: #f8f9fa; color: #212529; }
-.nav-bar { display:flex; gap:0; background:#2c3e50; padding:0; position:sticky; top:0; z-index:100; flex-wrap:wrap; }
-.nav-bar a { color:#ecf0f1; text-decoration:none; padding:14px 20px; font-size:13px; font-weight:500; transition:background .2s; }
-.nav-bar a:hover { background:#34495e; }
-.nav-bar a.active { background:#e67e22; color:#fff; }
-.container { max-width:1300px; margin:0 auto; padding:20px; }
-h1 { text-align:center; margin:20px 0 5px; font-size:1.7rem; color:#2c3e50; }
-.subtitle { text-align:center; color:#6c757d; margin-bottom:25px; font-size:0.9rem; }
-.section-title { font-size:1.15rem; color:#2c3e50; margin:30px 0 15px; padding-bottom:8px; border-bottom:2px solid #e67e22; }
-.kpi-grid { display:grid; grid-template-columns:repeat(auto-fit,minmax(200px,1fr)); gap:14px; margin-bottom:25px; }
-.kpi { background:#fff; border-radius:12px; padding:16px 18px; box-shadow:0 2px 8px rgba(0,0,0,0.08); text-align:center; }
-.kpi-label { font-size:0.78rem; color:#6c757d; text-transform:uppercase; letter-spacing:0.5px; margin-bottom:6px; }
-.kpi-value { font-size:1.6rem; font-weight:700; }
-.kpi-detail { font-size:0.75rem; color:#95a5a6; margin-top:4px; }
-.chart-block { background:#fff; border-radius:12px; padding:12px; box-shadow:0 2px 8px rgba(0,0,0,0.08); margin-bottom:20px; }
-.narrative { padding:14px 18px; margin-top:6px; background:#fef9e7; border-left:4px solid #e67e22; border-radius:0 8px 8px 0; font-size:0.88rem; color:#7d6608; line-height:1.5; }
-.highlight-box { background:#fdedec; border-left:4px solid #c0392b; padding:18px 22px; border-radius:0 12px 12px 0; margin:20px 0; }
-.highlight-box h3 { color:#922b21; margin-bottom:8px; font-size:1rem; }
-.highlight-box li { margin:5px 0; color:#641e16; font-size:0.9rem; line-height:1.4; }
-.evidence-box { background:#eaf2f8; border-left:4px solid #2980b9; padding:18px 22px; border-radius:0 12px 12px 0; margin:20px 0; }
-.evidence-box h3 { color:#1a5276; margin-bottom:8px; font-size:1rem; }
-.evidence-box p, .evidence-box li { color:#1b4f72; font-size:0.9rem; line-height:1.5; margin:4px 0; }
-.stats-table { width:100%; border-collapse:collapse; margin-bottom:18px; background:#fff; border-radius:12px; overflow:hidden; box-shadow:0 2px 8px rgba(0,0,0,0.08); }
-.stats-table th { background:#2c3e50; color:#fff; padding:10px 14px; text-align:left; font-size:0.82rem; }
-.stats-table td { padding:8px 14px; border-bottom:1px solid #eee; font-size:0.87rem; }
-.stats-table tr:last-child td { border-bottom:none; }
-.stats-table tr:hover { background:#f1f3f5; }
-.sig { color:#c0392b; font-weight:bold; }
-.ns { color:#6c757d; }
-.two-col { display:grid; grid-template-columns:1fr 1fr; gap:20px; }
-@media (max-width:900px) { .two-col { grid-template-columns:1fr; } }
-footer { text-align:center; color:#adb5bd; padding:30px; font-size:0.78rem; }
-@media print { .nav-bar { display:none; } body { background:#fff; } .chart-block, .kpi { box-shadow:none; border:1px solid #ddd; } }
-"""
+# Los graficos se dibujan al entrar en pantalla; con --inmediato se dibujan todos al cargar
+CARGA_DIFERIDA = '--inmediato' not in sys.argv
 
-NAV_HTML = """
-<nav class="nav-bar">
-    <a href="../analisis_categorizacion/index.html">Resumen UTINQX</a>
-    <a href="../analisis_categorizacion/dashboard_utinqx.html">Categorización UTINQX</a>
-    <a href="../analisis_categorizacion/ambas_uti.html">Ambas UTI (Categorización)</a>
-    <a href="dashboard_eda.html">EDA Estadística UTI</a>
-    <a href="reporte_justificacion_utinqx.html" {act1}>Justificación UTINQX</a>
-    <a href="dashboard_comparativo_clinico.html" {act2}>Comparativo Clínico</a>
-</nav>"""
+# Helper: fragmento HTML de una figura (el layout y las narrativas viven en las plantillas)
+def figura_html(fig):
+    return figura_plotly(fig, diferida=CARGA_DIFERIDA)
 
-nav1 = NAV_HTML.format(act1='class="active"', act2='')
-nav2 = NAV_HTML.format(act1='', act2='class="active"')
+NAV_ESTADISTICA = 'analisis_estadistica_uti'
 
 # Precalcular valores para narrativas
 _mort_mod = mort_by_sev.get('Moderado (11-20)', {'tasa': 0, 'n': 0})
@@ -330,155 +412,62 @@ _pct_6074 = round((nqx.GRUPO_ETARIO == '60-74').mean() * 100, 1)
 # GENERAR HTML 1: JUSTIFICACIÓN UTINQX
 # ══════════════════════════════════════════════════════════════════
 
-html1 = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Reporte de Justificación — UTI Neuroquirúrgica</title>
-<script src="https://cdn.plot.ly/plotly-2.35.0.min.js"></script>
-<style>
-{SHARED_CSS}
-.exec-summary {{ background:linear-gradient(135deg,#2c3e50,#34495e); color:#ecf0f1; padding:30px; border-radius:12px; margin-bottom:30px; }}
-.exec-summary h2 {{ color:#e67e22; margin-bottom:12px; font-size:1.2rem; }}
-.exec-summary p {{ font-size:0.92rem; line-height:1.6; margin-bottom:8px; }}
-.exec-summary .stat-highlight {{ color:#f1c40f; font-weight:700; font-size:1.05rem; }}
-</style>
-</head>
-<body>
-
-{nav1}
-
-<div class="container">
-<h1>Reporte Clínico — UTI Neuroquirúrgica (UTINQX)</h1>
-<p class="subtitle">Evidencia cuantitativa para la evaluación del recurso enfermero | {periodo_label} ({n_meses_nqx} meses) | n={n_total} pacientes</p>
-
-<!-- RESUMEN EJECUTIVO -->
-<div class="exec-summary">
-<h2>Resumen Ejecutivo</h2>
-<p><span class="stat-highlight">{n_total} pacientes</span> en <span class="stat-highlight">{n_meses_nqx} meses ({periodo_label})</span>. Promedio: <span class="stat-highlight">{avg_monthly} ingresos/mes</span>. Total: <span class="stat-highlight">{patient_days:,} días-paciente</span>.</p>
-<p>APACHE II promedio: <span class="stat-highlight">{apache_mean} ± {apache_std}</span>. <span class="stat-highlight">{mod_plus:.1f}%</span> de pacientes en categoría moderada, severa o muy severa (vs {mod_plus_qx:.1f}% en UTIQX, p &lt; 0.001).</p>
-<p>Mortalidad global: <span class="stat-highlight">{mort_pct}%</span> ({n_fallecidos} pacientes). En severos: <span class="stat-highlight">{_mort_sev['tasa']}%</span>. En muy severos: <span class="stat-highlight">{_mort_msev['tasa']}%</span>.</p>
-</div>
-
-<!-- KPIs -->
-<h2 class="section-title">Indicadores Clave de la Unidad</h2>
-<div class="kpi-grid">
-    <div class="kpi"><div class="kpi-label">Pacientes atendidos</div><div class="kpi-value" style="color:{C_NQX}">{n_total}</div><div class="kpi-detail">{periodo_label} ({n_meses_nqx} meses)</div></div>
-    <div class="kpi"><div class="kpi-label">Ingresos mensuales</div><div class="kpi-value" style="color:{C_NQX}">{avg_monthly}</div><div class="kpi-detail">Promedio mes</div></div>
-    <div class="kpi"><div class="kpi-label">Días-paciente</div><div class="kpi-value" style="color:{C_NQX}">{patient_days:,}</div><div class="kpi-detail">Carga acumulada</div></div>
-    <div class="kpi"><div class="kpi-label">APACHE II promedio</div><div class="kpi-value" style="color:{C_ACCENT}">{apache_mean}</div><div class="kpi-detail">DE ± {apache_std}</div></div>
-    <div class="kpi"><div class="kpi-label">Severidad moderada o superior</div><div class="kpi-value" style="color:{C_ACCENT}">{mod_plus:.1f}%</div><div class="kpi-detail">{int(mod_plus*n_total/100)} pacientes</div></div>
-    <div class="kpi"><div class="kpi-label">Estadía promedio</div><div class="kpi-value" style="color:{C_NQX}">{los_mean} días</div><div class="kpi-detail">Mediana: {los_median:.0f} días</div></div>
-    <div class="kpi"><div class="kpi-label">Mortalidad global</div><div class="kpi-value" style="color:{C_ACCENT}">{mort_pct}%</div><div class="kpi-detail">{n_fallecidos} fallecidos</div></div>
-    <div class="kpi"><div class="kpi-label">Edad promedio</div><div class="kpi-value" style="color:{C_NQX}">{edad_mean} años</div><div class="kpi-detail">{pct_masculino}% masculino</div></div>
-</div>
-
-<!-- SEVERIDAD -->
-<h2 class="section-title">1. Severidad Clínica</h2>
-
-<div class="highlight-box">
-<h3>Datos de severidad APACHE II</h3>
-<ul>
-<li><strong>{mod_plus:.1f}%</strong> de pacientes UTINQX en categoría moderada, severa o muy severa vs <strong>{mod_plus_qx:.1f}%</strong> en UTIQX (p &lt; 0.001).</li>
-<li><strong>{severo_plus:.1f}%</strong> en categoría severa o muy severa (APACHE &ge; 21).</li>
-</ul>
-</div>
-
-<div class="two-col">
-{chart_block(fig_sev_pie,
-    f'<strong>{mod_plus:.1f}%</strong> en categoría moderada o superior. '
-    f'<strong>{100-mod_plus:.1f}%</strong> en categoría leve (APACHE 0-10).'
-)}
-{chart_block(fig_apache_hist,
-    f'Media: <strong>{apache_mean}</strong>. Mediana: <strong>{apache_median:.0f}</strong>. '
-    f'P75: <strong>{apache_p75:.0f}</strong>. P90: <strong>{apache_p90:.0f}</strong>. P95: <strong>{apache_p95:.0f}</strong>.'
-)}
-</div>
-
-<!-- MORTALIDAD POR SEVERIDAD -->
-<h2 class="section-title">2. Mortalidad según Severidad</h2>
-
-{chart_block(fig_mort_sev,
-    f'Leve: 0%. Moderada: <strong>{_mort_mod["tasa"]}%</strong> (n={_mort_mod["n"]}). '
-    f'Severa: <strong>{_mort_sev["tasa"]}%</strong> (n={_mort_sev["n"]}). '
-    f'Muy severa: <strong>{_mort_msev["tasa"]}%</strong> (n={_mort_msev["n"]}).'
-)}
-
-<!-- ESTADÍA -->
-<h2 class="section-title">3. Estadía Hospitalaria</h2>
-
-<div class="two-col">
-{chart_block(fig_los,
-    f'Promedio: <strong>{los_mean} días</strong>. Mediana: <strong>{los_median:.0f}</strong>. '
-    f'P90: <strong>{los_p90:.0f} días</strong>. P95: <strong>{los_p95:.0f} días</strong>. '
-    f'Total acumulado: <strong>{patient_days:,} días-paciente</strong>.'
-)}
-{chart_block(fig_est_pie,
-    f'<strong>{_pct_larga}%</strong> con estadías de 5 o más días. '
-    f'<strong>{_pct_prolongada}%</strong> con estadías de 10 o más días.'
-)}
-</div>
-
-<!-- TENDENCIA TEMPORAL -->
-<h2 class="section-title">4. Tendencia Temporal</h2>
-
-<div class="two-col">
-{chart_block(fig_monthly,
-    f'{n_meses_nqx} meses de registro ({periodo_label}). Promedio: <strong>{avg_monthly} ingresos/mes</strong>. '
-    f'Máximo: <strong>{int(monthly_nqx.max())}</strong>. Mínimo: <strong>{int(monthly_nqx.min())}</strong>. '
-    f'En rojo: desde junio 2025, aumento sostenido del volumen.'
-)}
-{chart_block(fig_apache_trend,
-    f'APACHE II promedio mensual: rango <strong>{apache_monthly.min()}</strong> a <strong>{apache_monthly.max()}</strong>. '
-    f'Media global: <strong>{apache_mean}</strong>.'
-)}
-</div>
-
-<!-- PERFIL DIAGNÓSTICO -->
-<h2 class="section-title">5. Perfil Diagnóstico</h2>
-
-{chart_block(fig_dx,
-    f'Oncológico: {_n_onco} ({_pct_onco}%). Neurológico: {_n_neuro} ({_pct_neuro}%). '
-    f'Traumático: {_n_trauma} ({_pct_trauma}%). Cardiovascular: {_n_cardio} ({_pct_cardio}%).'
-)}
-
-<!-- DEMOGRAFÍA -->
-<h2 class="section-title">6. Perfil Demográfico y Flujo de Pacientes</h2>
-
-<div class="two-col">
-{chart_block(fig_edad,
-    f'Mayores de 60 años: <strong>{_pct_60plus}%</strong>. '
-    f'Grupo más frecuente: 60-74 años ({_n_6074} pacientes, {_pct_6074}%).'
-)}
-{chart_block(fig_flow,
-    f'Principal procedencia: otra UCI/UTI ({proc_counts.iloc[0]}). '
-    f'Segundo origen: pabellón/postoperatorio ({proc_counts.iloc[1] if len(proc_counts)>1 else 0}).'
-)}
-</div>
-
-<!-- SÍNTESIS -->
-<div class="highlight-box" style="background:#d5f5e3; border-left-color:#27ae60;">
-<h3 style="color:#1e8449;">Síntesis de datos</h3>
-<ul style="color:#186a3b;">
-<li><strong>{n_total} pacientes</strong> en {n_meses_nqx} meses ({periodo_label}). Promedio: <strong>{avg_monthly} ingresos/mes</strong>. Total: <strong>{patient_days:,} días-paciente</strong>.</li>
-<li>APACHE II: <strong>{apache_mean} ± {apache_std}</strong>. Severidad moderada+: <strong>{mod_plus:.1f}%</strong> vs {mod_plus_qx:.1f}% en UTIQX (p &lt; 0.001).</li>
-<li>Mortalidad: severos <strong>{_mort_sev['tasa']}%</strong>, muy severos <strong>{_mort_msev['tasa']}%</strong>.</li>
-<li>Diagnósticos: oncológico {_pct_onco}%, neurológico {_pct_neuro}%, traumático {_pct_trauma}%.</li>
-<li>Mayores de 60 años: <strong>{_pct_60plus}%</strong>.</li>
-</ul>
-</div>
-
-</div>
-
-<footer>
-    Reporte generado a partir de datos anonimizados — {periodo_label} ({n_meses_nqx} meses) — n={n_total} pacientes — UTINQX
-</footer>
-</body>
-</html>"""
-
-with open('reporte_justificacion_utinqx.html', 'w', encoding='utf-8') as f:
-    f.write(html1)
+figs1 = {
+    'sev_pie': fig_sev_pie, 'apache_hist': fig_apache_hist, 'mort_sev': fig_mort_sev,
+    'los': fig_los, 'est_pie': fig_est_pie, 'monthly': fig_monthly,
+    'apache_trend': fig_apache_trend, 'dx': fig_dx, 'edad': fig_edad, 'flow': fig_flow,
+    'smr': fig_smr, 'km': fig_km,
+}
+kpis1 = [
+    {'label': 'Pacientes atendidos', 'valor': n_total, 'color': C_NQX, 'detalle': f'{periodo_label} ({n_meses_nqx} meses)'},
+    {'label': 'Ingresos mensuales', 'valor': avg_monthly, 'color': C_NQX, 'detalle': 'Promedio mes'},
+    {'label': 'Días-paciente', 'valor': f'{patient_days:,}', 'color': C_NQX, 'detalle': 'Carga acumulada'},
+    {'label': 'APACHE II promedio', 'valor': apache_mean, 'color': C_ACCENT, 'detalle': f'DE ± {apache_std}'},
+    {'label': 'Severidad moderada o superior', 'valor': f'{mod_plus:.1f}%', 'color': C_ACCENT, 'detalle': f'{int(mod_plus*n_total/100)} pacientes'},
+    {'label': 'Estadía promedio', 'valor': f'{los_mean} días', 'color': C_NQX, 'detalle': f'Mediana: {los_median:.0f} días'},
+    {'label': 'Mortalidad global', 'valor': f'{mort_pct}%', 'color': C_ACCENT, 'detalle': f'{n_fallecidos} fallecidos'},
+    {'label': 'SMR APACHE II', 'valor': f"{smr_nqx['SMR']:.2f}", 'color': C_ACCENT, 'detalle': f"IC95% {smr_nqx['IC_INF']:.2f}-{smr_nqx['IC_SUP']:.2f} | esperada {smr_nqx['TASA_ESPERADA']:.1f}%"},
+    {'label': 'Edad promedio', 'valor': f'{edad_mean} años', 'color': C_NQX, 'detalle': f'{pct_masculino}% masculino'},
+    {'label': 'Censo diario máximo', 'valor': int(ocup_nqx['PICO']), 'color': C_ACCENT, 'detalle': f"Medio: {ocup_nqx['CENSO_MEDIO']:.1f} | P90: {ocup_nqx['P90']:.0f} | {ocup_nqx['CAMAS']} camas"},
+    {'label': 'Días sobre capacidad', 'valor': int(ocup_nqx['DIAS_SOBRE_CAPACIDAD']), 'color': C_ACCENT, 'detalle': f"{ocup_nqx['PCT_DIAS_SOBRE_CAPACIDAD']:.1f}% de {ocup_nqx['DIAS']} días (censo > {ocup_nqx['CAMAS']} camas)"},
+]
+rein_uti = None
+if reingresos is not None:
+    rein_uti = reingresos[reingresos.MES == 'TODOS'].set_index('UTI')
+    rein_nqx = rein_uti.loc['UTINQX']
+    kpis1.append({'label': 'Reingreso a 30 días', 'valor': f"{rein_nqx['TASA_30D']:.1f}%", 'color': C_ACCENT,
+                  'detalle': f"{rein_nqx['REINGRESO_30D']} de {rein_nqx['ELEGIBLE_30D']} egresos vivos | 48 h: {rein_nqx['TASA_48H']:.1f}%"})
+# Valores comunes a ambas paginas
+contexto_comun = dict(
+    periodo_label=periodo_label, n_total=n_total, avg_monthly=avg_monthly,
+    patient_days=patient_days, apache_mean=apache_mean, apache_std=apache_std,
+    mod_plus=mod_plus, mod_plus_qx=mod_plus_qx, mort_pct=mort_pct,
+    los_mean=los_mean, los_median=los_median,
+    mort_mod=_mort_mod, mort_sev=_mort_sev, mort_msev=_mort_msev,
+    carga_diferida=CARGA_DIFERIDA,
+)
+
+renderizar(
+    'reporte_justificacion.html', 'reporte_justificacion_utinqx.html',
+    nav=enlaces_nav(NAV_ESTADISTICA, 'justificacion'),
+    figs={k: figura_html(f) for k, f in figs1.items()},
+    kpis=kpis1,
+    n_meses_nqx=n_meses_nqx, n_fallecidos=n_fallecidos, severo_plus=severo_plus,
+    apache_median=apache_median, apache_p75=apache_p75, apache_p90=apache_p90, apache_p95=apache_p95,
+    los_p90=los_p90, los_p95=los_p95, pct_larga=_pct_larga, pct_prolongada=_pct_prolongada,
+    ingresos_max=int(monthly_nqx.max()), ingresos_min=int(monthly_nqx.min()),
+    apache_mes_min=apache_monthly.min(), apache_mes_max=apache_monthly.max(),
+    dx={
+        'onco': {'n': _n_onco, 'pct': _pct_onco}, 'neuro': {'n': _n_neuro, 'pct': _pct_neuro},
+        'trauma': {'n': _n_trauma, 'pct': _pct_trauma}, 'cardio': {'n': _n_cardio, 'pct': _pct_cardio},
+    },
+    pct_60plus=_pct_60plus, n_6074=_n_6074, pct_6074=_pct_6074,
+    meses_senal=meses_senal, pronostico_nqx=futuro_nqx.to_dict('records'),
+    km_medianas=medianas_km_sev, p_km_sev=p_km_sev, n_abiertas=int(nqx.EGRESO.isna().sum()),
+    smr=smr_nqx, n_meses_fuera=int((smr_mes[smr_mes.UTI == 'UTINQX'].FUERA_998 != 0).sum()),
+    proc_1=proc_counts.iloc[0], proc_2=proc_counts.iloc[1] if len(proc_counts) > 1 else 0,
+    **contexto_comun,
+)
 print(f'[OK] reporte_justificacion_utinqx.html generado ({n_total} pacientes UTINQX)')
 
 
@@ -524,6 +513,24 @@ fig2_los.update_layout(
     template='plotly_white', height=380, margin=dict(t=60, b=40)
 )
 
+# 3b. Kaplan-Meier por unidad
+km_uti = curvas_en_cache(df, ('UTI',))
+fig2_km = go.Figure()
+for uti, color, name in [('UTIQX', C_QX, 'UTI Quirúrgica'), ('UTINQX', C_NQX, 'UTI Neuroquirúrgica')]:
+    curva = km_uti.get(uti)
+    if curva is None:
+        continue
+    fig2_km.add_trace(go.Scatter(
+        x=curva['t'], y=curva['SUPERVIVENCIA'], mode='lines', line=dict(color=color, width=2, shape='hv'),
+        name=f"{name} (mediana {mediana_escalon(curva)}d)"
+    ))
+fig2_km.update_layout(
+    title='Probabilidad de Seguir Internado (Kaplan-Meier, estadías abiertas censuradas)',
+    xaxis_title='Días desde el ingreso', yaxis_title='Proporción aún internada',
+    template='plotly_white', height=380, margin=dict(t=60, b=40),
+    xaxis=dict(range=[0, 30]), yaxis=dict(range=[0, 1.02])
+)
+
 # 4. Diagnosis comparison
 fig2_dx = make_subplots(rows=1, cols=2, subplot_titles=['UTI Quirúrgica (UTIQX)', 'UTI Neuroquirúrgica (UTINQX)'])
 for i, (uti, color) in enumerate([('UTIQX', C_QX), ('UTINQX', C_NQX)], 1):
@@ -542,7 +549,7 @@ fig2_dx.update_layout(
 
 # 5. Monthly admissions comparison
 df['ANIO_MES'] = df['INGRESO'].dt.to_period('M').astype(str)
-monthly_comp = df.groupby(['ANIO_MES', 'UTI']).size().unstack(fill_value=0)
+monthly_comp = como_tabla(metricas['ingresos_mes_uti'], 'INGRESO_MES', 'UTI').astype(int)
 fig2_monthly = go.Figure()
 for uti, color, name in [('UTIQX', C_QX, 'UTI Quirúrgica'), ('UTINQX', C_NQX, 'UTI Neuroquirúrgica')]:
     if uti in monthly_comp.columns:
@@ -550,6 +557,14 @@ for uti, color, name in [('UTIQX', C_QX, 'UTI Quirúrgica'), ('UTINQX', C_NQX, '
             x=monthly_comp.index.tolist(), y=monthly_comp[uti].values,
             name=name, marker_color=color
         ))
+        fut = futuro[futuro.UNIDAD == uti]
+        fig2_monthly.add_trace(go.Bar(
+            x=fut.PERIODO.tolist(), y=fut.MEDIA.round(1),
+            marker=dict(color=color, opacity=0.35, line=dict(color=color, width=1)),
+            error_y=dict(type='data', symmetric=False, array=(fut.SUP - fut.MEDIA).round(1),
+                         arrayminus=(fut.MEDIA - fut.INF).round(1), color='#7f8c8d'),
+            name=f'{name} (pronóstico)'
+        ))
 fig2_monthly.update_layout(
     title='Ingresos Mensuales Comparativos', barmode='group',
     xaxis_title='Período', yaxis_title='Cantidad de ingresos',
@@ -617,28 +632,36 @@ fig2_scatter.update_layout(
 fig2_scatter.update_xaxes(title_text='Score APACHE II')
 fig2_scatter.update_yaxes(title_text='Días de estadía')
 
-# 10. Patient flow comparison
-fig2_flow = make_subplots(rows=2, cols=2, subplot_titles=[
-    'Procedencia — UTIQX', 'Procedencia — UTINQX', 'Destino — UTIQX', 'Destino — UTINQX'
-])
-for i, (uti, color) in enumerate([('UTIQX', C_QX), ('UTINQX', C_NQX)], 1):
-    s = df[df.UTI == uti]
-    vc_p = s.PROC_GRUPO.value_counts().head(6)
-    fig2_flow.add_trace(go.Bar(y=vc_p.index[::-1], x=vc_p.values[::-1], orientation='h',
-                                marker_color=color, showlegend=False,
-                                text=vc_p.values[::-1], textposition='auto'), row=1, col=i)
-    vc_d = s.DEST_GRUPO.value_counts().head(6)
-    fig2_flow.add_trace(go.Bar(y=vc_d.index[::-1], x=vc_d.values[::-1], orientation='h',
-                                marker_color=color, showlegend=False,
-                                text=vc_d.values[::-1], textposition='auto'), row=2, col=i)
-fig2_flow.update_layout(
-    title='Flujo de Pacientes: Procedencia y Destino', template='plotly_white',
-    height=650, margin=dict(t=60, b=40, l=160)
-)
+# 10. Patient flow comparison: un solo Sankey con ambas UTI en el centro
+fig2_flow = figura_sankey(flujo, {'UTIQX': C_QX, 'UTINQX': C_NQX}, alto=600)
+
+# 11. Reingresos: tasa mensual a 30 dias (linea) y a 7 dias (punteada) por UTI de egreso
+fig2_reingresos = None
+if reingresos is not None:
+    rein_mes = reingresos[reingresos.MES != 'TODOS']
+    fig2_reingresos = go.Figure()
+    for uti, color, name in [('UTIQX', C_QX, 'UTI Quirúrgica'), ('UTINQX', C_NQX, 'UTI Neuroquirúrgica')]:
+        s = rein_mes[rein_mes.UTI == uti]
+        fig2_reingresos.add_trace(go.Scatter(
+            x=s.MES.tolist(), y=s.TASA_30D.round(1), mode='lines+markers', name=f'{name} ≤30 d',
+            line=dict(color=color, width=2.5),
+            customdata=np.column_stack([s.REINGRESO_30D, s.ELEGIBLE_30D]),
+            hovertemplate='%{x}: %{y}% (%{customdata[0]} de %{customdata[1]})<extra>' + uti + '</extra>'
+        ))
+        fig2_reingresos.add_trace(go.Scatter(
+            x=s.MES.tolist(), y=s.TASA_7D.round(1), mode='lines', name=f'{name} ≤7 d',
+            line=dict(color=color, width=1.5, dash='dot')
+        ))
+    fig2_reingresos.update_layout(
+        title='Reingresos a UTI después de un egreso vivo (% por mes de egreso)',
+        xaxis_title='Mes de egreso', yaxis_title='Reingresos (%)',
+        template='plotly_white', height=380, margin=dict(t=60, b=60),
+        legend=dict(orientation='h', y=-0.25)
+    )
 
 # Métricas comparativas
 m_qx = {
-    'n': len(qx), 'apache_mean': apache_mean_qx,
+    'n': int(estadias_uti['UTIQX']), 'apache_mean': apache_mean_qx,
     'apache_std': round(qx.APACHE_II.std(), 1),
     'los_mean': round(qx.DIAS_ESTADIA.mean(), 1),
     'los_median': qx.DIAS_ESTADIA.median(),
@@ -646,7 +669,7 @@ m_qx = {
     'mort': mort_qx,
     'pct_m': round((qx.GENERO == 'M').mean() * 100, 1),
     'patient_days': int(qx.DIAS_ESTADIA.sum()),
-    'avg_monthly': round(len(qx) / qx['INGRESO'].dt.to_period('M').nunique(), 1),
+    'avg_monthly': round(estadias_uti['UTIQX'] / qx['INGRESO'].dt.to_period('M').nunique(), 1),
 }
 n_meses_total = df['INGRESO'].dt.to_period('M').nunique()
 
@@ -654,145 +677,61 @@ def kpi_comp(label, val_qx, val_nqx, unit='', warn_higher=True):
     diff = val_nqx - val_qx
     arrow = '▲' if diff > 0 else '▼' if diff < 0 else '═'
     clr = C_ACCENT if (diff > 0 and warn_higher) else C_OK if (diff < 0 and warn_higher) else '#7f8c8d'
-    return f"""<div class="kpi" style="border-top:3px solid {clr}">
-    <div class="kpi-label">{label}</div>
-    <div style="display:flex;justify-content:space-around;align-items:center;">
-        <div><div style="font-size:0.75rem;color:{C_QX}">UTIQX</div><div style="font-size:1.3rem;font-weight:700;color:{C_QX}">{val_qx}{unit}</div></div>
-        <div style="font-size:1.2rem;font-weight:700;color:{clr}">{arrow} {abs(diff):.1f}{unit}</div>
-        <div><div style="font-size:0.75rem;color:{C_NQX}">UTINQX</div><div style="font-size:1.3rem;font-weight:700;color:{C_NQX}">{val_nqx}{unit}</div></div>
-    </div></div>"""
+    return {'label': label, 'qx': val_qx, 'nqx': val_nqx, 'unidad': unit,
+            'diff': abs(diff), 'flecha': arrow, 'color': clr}
+
+def fila_test(label, test_name, estadistico, p):
+    return {
+        'variable': label, 'prueba': test_name, 'estadistico': estadistico, 'p': p,
+        'sig': '***' if p < 0.001 else '**' if p < 0.01 else '*' if p < 0.05 else 'ns',
+        'clase': 'sig' if p < 0.05 else 'ns',
+        'interpretacion': 'Diferencia significativa' if p < 0.05 else 'Sin diferencia significativa',
+    }
 
 # Statistical tests table
-tests_rows = ''
+tests = []
 for col, label, test_name in [('EDAD', 'Edad', 'Mann-Whitney U'), ('APACHE_II', 'APACHE II', 'Mann-Whitney U'),
                                 ('DIAS_ESTADIA', 'Días de estadía', 'Mann-Whitney U')]:
     stat, p = mannwhitneyu(qx[col].dropna(), nqx[col].dropna(), alternative='two-sided')
-    sig = '***' if p < 0.001 else '**' if p < 0.01 else '*' if p < 0.05 else 'ns'
-    cls = 'sig' if p < 0.05 else 'ns'
-    interp = 'Diferencia significativa' if p < 0.05 else 'Sin diferencia significativa'
-    tests_rows += f'<tr><td>{label}</td><td>{test_name}</td><td>{stat:,.0f}</td><td>{p:.2e}</td><td class="{cls}">{sig}</td><td>{interp}</td></tr>\n'
+    tests.append(fila_test(label, test_name, f'{stat:,.0f}', p))
 
 for col, label in [('GENERO', 'Género'), ('CONDICION_EGRESO', 'Condición al egreso'),
                     ('SEVERIDAD_APACHE', 'Severidad APACHE'), ('GRUPO_ETARIO', 'Grupo etario'),
                     ('CATEGORIA_DX', 'Categoría diagnóstica')]:
     ct = pd.crosstab(df['UTI'], df[col])
     chi2, p, dof, _ = chi2_contingency(ct)
-    sig = '***' if p < 0.001 else '**' if p < 0.01 else '*' if p < 0.05 else 'ns'
-    cls = 'sig' if p < 0.05 else 'ns'
-    interp = 'Diferencia significativa' if p < 0.05 else 'Sin diferencia significativa'
-    tests_rows += f'<tr><td>{label}</td><td>Chi² (gl={dof})</td><td>{chi2:.1f}</td><td>{p:.2e}</td><td class="{cls}">{sig}</td><td>{interp}</td></tr>\n'
-
-html2 = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Dashboard Comparativo Clínico — UTIQX vs UTINQX</title>
-<script src="https://cdn.plot.ly/plotly-2.35.0.min.js"></script>
-<style>
-{SHARED_CSS}
-</style>
-</head>
-<body>
-
-{nav2}
-
-<div class="container">
-<h1>Dashboard Comparativo Clínico</h1>
-<p class="subtitle">UTI Quirúrgica vs UTI Neuroquirúrgica | {periodo_label} ({n_meses_total} meses) | n={len(df)} pacientes ({len(qx)} UTIQX + {n_total} UTINQX)</p>
-
-<!-- KPIs COMPARATIVOS -->
-<h2 class="section-title">Indicadores Comparativos</h2>
-<div class="kpi-grid">
-    {kpi_comp('Pacientes', m_qx['n'], n_total, '', False)}
-    {kpi_comp('APACHE II promedio', m_qx['apache_mean'], apache_mean, '', True)}
-    {kpi_comp('Estadía promedio', m_qx['los_mean'], los_mean, ' d', True)}
-    {kpi_comp('Mortalidad', m_qx['mort'], mort_pct, '%', True)}
-    {kpi_comp('Edad promedio', m_qx['edad_mean'], edad_mean, ' años', False)}
-    {kpi_comp('Severidad moderada+', round(mod_plus_qx,1), round(mod_plus,1), '%', True)}
-    {kpi_comp('Ingresos/mes', m_qx['avg_monthly'], avg_monthly, '', False)}
-    {kpi_comp('Días-paciente', m_qx['patient_days'], patient_days, '', False)}
-</div>
-
-<!-- TESTS ESTADÍSTICOS -->
-<h2 class="section-title">Pruebas Estadísticas</h2>
-<p style="font-size:0.88rem;color:#6c757d;margin-bottom:12px;">Pruebas no paramétricas: Mann-Whitney U (numéricas) y Chi-cuadrado (categóricas).</p>
-<table class="stats-table">
-<tr><th>Variable</th><th>Prueba</th><th>Estadístico</th><th>Valor p</th><th>Significancia</th><th>Interpretación</th></tr>
-{tests_rows}
-</table>
-<p style="font-size:0.78rem;color:#95a5a6;">* p&lt;0.05 &nbsp; ** p&lt;0.01 &nbsp; *** p&lt;0.001 &nbsp; ns: no significativo.</p>
-
-<!-- HALLAZGOS -->
-<div class="highlight-box">
-<h3>Diferencias estadísticamente significativas</h3>
-<ul>
-<li><strong>APACHE II</strong>: UTINQX {apache_mean} vs UTIQX {apache_mean_qx} (p &lt; 0.001).</li>
-<li><strong>Severidad</strong>: {mod_plus:.1f}% moderada+ en UTINQX vs {mod_plus_qx:.1f}% en UTIQX (p &lt; 0.001).</li>
-<li><strong>Diagnóstico</strong>: perfiles diferentes (p &lt; 0.001).</li>
-<li><strong>Mortalidad</strong>: UTINQX {mort_pct}% vs UTIQX {mort_qx}%.</li>
-<li><strong>Edad, género, estadía</strong>: sin diferencias significativas.</li>
-</ul>
-</div>
-
-<!-- GRÁFICOS -->
-<h2 class="section-title">Severidad Clínica</h2>
-<div class="two-col">
-{chart_block(fig2_apache,
-    f'APACHE II — UTINQX: media {apache_mean} ± {apache_std}. UTIQX: media {apache_mean_qx} ± {m_qx["apache_std"]}. '
-    f'Diferencia significativa (p &lt; 0.001).'
-)}
-{chart_block(fig2_sev,
-    f'Moderada+: UTINQX {mod_plus:.1f}% vs UTIQX {mod_plus_qx:.1f}%. '
-    f'Leve: UTINQX {100-mod_plus:.1f}% vs UTIQX {100-mod_plus_qx:.1f}%.'
-)}
-</div>
-
-<h2 class="section-title">Estadía Hospitalaria</h2>
-{chart_block(fig2_los,
-    f'UTINQX: media {los_mean}d, mediana {los_median:.0f}d. '
-    f'UTIQX: media {m_qx["los_mean"]}d, mediana {m_qx["los_median"]:.0f}d. '
-    f'Sin diferencia significativa.'
-)}
-
-<h2 class="section-title">Mortalidad por Severidad</h2>
-{chart_block(fig2_mort,
-    f'UTINQX — Severos: {_mort_sev["tasa"]}% (n={_mort_sev["n"]}). Muy severos: {_mort_msev["tasa"]}% (n={_mort_msev["n"]}).'
-)}
-
-<h2 class="section-title">Perfil Diagnóstico</h2>
-{chart_block(fig2_dx,
-    f'Perfiles diagnósticos estadísticamente diferentes (p &lt; 0.001).'
-)}
-
-<h2 class="section-title">Demografía</h2>
-{chart_block(fig2_edad,
-    f'Distribución etaria sin diferencia significativa entre ambas unidades.'
-)}
-
-<h2 class="section-title">Tendencias Temporales</h2>
-<div class="two-col">
-{chart_block(fig2_monthly,
-    f'UTIQX: {m_qx["avg_monthly"]} ingresos/mes. UTINQX: {avg_monthly} ingresos/mes.'
-)}
-{chart_block(fig2_apache_trend,
-    f'APACHE II promedio mensual consistentemente mayor en UTINQX durante todo el período.'
-)}
-</div>
-
-<h2 class="section-title">Flujo de Pacientes</h2>
-{chart_block(fig2_flow,
-    f'Principal procedencia en ambas unidades: otra UCI/UTI y pabellón/postoperatorio.'
-)}
-
-</div>
-
-<footer>
-    Dashboard comparativo clínico — Datos anonimizados — {periodo_label} ({n_meses_total} meses) — n={len(df)} pacientes
-</footer>
-</body>
-</html>"""
-
-with open('dashboard_comparativo_clinico.html', 'w', encoding='utf-8') as f:
-    f.write(html2)
+    tests.append(fila_test(label, f'Chi² (gl={dof})', f'{chi2:.1f}', p))
+
+# Estadia como tiempo hasta el egreso (incluye estadias abiertas como censuras)
+chi2_lr, gl_lr, p_lr = log_rank(df, 'UTI')
+tests.insert(3, fila_test('Estadía (Kaplan-Meier)', f'Log-rank (gl={gl_lr})', f'{chi2_lr:.1f}', p_lr))
+
+figs2 = {
+    'apache': fig2_apache, 'sev': fig2_sev, 'los': fig2_los, 'km': fig2_km, 'mort': fig2_mort, 'dx': fig2_dx,
+    'edad': fig2_edad, 'monthly': fig2_monthly, 'apache_trend': fig2_apache_trend, 'flow': fig2_flow,
+}
+kpis2 = [
+    kpi_comp('Pacientes', m_qx['n'], n_total, '', False),
+    kpi_comp('APACHE II promedio', m_qx['apache_mean'], apache_mean, '', True),
+    kpi_comp('Estadía promedio', m_qx['los_mean'], los_mean, ' d', True),
+    kpi_comp('Mortalidad', m_qx['mort'], mort_pct, '%', True),
+    kpi_comp('Edad promedio', m_qx['edad_mean'], edad_mean, ' años', False),
+    kpi_comp('Severidad moderada+', round(mod_plus_qx,1), round(mod_plus,1), '%', True),
+    kpi_comp('Ingresos/mes', m_qx['avg_monthly'], avg_monthly, '', False),
+    kpi_comp('Días-paciente', m_qx['patient_days'], patient_days, '', False),
+]
+if reingresos is not None:
+    figs2['reingresos'] = fig2_reingresos
+    kpis2.append(kpi_comp('Reingreso ≤30 d', round(rein_uti.loc['UTIQX', 'TASA_30D'], 1),
+                          round(rein_uti.loc['UTINQX', 'TASA_30D'], 1), '%', True))
+
+renderizar(
+    'dashboard_comparativo.html', 'dashboard_comparativo_clinico.html',
+    nav=enlaces_nav(NAV_ESTADISTICA, 'comparativo'),
+    figs={k: figura_html(f) for k, f in figs2.items()},
+    kpis=kpis2, tests=tests, m_qx=m_qx, c_qx=C_QX, c_nqx=C_NQX,
+    n_df=len(df), n_meses_total=n_meses_total,
+    apache_mean_qx=apache_mean_qx, mort_qx=mort_qx,
+    **contexto_comun,
+)
 print(f'[OK] dashboard_comparativo_clinico.html generado ({len(df)} pacientes total)')